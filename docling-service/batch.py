@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Batch Document Processing
+Converts a manifest of local files and R2 keys over the shared conversion workers, writing one JSONL record per document
+
+Usage: python batch.py manifest.txt [-o results.jsonl] [--concurrency 4]
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import hashlib
+import logging
+import argparse
+import tempfile
+from typing import Dict, Any, List, Optional, Tuple, Iterable, AsyncIterator
+
+from conversion_engine import CONVERSION_WORKERS
+from image_encoding import EncodingReport
+
+logger = logging.getLogger(__name__)
+
+# Documents in flight at once; a little above the worker count keeps conversion workers fed while others extract
+BATCH_CONCURRENCY = int(os.getenv('BATCH_CONCURRENCY', str(max(1, CONVERSION_WORKERS) * 2)))
+# Directory local manifest paths must live under when submitted over HTTP (unset = no local paths)
+BATCH_LOCAL_ROOT = os.getenv('BATCH_LOCAL_ROOT')
+# Key prefix R2 manifest entries must live under when submitted over HTTP (unset = no R2 keys)
+BATCH_R2_PREFIX = os.getenv('BATCH_R2_PREFIX')
+
+HASH_CHUNK_SIZE = 1024 * 1024  # 1MB
+
+
+def parse_manifest(lines: Iterable) -> List[Dict[str, str]]:
+    """
+    Manifest entries, one per line: a local path, 'r2://<key>', or a JSON object with 'path' or 'r2_key'
+    Blank lines and lines starting with '#' are ignored
+    """
+    items = []
+    for line in lines:
+        if isinstance(line, dict):
+            entry = line
+        else:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            if line.startswith('{'):
+                entry = json.loads(line)
+            elif line.startswith('r2://'):
+                entry = {'r2_key': line[len('r2://'):]}
+            else:
+                entry = {'path': line}
+
+        if not entry.get('path') and not entry.get('r2_key'):
+            raise ValueError(f"Manifest entry needs 'path' or 'r2_key': {entry}")
+        items.append(entry)
+    return items
+
+
+def hash_file(path: str) -> str:
+    """SHA-256 of a file, read in chunks"""
+    hasher = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while chunk := f.read(HASH_CHUNK_SIZE):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+class BatchRunner:
+    """Schedules manifest entries over the conversion engine, skipping files whose content was already seen"""
+
+    def __init__(self, concurrency: int = BATCH_CONCURRENCY, local_root: Optional[str] = None,
+                 allow_local_paths: bool = True, r2_prefix: Optional[str] = None, allow_r2_keys: bool = True):
+        self.concurrency = max(1, concurrency)
+        self.local_root = os.path.realpath(local_root) if local_root else None
+        self.allow_local_paths = allow_local_paths
+        # A whole "directory" of keys, so 'batch' doesn't also admit 'batch-private/...'
+        self.r2_prefix = r2_prefix.rstrip('/') + '/' if r2_prefix else None
+        self.allow_r2_keys = allow_r2_keys
+        # Content hash -> (source of the first copy, future of its outcome)
+        self._seen: Dict[str, Tuple[str, asyncio.Future]] = {}
+        self._stats = {
+            'documents': 0,
+            'converted': 0,
+            'duplicates': 0,
+            'failed': 0,
+            'pages': 0,
+        }
+
+    def _resolve_local(self, path: str) -> str:
+        real_path = os.path.realpath(path)
+        if not self.allow_local_paths:
+            raise PermissionError("Local paths are not accepted here")
+        if self.local_root and os.path.commonpath([self.local_root, real_path]) != self.local_root:
+            raise PermissionError(f"{path} is outside {self.local_root}")
+        return real_path
+
+    def _check_r2_key(self, key: str) -> str:
+        if not self.allow_r2_keys:
+            raise PermissionError("R2 keys are not accepted here")
+        if self.r2_prefix and (not key.startswith(self.r2_prefix) or '..' in key.split('/')):
+            raise PermissionError(f"{key} is outside {self.r2_prefix}")
+        return key
+
+    async def _fetch(self, item: Dict[str, str]):
+        """Local path of an entry and whether it is a temp file to remove afterwards"""
+        if item.get('path'):
+            return self._resolve_local(item['path']), False
+
+        key = self._check_r2_key(item['r2_key'])
+        from main import r2_client, R2_BUCKET_NAME
+        if not r2_client:
+            raise RuntimeError("R2 is not configured")
+
+        suffix = os.path.splitext(key)[1] or '.pdf'
+        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
+            temp_path = tmp.name
+        try:
+            await asyncio.to_thread(r2_client.download_file, R2_BUCKET_NAME, key, temp_path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+        return temp_path, True
+
+    async def process_item(self, item: Dict[str, str]) -> Dict[str, Any]:
+        """Convert and chunk one manifest entry, returning its result record"""
+        from main import load_or_convert_document, extract_chunks_from_json, count_pages
+
+        source = item.get('path') or f"r2://{item['r2_key']}"
+        record = {'type': 'document', 'source': source}
+        start = time.monotonic()
+        path, owned = None, False
+        result = None
+        self._stats['documents'] += 1
+
+        try:
+            path, owned = await self._fetch(item)
+            content_hash = await asyncio.to_thread(hash_file, path)
+            record['content_hash'] = content_hash
+
+            # Checked and claimed without awaiting in between, so concurrent copies can't both convert
+            if content_hash in self._seen:
+                first_source, first_result = self._seen[content_hash]
+                # Repeats report how the first copy went, failures included
+                outcome = await asyncio.shield(first_result)
+                self._stats['duplicates'] += 1
+                return {**record, 'type': 'duplicate', 'duplicate_of': first_source, **outcome}
+            result = asyncio.get_running_loop().create_future()
+            self._seen[content_hash] = (source, result)
+
+            doc_dict, doc = await load_or_convert_document(path, content_hash)
+            filename = os.path.basename(item.get('path') or item['r2_key'])
+            encoding_report = EncodingReport()
+            chunks = await extract_chunks_from_json(doc_dict, doc, filename, encoding_report=encoding_report)
+            total_pages = count_pages(doc_dict, doc)
+
+            self._stats['converted'] += 1
+            self._stats['pages'] += total_pages
+            record.update({
+                'success': True,
+                'total_pages': total_pages,
+                'chunks': [chunk.model_dump(exclude_none=True) for chunk in chunks],
+                'image_encoding': encoding_report.summary(),
+            })
+            if result:
+                result.set_result({'success': True, 'total_pages': total_pages})
+
+        except Exception as e:
+            logger.error(f"Batch item {source} failed: {e}")
+            self._stats['failed'] += 1
+            record.update({'success': False, 'error': str(e)})
+            if result and not result.done():
+                result.set_result({'success': False, 'error': str(e)})
+
+        finally:
+            if result and not result.done():
+                result.cancel()
+            if owned and path and os.path.exists(path):
+                os.unlink(path)
+
+        record['processing_time'] = round(time.monotonic() - start, 3)
+        return record
+
+    async def run(self, items: List[Dict[str, str]]) -> AsyncIterator[Dict[str, Any]]:
+        """Yield a record per entry as each finishes, then a summary record"""
+        start = time.monotonic()
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def run_item(item):
+            async with semaphore:
+                return await self.process_item(item)
+
+        tasks = [asyncio.ensure_future(run_item(item)) for item in items]
+        try:
+            for next_record in asyncio.as_completed(tasks):
+                yield await next_record
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        elapsed = time.monotonic() - start
+        summary = {'type': 'summary', **self.stats(), 'elapsed_seconds': round(elapsed, 2),
+                   'pages_per_second': round(self._stats['pages'] / elapsed, 3) if elapsed > 0 else 0.0}
+        logger.info(f"Batch done: {summary['converted']} converted, {summary['duplicates']} duplicates, "
+                    f"{summary['failed']} failed, {summary['pages']} pages at {summary['pages_per_second']} pages/s")
+        yield summary
+
+    def stats(self) -> Dict[str, Any]:
+        return dict(self._stats)
+
+
+async def run_cli(args) -> int:
+    from conversion_engine import get_conversion_engine
+    from http_clients import close_http_clients
+    from r2_uploads import get_r2_uploads
+
+    if args.manifest == '-':
+        items = parse_manifest(sys.stdin)
+    else:
+        with open(args.manifest) as f:
+            items = parse_manifest(f)
+
+    engine = get_conversion_engine()
+    engine.start()
+    output = open(args.output, 'w') if args.output else sys.stdout
+    failed = 0
+    try:
+        async for record in BatchRunner(concurrency=args.concurrency).run(items):
+            output.write(json.dumps(record) + '\n')
+            output.flush()
+            if record['type'] == 'summary':
+                failed = record['failed']
+                print(f"{record['converted']} converted, {record['duplicates']} duplicates, {record['failed']} failed - "
+                      f"{record['pages']} pages in {record['elapsed_seconds']}s ({record['pages_per_second']} pages/s)",
+                      file=sys.stderr)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+        engine.shutdown()
+        await close_http_clients()
+        # Waits for queued image uploads before the interpreter exits
+        if uploads := get_r2_uploads():
+            await asyncio.to_thread(uploads.shutdown)
+    return 1 if failed else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('manifest', help="manifest file ('-' for stdin)")
+    parser.add_argument('-o', '--output', help='JSONL output file (default: stdout)')
+    parser.add_argument('--concurrency', type=int, default=BATCH_CONCURRENCY)
+    sys.exit(asyncio.run(run_cli(parser.parse_args())))
+
+
+if __name__ == '__main__':
+    main()
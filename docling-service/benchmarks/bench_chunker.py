@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Sentence Chunker Benchmark
+Checks that text_chunker.chunk_page_text produces exactly the chunks of the previous list-based loop
+(so chunk content and vector IDs don't change), then times both on long synthetic pages
+
+Short sentences (--max-words 2, e.g. bullet and table fragments) with large chunks show the legacy loop's
+quadratic overlap rebuild; on ordinary prose both are dominated by the sentence split
+
+Usage: python benchmarks/bench_chunker.py [--sentences 2000,20000,100000] [--max-chunk-size 1000] [--max-words 40]
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from text_chunker import chunk_page_text
+
+WORDS = ['layout', 'table', 'figure', 'model', 'page', 'pipeline', 'vector', 'index', 'section', 'result',
+         'the', 'of', 'and', 'with', 'for', 'e.g', 'Fig', '3.5', 'approx', 'data']
+
+
+def legacy_chunk_page_text(page_text: str, max_chunk_size: int = 1000):
+    """The chunking loop extract_chunks_from_json used before text_chunker"""
+    overlap_size = max_chunk_size // 5
+    chunks = []
+    sentences = [s.strip() + ('.' if not s.strip().endswith(('.', '!', '?')) else '')
+                 for s in page_text.split('. ') if s.strip()]
+
+    current_chunk = []
+    current_length = 0
+    for sentence in sentences:
+        if current_length + len(sentence) > max_chunk_size and current_chunk:
+            chunks.append(' '.join(current_chunk))
+
+            overlap_sentences = []
+            overlap_length = 0
+            for j in range(len(current_chunk) - 1, -1, -1):
+                test_sentence = current_chunk[j]
+                if overlap_length + len(test_sentence) <= overlap_size:
+                    overlap_sentences.insert(0, test_sentence)
+                    overlap_length += len(test_sentence)
+                else:
+                    break
+
+            current_chunk = overlap_sentences + [sentence]
+            current_length = sum(len(s) for s in current_chunk)
+        else:
+            current_chunk.append(sentence)
+            current_length += len(sentence)
+
+    if current_chunk:
+        chunks.append(' '.join(current_chunk))
+    return chunks
+
+
+def synthetic_page(rng: random.Random, sentences: int, max_words: int = 40) -> str:
+    """Sentences of varied length, some ending in ! or ?, some blank, some far longer than a chunk"""
+    parts = []
+    for _ in range(sentences):
+        roll = rng.random()
+        if roll < 0.02:
+            parts.append('  ')
+            continue
+        words = rng.randint(1, max_words * 20 if roll > 0.995 else max_words)
+        sentence = ' '.join(rng.choice(WORDS) for _ in range(words))
+        if roll < 0.1:
+            sentence += rng.choice('!?')
+        parts.append(sentence)
+    return '. '.join(parts)
+
+
+def check_equivalence(cases: int, seed: int = 0) -> None:
+    rng = random.Random(seed)
+    for case in range(cases):
+        page = synthetic_page(rng, rng.randint(0, 300), max_words=rng.choice([3, 15, 60]))
+        max_chunk_size = rng.choice([0, 1, 20, 100, 500, 1000, 4000])
+        expected = legacy_chunk_page_text(page, max_chunk_size)
+        actual = chunk_page_text(page, max_chunk_size)
+        if actual != expected:
+            sys.exit(f"Mismatch in case {case} (max_chunk_size={max_chunk_size}): "
+                     f"{len(actual)} chunks vs {len(expected)} expected")
+    print(f"{cases} randomized pages: identical chunks")
+
+
+def best_time(function, page: str, max_chunk_size: int, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(page, max_chunk_size)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sentences', default='2000,20000,100000', help='comma-separated page lengths in sentences')
+    parser.add_argument('--max-chunk-size', type=int, default=1000)
+    parser.add_argument('--max-words', type=int, default=40, help='longest ordinary sentence, in words')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--cases', type=int, default=500, help='randomized pages for the equivalence check')
+    args = parser.parse_args()
+
+    if args.cases:
+        check_equivalence(args.cases)
+
+    rng = random.Random(1)
+    print(f"{'sentences':>9} {'chars':>10} {'chunks':>7} {'legacy':>9} {'prefix-sum':>10} {'speedup':>7}")
+    for count in (int(n) for n in args.sentences.split(',')):
+        page = synthetic_page(rng, count, args.max_words)
+        chunks = chunk_page_text(page, args.max_chunk_size)
+        legacy = best_time(legacy_chunk_page_text, page, args.max_chunk_size, args.repeat)
+        current = best_time(chunk_page_text, page, args.max_chunk_size, args.repeat)
+        print(f"{count:9d} {len(page):10d} {len(chunks):7d} {legacy * 1000:7.1f}ms {current * 1000:8.1f}ms "
+              f"{legacy / current:6.2f}x")
+
+
+if __name__ == '__main__':
+    main()
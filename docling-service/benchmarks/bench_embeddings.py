@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Embedding Throughput Benchmark
+Compares one-call-per-chunk embedding against VectorService.generate_embeddings
+using a local fake Cohere server with configurable latency (no API key needed)
+
+Usage: python benchmarks/bench_embeddings.py [--chunks 500] [--latency-ms 80]
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cohere
+from vector_service import VectorService
+
+DIMENSION = 1536
+
+
+class FakeCohereHandler(BaseHTTPRequestHandler):
+    """Answers POST /v1/embed like Cohere, sleeping latency + per-input time"""
+
+    latency = 0.08
+    per_input_latency = 0.0005
+    calls = 0
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get('content-length', 0))))
+        inputs = body.get('texts') or body.get('images') or []
+        FakeCohereHandler.calls += 1
+        time.sleep(self.latency + self.per_input_latency * len(inputs))
+
+        payload = json.dumps({
+            'id': 'bench',
+            'response_type': 'embeddings_by_type',
+            'embeddings': {'float': [[random.random() for _ in range(DIMENSION)] for _ in inputs]},
+            'texts': body.get('texts') or [],
+            'meta': {'api_version': {'version': '1'}},
+        }).encode('utf-8')
+
+        self.send_response(200)
+        self.send_header('content-type', 'application/json')
+        self.send_header('content-length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_service(base_url: str) -> VectorService:
+    # Skip __init__ so no Pinecone credentials are required
+    service = VectorService.__new__(VectorService)
+    service.cohere_client = cohere.Client(api_key='benchmark', base_url=base_url)
+    return service
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--chunks', type=int, default=500)
+    parser.add_argument('--latency-ms', type=float, default=80)
+    parser.add_argument('--with-sleep', action='store_true',
+                        help='include the old 0.15s sleep after every per-chunk call')
+    args = parser.parse_args()
+
+    FakeCohereHandler.latency = args.latency_ms / 1000
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeCohereHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    service = make_service(f'http://127.0.0.1:{server.server_port}')
+
+    texts = [f"Chunk {i}: " + ' '.join(random.choice(['flow', 'pressure', 'heat', 'field', 'entropy']) for _ in range(150))
+             for i in range(args.chunks)]
+
+    # Per-chunk path (previous store_chunks behaviour)
+    FakeCohereHandler.calls = 0
+    start = time.perf_counter()
+    for text in texts:
+        service.generate_text_embedding(text)
+        if args.with_sleep:
+            time.sleep(0.15)
+    per_chunk_seconds = time.perf_counter() - start
+    per_chunk_calls = FakeCohereHandler.calls
+
+    # Batched path
+    FakeCohereHandler.calls = 0
+    start = time.perf_counter()
+    embeddings = asyncio.run(service.generate_embeddings([{'kind': 'text', 'value': text} for text in texts]))
+    batched_seconds = time.perf_counter() - start
+    batched_calls = FakeCohereHandler.calls
+    assert all(embedding is not None for embedding in embeddings)
+
+    server.shutdown()
+
+    print(f"chunks={args.chunks} latency={args.latency_ms}ms sleep={'on' if args.with_sleep else 'off'}")
+    print(f"per-chunk: {per_chunk_calls:5d} calls {per_chunk_seconds:8.2f}s {args.chunks / per_chunk_seconds:8.1f} chunks/s")
+    print(f"batched:   {batched_calls:5d} calls {batched_seconds:8.2f}s {args.chunks / batched_seconds:8.1f} chunks/s")
+    print(f"speedup:   {per_chunk_seconds / batched_seconds:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Picture Encoding Benchmark
+CPU time and peak memory of the per-picture encode/decode work in the image pipeline:
+the previous extract_image_from_picture/process_single_image steps on base64 strings (before)
+vs the same steps on an EncodedImage carried through (after)
+
+Pictures come from a directory of images, or a synthetic picture-heavy slide deck (default)
+Network calls are left out, as are steps the previous pipeline didn't have (perceptual hash, classifier, vision cache)
+
+Usage: python benchmarks/bench_picture_encoding.py [--slides 60] [--pictures-per-slide 3] [--images DIR]
+"""
+
+import io
+import os
+import sys
+import time
+import base64
+import random
+import hashlib
+import argparse
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image, ImageDraw
+
+from image_encoding import EncodedImage
+
+
+def synthetic_deck(slides: int, per_slide: int):
+    """Charts, screenshots-like noise blocks and a repeated logo on every slide"""
+    rng = random.Random(0)
+    logo = Image.new('RGB', (160, 60), 'white')
+    ImageDraw.Draw(logo).ellipse([10, 10, 50, 50], fill='navy')
+    pictures = []
+    for _ in range(slides):
+        pictures.append(logo)
+        for _ in range(per_slide - 1):
+            image = Image.new('RGB', (960, 540), 'white')
+            draw = ImageDraw.Draw(image)
+            for x in range(60, 900, 40):
+                height = rng.randint(20, 450)
+                draw.rectangle([x, 500 - height, x + 28, 500], fill=(rng.randint(0, 255), 90, 160))
+            noise = Image.frombytes('RGB', (240, 160), rng.randbytes(240 * 160 * 3))
+            image.paste(noise, (700, 20))
+            pictures.append(image)
+    return pictures
+
+
+def load_images(directory: str):
+    pictures = []
+    for name in sorted(os.listdir(directory)):
+        try:
+            with Image.open(os.path.join(directory, name)) as image:
+                pictures.append(image.convert('RGB'))
+        except OSError:
+            continue
+    return pictures
+
+
+def pipeline_before(pictures):
+    """
+    The previous pipeline step for step: one PNG save and b64encode (extract_image_from_picture),
+    one b64decode to validate, then the base64 text sent to vision, and MD5 of it plus one b64decode to upload
+    """
+    records = []
+    for picture in pictures:
+        buffer = io.BytesIO()
+        picture.save(buffer, format='PNG')
+        img_bytes = buffer.getvalue()
+        image_data = base64.b64encode(img_bytes).decode('utf-8')
+        decoded_bytes = base64.b64decode(image_data)
+        if len(decoded_bytes) < 100:
+            continue
+        records.append(image_data)
+
+    # All image_data strings stay in valid_images until every image is processed
+    for image_data in records:
+        vision_payload = image_data
+        key = hashlib.md5(image_data.encode()).hexdigest()[:16]
+        body = base64.b64decode(image_data)
+        del vision_payload, key, body
+    return len(records)
+
+
+def pipeline_after(pictures):
+    """The same steps reading EncodedImage attributes, releasing each picture when done"""
+    records = []
+    for picture in pictures:
+        image = EncodedImage.from_pil(picture)
+        if len(image) < 100:
+            continue
+        records.append(image)
+
+    for i, image in enumerate(records):
+        vision_payload = image.base64
+        key = image.storage_hash
+        body = image.data
+        del vision_payload, key, body, image
+        # The pipeline drops each picture once its chunk is built
+        records[i] = None
+    return len(records)
+
+
+def measure(pipeline, pictures):
+    tracemalloc.start()
+    cpu_start, wall_start = time.process_time(), time.perf_counter()
+    count = pipeline(pictures)
+    cpu, wall = time.process_time() - cpu_start, time.perf_counter() - wall_start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return count, cpu, wall, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--slides', type=int, default=60)
+    parser.add_argument('--pictures-per-slide', type=int, default=3)
+    parser.add_argument('--images', help='directory of images to use instead of the synthetic deck')
+    args = parser.parse_args()
+
+    pictures = load_images(args.images) if args.images else synthetic_deck(args.slides, args.pictures_per_slide)
+    print(f"{len(pictures)} pictures")
+
+    results = {}
+    for name, pipeline in (('before', pipeline_before), ('after', pipeline_after)):
+        count, cpu, wall, peak = results[name] = measure(pipeline, pictures)
+        print(f"{name:>6}: {count} pictures, cpu {cpu:.2f}s, wall {wall:.2f}s, peak memory {peak / 1024 / 1024:.1f} MB")
+
+    before, after = results['before'], results['after']
+    print(f"cpu {before[1] / max(after[1], 1e-9):.2f}x less, peak memory {before[3] / max(after[3], 1):.2f}x less")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Logo Classifier Evaluation
+Scores image_classifier against a labelled sample set and sweeps the confidence threshold
+
+Samples are either a directory with decorative/ and content/ subdirectories of images,
+or a JSONL file of {"path": ..., "label": "decorative"|"content", "position": {"left", "right", "top", "bottom"}}
+(position is the picture's bbox as page fractions and is optional)
+
+Usage: python benchmarks/eval_logo_classifier.py SAMPLES [--threshold 0.9] [--show-errors]
+"""
+
+import os
+import sys
+import json
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from image_classifier import image_features, decorative_confidence, may_be_decorative, LOGO_CLASSIFIER_THRESHOLD
+
+LABELS = ('decorative', 'content')
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.webp', '.gif', '.bmp')
+
+
+def load_samples(source: str):
+    samples = []
+    if os.path.isdir(source):
+        for label in LABELS:
+            directory = os.path.join(source, label)
+            if not os.path.isdir(directory):
+                continue
+            for name in sorted(os.listdir(directory)):
+                if name.lower().endswith(IMAGE_EXTENSIONS):
+                    samples.append({'path': os.path.join(directory, name), 'label': label})
+    else:
+        base = os.path.dirname(os.path.abspath(source))
+        with open(source) as f:
+            for line in f:
+                if line.strip():
+                    sample = json.loads(line)
+                    sample['path'] = os.path.join(base, sample['path'])
+                    samples.append(sample)
+    return samples
+
+
+def score(results, threshold: float):
+    tp = sum(1 for r in results if r['label'] == 'decorative' and r['confidence'] >= threshold)
+    fp = sum(1 for r in results if r['label'] == 'content' and r['confidence'] >= threshold)
+    fn = sum(1 for r in results if r['label'] == 'decorative' and r['confidence'] < threshold)
+    tn = len(results) - tp - fp - fn
+    return {
+        'tp': tp, 'fp': fp, 'fn': fn, 'tn': tn,
+        'precision': tp / (tp + fp) if tp + fp else 1.0,
+        'recall': tp / (tp + fn) if tp + fn else 0.0,
+        # Share of all pictures that would skip the vision API
+        'skipped': (tp + fp) / len(results) if results else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('samples', help='sample directory or JSONL file')
+    parser.add_argument('--threshold', type=float, default=LOGO_CLASSIFIER_THRESHOLD)
+    parser.add_argument('--show-errors', action='store_true', help='list misclassified samples')
+    args = parser.parse_args()
+
+    samples = load_samples(args.samples)
+    if not samples:
+        sys.exit(f"No samples found in {args.samples}")
+
+    results = []
+    for sample in samples:
+        with open(sample['path'], 'rb') as f:
+            features = image_features(f.read(), sample.get('position'))
+        # Pictures the classifier never labels decorative score 0, as in LogoClassifier.classify
+        confidence = decorative_confidence(features) if may_be_decorative(features) else 0.0
+        results.append({**sample, 'confidence': confidence, 'features': features})
+
+    counts = {label: sum(1 for r in results if r['label'] == label) for label in LABELS}
+    print(f"samples={len(results)} decorative={counts['decorative']} content={counts['content']}")
+    print()
+    print(f"{'threshold':>9} {'precision':>9} {'recall':>7} {'skipped':>7} {'fp':>4} {'fn':>4}")
+    for threshold in sorted({0.5, 0.6, 0.7, 0.8, 0.85, 0.9, 0.95, args.threshold}):
+        s = score(results, threshold)
+        marker = ' <' if threshold == args.threshold else ''
+        print(f"{threshold:9.2f} {s['precision']:9.3f} {s['recall']:7.3f} {s['skipped']:7.3f} {s['fp']:4d} {s['fn']:4d}{marker}")
+
+    if args.show_errors:
+        print()
+        for r in results:
+            predicted = 'decorative' if r['confidence'] >= args.threshold else 'content'
+            if predicted != r['label']:
+                stats = ' '.join(f"{k}={v:.3f}" for k, v in r['features'].items())
+                print(f"{r['label']:>10} -> {predicted:<10} {r['confidence']:.3f} {r['path']}  {stats}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,198 @@
+"""
+Docling Conversion Cache
+Content-addressed store of doc.export_to_dict() results so identical files skip Docling
+"""
+
+import os
+import gzip
+import json
+import logging
+import tempfile
+import threading
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+from converter_pool import profile_fingerprint, DEFAULT_PROFILE
+
+logger = logging.getLogger(__name__)
+
+CONVERSION_CACHE_ENABLED = os.getenv('CONVERSION_CACHE_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+CONVERSION_CACHE_DIR = os.getenv('CONVERSION_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'docling-conversion-cache'))
+# Local cache size budget; least recently used entries are evicted beyond it
+CONVERSION_CACHE_MAX_MB = int(os.getenv('CONVERSION_CACHE_MAX_MB', '2048'))
+# Also keep entries in R2 so they survive instance restarts and are shared between instances
+CONVERSION_CACHE_R2 = os.getenv('CONVERSION_CACHE_R2', 'false').lower() in ('1', 'true', 'yes')
+CONVERSION_CACHE_R2_PREFIX = 'docling-cache/'
+
+
+class ConversionCache:
+    """Gzipped JSON cache of Docling conversions keyed by content hash + pipeline fingerprint"""
+
+    def __init__(self, cache_dir: str = CONVERSION_CACHE_DIR, max_bytes: int = CONVERSION_CACHE_MAX_MB * 1024 * 1024,
+                 r2_client=None, r2_bucket: Optional[str] = None):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.r2_client = r2_client if r2_bucket else None
+        self.r2_bucket = r2_bucket
+        self._lock = threading.Lock()
+        self._stats = {
+            'hits': 0,
+            'r2_hits': 0,
+            'misses': 0,
+            'stores': 0,
+            'evictions': 0,
+            'errors': 0,
+        }
+
+    @staticmethod
+    def cache_key(content_hash: str, profile: str = DEFAULT_PROFILE) -> str:
+        return f"{content_hash}-{profile_fingerprint(profile)}"
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json.gz"
+
+    def _count(self, stat: str, amount: int = 1) -> None:
+        with self._lock:
+            self._stats[stat] += amount
+
+    def get(self, content_hash: str, profile: str = DEFAULT_PROFILE) -> Optional[Dict[str, Any]]:
+        """Return the cached document dict, or None on a miss"""
+        key = self.cache_key(content_hash, profile)
+        path = self._path(key)
+
+        try:
+            if path.exists():
+                data = path.read_bytes()
+                os.utime(path)  # Mark as recently used
+                self._count('hits')
+                return json.loads(gzip.decompress(data))
+
+            if self.r2_client:
+                data = self._get_from_r2(key)
+                if data is not None:
+                    self._write_local(key, data)
+                    self._count('r2_hits')
+                    return json.loads(gzip.decompress(data))
+
+        except Exception as e:
+            logger.warning(f"Conversion cache read failed for {key}: {e}")
+            self._count('errors')
+
+        self._count('misses')
+        return None
+
+    def put(self, content_hash: str, doc_dict: Dict[str, Any], profile: str = DEFAULT_PROFILE) -> None:
+        """Store a document dict under its content hash"""
+        key = self.cache_key(content_hash, profile)
+        try:
+            data = gzip.compress(json.dumps(doc_dict).encode('utf-8'), compresslevel=6)
+            self._write_local(key, data)
+            if self.r2_client:
+                self.r2_client.put_object(
+                    Bucket=self.r2_bucket,
+                    Key=f"{CONVERSION_CACHE_R2_PREFIX}{key}.json.gz",
+                    Body=data,
+                    ContentType='application/gzip'
+                )
+            self._count('stores')
+            logger.info(f"Cached conversion {key} ({len(data)} bytes compressed)")
+        except Exception as e:
+            logger.warning(f"Conversion cache write failed for {key}: {e}")
+            self._count('errors')
+
+    def _get_from_r2(self, key: str) -> Optional[bytes]:
+        try:
+            response = self.r2_client.get_object(Bucket=self.r2_bucket, Key=f"{CONVERSION_CACHE_R2_PREFIX}{key}.json.gz")
+            return response['Body'].read()
+        except self.r2_client.exceptions.NoSuchKey:
+            return None
+
+    def _write_local(self, key: str, data: bytes) -> None:
+        # Write to a temp file first so readers never see a partial entry
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as tmp:
+            tmp.write(data)
+        os.replace(tmp_path, self._path(key))
+        self._evict()
+
+    def _evict(self) -> None:
+        """Remove least recently used entries until the cache fits in max_bytes"""
+        entries = []
+        total = 0
+        for path in self.cache_dir.glob('*.json.gz'):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+
+        if total <= self.max_bytes:
+            return
+
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                path.unlink()
+                total -= size
+                self._count('evictions')
+            except FileNotFoundError:
+                pass
+
+    def purge(self, content_hash: Optional[str] = None) -> int:
+        """Delete all entries (or only those for one content hash), returns local entries removed"""
+        pattern = f"{content_hash}-*.json.gz" if content_hash else '*.json.gz'
+        removed = 0
+        for path in self.cache_dir.glob(pattern):
+            try:
+                path.unlink()
+                removed += 1
+            except FileNotFoundError:
+                pass
+
+        if self.r2_client:
+            prefix = f"{CONVERSION_CACHE_R2_PREFIX}{content_hash or ''}"
+            paginator = self.r2_client.get_paginator('list_objects_v2')
+            for page in paginator.paginate(Bucket=self.r2_bucket, Prefix=prefix):
+                objects = [{'Key': obj['Key']} for obj in page.get('Contents', [])]
+                if objects:
+                    self.r2_client.delete_objects(Bucket=self.r2_bucket, Delete={'Objects': objects})
+
+        logger.info(f"Purged {removed} conversion cache entries" + (f" for {content_hash}" if content_hash else ''))
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of cache counters"""
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats['hits'] + stats['r2_hits'] + stats['misses']
+        stats['hit_rate'] = round((stats['hits'] + stats['r2_hits']) / lookups, 4) if lookups else None
+        stats['entries'] = sum(1 for _ in self.cache_dir.glob('*.json.gz'))
+        stats['r2_backend'] = self.r2_client is not None
+        return stats
+
+
+# Global cache instance
+conversion_cache: Optional[ConversionCache] = None
+
+def init_conversion_cache(r2_client=None, r2_bucket: Optional[str] = None) -> Optional[ConversionCache]:
+    """Create the process-wide cache (R2 backend only used when CONVERSION_CACHE_R2 is set)"""
+    global conversion_cache
+    if not CONVERSION_CACHE_ENABLED:
+        logger.info("Conversion cache disabled")
+        return None
+
+    if CONVERSION_CACHE_R2 and r2_client:
+        conversion_cache = ConversionCache(r2_client=r2_client, r2_bucket=r2_bucket)
+    else:
+        conversion_cache = ConversionCache()
+    logger.info(f"✅ Conversion cache at {conversion_cache.cache_dir} (R2 backend: {conversion_cache.r2_client is not None})")
+    return conversion_cache
+
+def get_conversion_cache() -> Optional[ConversionCache]:
+    """Return the process-wide cache, or None when caching is disabled"""
+    if conversion_cache is None and CONVERSION_CACHE_ENABLED:
+        return init_conversion_cache()
+    return conversion_cache
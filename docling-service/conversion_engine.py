@@ -0,0 +1,252 @@
+"""
+Docling Conversion Engine
+Runs converter.convert() in a pool of worker processes so the event loop stays responsive
+"""
+
+import os
+import asyncio
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Any, Optional, Tuple
+
+from converter_pool import get_converter_pool, DEFAULT_PROFILE
+from pdf_sharding import count_pdf_pages, plan_shards, merge_docling_dicts
+
+logger = logging.getLogger(__name__)
+
+# Number of conversion worker processes (0 = convert in a thread of the API process)
+CONVERSION_WORKERS = int(os.getenv('CONVERSION_WORKERS', '1'))
+# Recycle a worker process after it has converted this many documents (0 = never)
+CONVERSION_WORKER_MAX_TASKS = int(os.getenv('CONVERSION_WORKER_MAX_TASKS', '20'))
+# Address-space cap per worker process in MB (0 = unlimited)
+CONVERSION_WORKER_MAX_MEMORY_MB = int(os.getenv('CONVERSION_WORKER_MAX_MEMORY_MB', '0'))
+# Split PDFs longer than this many pages into shards converted in parallel (0 = never shard; needs parallelism > 1)
+CONVERSION_SHARD_PAGES = int(os.getenv('CONVERSION_SHARD_PAGES', '50'))
+# Maximum shards of a single document converted at the same time (defaults to the worker count)
+CONVERSION_SHARD_PARALLELISM = int(os.getenv('CONVERSION_SHARD_PARALLELISM', str(max(1, CONVERSION_WORKERS))))
+
+
+def _init_worker(max_memory_mb: int) -> None:
+    """Worker process initializer: apply memory cap and load models once"""
+    logging.basicConfig(level=logging.INFO)
+
+    if max_memory_mb > 0:
+        try:
+            import resource
+            limit = max_memory_mb * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+        except (ImportError, ValueError, OSError) as e:
+            logger.warning(f"Could not apply worker memory cap of {max_memory_mb}MB: {e}")
+
+    get_converter_pool().warm_up()
+
+
+def _ping() -> Tuple[int, Dict[str, Any]]:
+    """No-op task used to spawn worker processes ahead of the first document; reports the warmed-up pool"""
+    return os.getpid(), get_converter_pool().stats()
+
+
+def _convert_in_worker(path: str, profile: str,
+                       page_range: Optional[Tuple[int, int]] = None) -> Tuple[Dict[str, Any], int, Dict[str, Any]]:
+    """
+    Convert a document (or an inclusive page range of it) inside a worker process and return it as a dict,
+    with the worker's pid and converter pool stats (the pool lives in the worker, not the API process)
+    """
+    kwargs = {'page_range': page_range} if page_range else {}
+    pool = get_converter_pool()
+    with pool.converter(profile) as converter:
+        result = converter.convert(path, **kwargs)
+    return result.document.export_to_dict(), os.getpid(), pool.stats()
+
+
+class ConversionEngine:
+    """Submits Docling conversions to a ProcessPoolExecutor of pre-loaded workers"""
+
+    def __init__(self, workers: int = CONVERSION_WORKERS,
+                 max_tasks_per_worker: int = CONVERSION_WORKER_MAX_TASKS,
+                 max_memory_mb: int = CONVERSION_WORKER_MAX_MEMORY_MB,
+                 shard_pages: int = CONVERSION_SHARD_PAGES,
+                 shard_parallelism: int = CONVERSION_SHARD_PARALLELISM):
+        self.workers = max(0, workers)
+        self.shard_pages = max(0, shard_pages)
+        self.shard_parallelism = max(1, shard_parallelism)
+        self.max_tasks_per_worker = max_tasks_per_worker if max_tasks_per_worker > 0 else None
+        self.max_memory_mb = max_memory_mb
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._stats = {
+            'submitted': 0,
+            'completed': 0,
+            'failed': 0,
+            'in_flight': 0,
+            'pool_restarts': 0,
+            'sharded_documents': 0,
+            'shards': 0,
+            'convert_seconds': 0.0,
+        }
+        # Latest converter pool stats reported by each worker process, by pid
+        self._worker_pools: Dict[int, Dict[str, Any]] = {}
+
+    def _create_executor(self) -> ProcessPoolExecutor:
+        # spawn (not fork) so workers never inherit the event loop or open sockets,
+        # and because max_tasks_per_child is incompatible with fork
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+            initargs=(self.max_memory_mb,),
+            max_tasks_per_child=self.max_tasks_per_worker,
+        )
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = self._create_executor()
+            return self._executor
+
+    def _reset_executor(self, broken: ProcessPoolExecutor) -> None:
+        """Replace a broken pool (e.g. a worker killed by its memory cap)"""
+        with self._lock:
+            if self._executor is broken:
+                self._executor = None
+                self._stats['pool_restarts'] += 1
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    def _record_pool_stats(self, pid: int, pool_stats: Dict[str, Any]) -> None:
+        with self._lock:
+            self._worker_pools[pid] = pool_stats
+
+    def _record_ping(self, future) -> None:
+        if not future.cancelled() and future.exception() is None:
+            self._record_pool_stats(*future.result())
+
+    def start(self) -> None:
+        """Spawn and pre-warm workers (or the in-process pool when workers=0)"""
+        if self.workers == 0:
+            threading.Thread(target=get_converter_pool().warm_up, daemon=True).start()
+            logger.info("Conversion engine running in-process")
+            return
+
+        executor = self._get_executor()
+        for _ in range(self.workers):
+            executor.submit(_ping).add_done_callback(self._record_ping)
+        logger.info(f"✅ Conversion engine started with {self.workers} worker processes "
+                    f"(recycle after {self.max_tasks_per_worker or 'unlimited'} docs, "
+                    f"memory cap {self.max_memory_mb or 'unlimited'}MB)")
+
+    def shutdown(self) -> None:
+        """Stop worker processes"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+            logger.info("Conversion engine stopped")
+
+    async def convert(self, path: str, profile: str = DEFAULT_PROFILE,
+                      page_range: Optional[Tuple[int, int]] = None) -> Dict[str, Any]:
+        """Convert a document off the event loop and return doc.export_to_dict()"""
+        with self._lock:
+            self._stats['submitted'] += 1
+            self._stats['in_flight'] += 1
+
+        start = time.time()
+        try:
+            if self.workers == 0:
+                doc_dict, _, _ = await asyncio.to_thread(_convert_in_worker, path, profile, page_range)
+            else:
+                executor = self._get_executor()
+                try:
+                    future = executor.submit(_convert_in_worker, path, profile, page_range)
+                    doc_dict, pid, pool_stats = await asyncio.wrap_future(future)
+                except BrokenProcessPool:
+                    self._reset_executor(executor)
+                    raise RuntimeError("Conversion worker crashed (possibly exceeded its memory cap)")
+                self._record_pool_stats(pid, pool_stats)
+
+            with self._lock:
+                self._stats['completed'] += 1
+                self._stats['convert_seconds'] += time.time() - start
+            return doc_dict
+
+        except Exception:
+            with self._lock:
+                self._stats['failed'] += 1
+            raise
+        finally:
+            with self._lock:
+                self._stats['in_flight'] -= 1
+
+    async def convert_sharded(self, path: str, profile: str = DEFAULT_PROFILE) -> Dict[str, Any]:
+        """
+        Convert a document, splitting long PDFs into page-range shards that run on
+        separate workers and merging the shard dicts back into one document
+        """
+        # Sharding only pays off when shards actually run side by side
+        if not self.shard_pages or self.shard_parallelism <= 1 or not path.lower().endswith('.pdf'):
+            return await self.convert(path, profile)
+
+        total_pages = await asyncio.to_thread(count_pdf_pages, path)
+        if not total_pages or total_pages <= self.shard_pages:
+            return await self.convert(path, profile)
+
+        shards = plan_shards(total_pages, self.shard_pages)
+        logger.info(f"Sharding {total_pages}-page PDF into {len(shards)} shards of up to "
+                    f"{self.shard_pages} pages ({self.shard_parallelism} in parallel)")
+        with self._lock:
+            self._stats['sharded_documents'] += 1
+            self._stats['shards'] += len(shards)
+
+        semaphore = asyncio.Semaphore(self.shard_parallelism)
+
+        async def convert_shard(page_range: Tuple[int, int]):
+            async with semaphore:
+                return page_range[0], await self.convert(path, profile, page_range)
+
+        shard_dicts = await asyncio.gather(*[convert_shard(page_range) for page_range in shards])
+        return merge_docling_dicts(shard_dicts)
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of engine counters, including queue depth"""
+        with self._lock:
+            stats = dict(self._stats)
+        stats['workers'] = self.workers
+        # Conversions waiting for a free worker process (threads never queue in-process)
+        stats['queue_depth'] = max(0, stats['in_flight'] - self.workers) if self.workers else 0
+        return stats
+
+    def pool_stats(self) -> Dict[str, Any]:
+        """
+        Converter pool counters summed over the worker processes, as of each one's last task
+        (including recycled workers, so hits, misses and warm-ups are cumulative)
+        """
+        if self.workers == 0:
+            return get_converter_pool().stats()
+
+        with self._lock:
+            snapshots = list(self._worker_pools.values())
+        totals: Dict[str, Any] = {'hits': 0, 'misses': 0, 'discarded': 0, 'converters_built': 0,
+                                  'build_seconds': 0.0, 'warmups': 0, 'warmup_seconds': 0.0}
+        for snapshot in snapshots:
+            for name in totals:
+                totals[name] += snapshot.get(name, 0)
+        totals['build_seconds'] = round(totals['build_seconds'], 3)
+        totals['warmup_seconds'] = round(totals['warmup_seconds'], 3)
+        lookups = totals['hits'] + totals['misses']
+        totals['hit_rate'] = round(totals['hits'] / lookups, 4) if lookups else None
+        totals['workers_reporting'] = len(snapshots)
+        return totals
+
+
+# Global engine instance
+conversion_engine: Optional[ConversionEngine] = None
+
+def get_conversion_engine() -> ConversionEngine:
+    """Return the process-wide conversion engine, creating it on first use"""
+    global conversion_engine
+    if conversion_engine is None:
+        conversion_engine = ConversionEngine()
+    return conversion_engine
@@ -0,0 +1,185 @@
+"""
+Docling Converter Pool
+Keeps warm DocumentConverter instances so layout/table/OCR models load once per process
+"""
+
+import os
+import json
+import hashlib
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Any, Optional
+
+try:
+    from docling.document_converter import DocumentConverter, PdfFormatOption
+    from docling.datamodel.base_models import InputFormat
+    from docling.datamodel.pipeline_options import PdfPipelineOptions
+except ImportError:
+    DocumentConverter = None
+
+logger = logging.getLogger(__name__)
+
+# Render scale of extracted pictures (1.0 = 72 dpi); pictures are re-encoded per destination afterwards
+DOCLING_IMAGES_SCALE = float(os.getenv('DOCLING_IMAGES_SCALE', '2.0'))
+
+# Pipeline option profiles - each profile gets its own set of warm converters
+PIPELINE_PROFILES: Dict[str, Dict[str, Any]] = {
+    'default': {
+        'do_ocr': True,  # Enable OCR for text extraction
+        'do_table_structure': True,  # Enable table structure recognition
+        'images_scale': DOCLING_IMAGES_SCALE,  # Higher resolution for better image quality
+        'generate_page_images': False,  # We don't need full page images
+        'generate_picture_images': True,  # CRUCIAL: Enable picture image extraction
+    },
+}
+
+DEFAULT_PROFILE = 'default'
+
+# Tiny one-page PDF used to force model loading before the first real document
+WARMUP_PDF_PATH = Path(__file__).parent / 'warmup.pdf'
+
+# Maximum number of idle converters kept per profile
+CONVERTER_POOL_SIZE = int(os.getenv('CONVERTER_POOL_SIZE', '1'))
+# Comma-separated profiles to build at startup (empty disables pre-building)
+CONVERTER_POOL_PROFILES = [p.strip() for p in os.getenv('CONVERTER_POOL_PROFILES', DEFAULT_PROFILE).split(',') if p.strip()]
+# Run a conversion of WARMUP_PDF_PATH on each pre-built converter
+CONVERTER_POOL_PREWARM = os.getenv('CONVERTER_POOL_PREWARM', 'true').lower() in ('1', 'true', 'yes')
+
+
+def profile_fingerprint(profile: str = DEFAULT_PROFILE) -> str:
+    """Stable hash of a profile's pipeline options (changes whenever conversion output could change)"""
+    options = PIPELINE_PROFILES[profile]
+    return hashlib.sha256(json.dumps(options, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+
+def build_converter(profile: str = DEFAULT_PROFILE):
+    """Create a new DocumentConverter configured for the given pipeline profile"""
+    if DocumentConverter is None:
+        raise RuntimeError("Docling not available")
+    if profile not in PIPELINE_PROFILES:
+        raise ValueError(f"Unknown pipeline profile: {profile}")
+
+    pipeline_options = PdfPipelineOptions()
+    for option, value in PIPELINE_PROFILES[profile].items():
+        setattr(pipeline_options, option, value)
+
+    return DocumentConverter(
+        format_options={
+            InputFormat.PDF: PdfFormatOption(
+                pipeline_options=pipeline_options
+            )
+        }
+    )
+
+
+class ConverterPool:
+    """Process-wide pool of DocumentConverter instances keyed by pipeline profile"""
+
+    def __init__(self, max_idle_per_profile: int = CONVERTER_POOL_SIZE):
+        self.max_idle_per_profile = max(1, max_idle_per_profile)
+        self._idle: Dict[str, List[Any]] = {}
+        self._lock = threading.Lock()
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'checked_out': 0,
+            'discarded': 0,
+            'converters_built': 0,
+            'build_seconds': 0.0,
+            'warmups': 0,
+            'warmup_seconds': 0.0,
+        }
+
+    def _build(self, profile: str):
+        start = time.time()
+        converter = build_converter(profile)
+        elapsed = time.time() - start
+        with self._lock:
+            self._stats['converters_built'] += 1
+            self._stats['build_seconds'] += elapsed
+        logger.info(f"Built Docling converter for profile '{profile}' in {elapsed:.2f}s")
+        return converter
+
+    def checkout(self, profile: str = DEFAULT_PROFILE):
+        """Take a converter out of the pool, building a new one on a miss"""
+        with self._lock:
+            idle = self._idle.get(profile)
+            converter = idle.pop() if idle else None
+            self._stats['hits' if converter is not None else 'misses'] += 1
+            self._stats['checked_out'] += 1
+
+        if converter is None:
+            try:
+                converter = self._build(profile)
+            except Exception:
+                with self._lock:
+                    self._stats['checked_out'] -= 1
+                raise
+
+        return converter
+
+    def release(self, profile: str, converter) -> None:
+        """Return a converter to the pool (dropped if the profile already has enough idle ones)"""
+        with self._lock:
+            self._stats['checked_out'] -= 1
+            idle = self._idle.setdefault(profile, [])
+            if len(idle) < self.max_idle_per_profile:
+                idle.append(converter)
+            else:
+                self._stats['discarded'] += 1
+
+    @contextmanager
+    def converter(self, profile: str = DEFAULT_PROFILE):
+        """Context manager for checkout/return of a converter"""
+        converter = self.checkout(profile)
+        try:
+            yield converter
+        finally:
+            self.release(profile, converter)
+
+    def warm_up(self, profiles: Optional[List[str]] = None, prewarm: bool = CONVERTER_POOL_PREWARM) -> None:
+        """Build one converter per profile and optionally run the bundled PDF through it"""
+        for profile in profiles if profiles is not None else CONVERTER_POOL_PROFILES:
+            start = time.time()
+            try:
+                converter = self._build(profile)
+                if prewarm and WARMUP_PDF_PATH.exists():
+                    converter.convert(str(WARMUP_PDF_PATH))
+            except Exception as e:
+                logger.error(f"❌ Failed to warm up converter for profile '{profile}': {e}")
+                continue
+
+            elapsed = time.time() - start
+            with self._lock:
+                self._stats['warmups'] += 1
+                self._stats['warmup_seconds'] += elapsed
+                # Counted as checked out until release() hands it to the idle list
+                self._stats['checked_out'] += 1
+            self.release(profile, converter)
+            logger.info(f"✅ Converter for profile '{profile}' warmed up in {elapsed:.2f}s")
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of pool counters"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['idle'] = {profile: len(idle) for profile, idle in self._idle.items()}
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 4) if lookups else None
+        return stats
+
+
+# Global pool instance
+converter_pool: Optional[ConverterPool] = None
+_pool_lock = threading.Lock()
+
+def get_converter_pool() -> ConverterPool:
+    """Return the process-wide converter pool, creating it on first use"""
+    global converter_pool
+    if converter_pool is None:
+        with _pool_lock:
+            if converter_pool is None:
+                converter_pool = ConverterPool()
+    return converter_pool
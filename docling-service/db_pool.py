@@ -0,0 +1,91 @@
+"""
+Async PostgreSQL Connection Pool
+Bounded psycopg2 connection pool whose queries run in threads, off the event loop
+"""
+
+import time
+import asyncio
+import logging
+from typing import Dict, Any, Callable
+
+import psycopg2
+from psycopg2.extras import RealDictCursor
+from psycopg2.pool import ThreadedConnectionPool
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncConnectionPool:
+    """Runs blocking psycopg2 work on pooled connections without blocking the event loop"""
+
+    def __init__(self, database_url: str, min_size: int = 1, max_size: int = 5):
+        self.max_size = max(1, max_size)
+        self._pool = ThreadedConnectionPool(
+            min(max(0, min_size), self.max_size), self.max_size,
+            database_url, cursor_factory=RealDictCursor
+        )
+        # ThreadedConnectionPool raises instead of blocking when exhausted, so callers queue here
+        self._slots = asyncio.Semaphore(self.max_size)
+        self._stats = {
+            'acquired': 0,
+            'in_use': 0,
+            'waiting': 0,
+            'peak_in_use': 0,
+            'saturated_acquires': 0,
+            'wait_seconds': 0.0,
+            'errors': 0,
+        }
+
+    def _run_with_connection(self, func: Callable, args, kwargs):
+        conn = self._pool.getconn()
+        broken = False
+        try:
+            return func(conn, *args, **kwargs)
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            broken = True
+            raise
+        except Exception:
+            try:
+                conn.rollback()
+            except Exception:
+                broken = True
+            raise
+        finally:
+            self._pool.putconn(conn, close=broken or conn.closed != 0)
+
+    async def run(self, func: Callable, *args, **kwargs):
+        """Call func(conn, *args, **kwargs) on a pooled connection in a worker thread"""
+        if self._slots.locked():
+            self._stats['saturated_acquires'] += 1
+
+        self._stats['waiting'] += 1
+        start = time.monotonic()
+        try:
+            await self._slots.acquire()
+        finally:
+            self._stats['waiting'] -= 1
+        self._stats['wait_seconds'] += time.monotonic() - start
+
+        self._stats['acquired'] += 1
+        self._stats['in_use'] += 1
+        self._stats['peak_in_use'] = max(self._stats['peak_in_use'], self._stats['in_use'])
+        try:
+            return await asyncio.to_thread(self._run_with_connection, func, args, kwargs)
+        except Exception:
+            self._stats['errors'] += 1
+            raise
+        finally:
+            self._stats['in_use'] -= 1
+            self._slots.release()
+
+    def close(self):
+        """Close every pooled connection"""
+        self._pool.closeall()
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool saturation metrics"""
+        stats = dict(self._stats)
+        stats['max_size'] = self.max_size
+        stats['saturation'] = round(stats['in_use'] / self.max_size, 4)
+        stats['wait_seconds'] = round(stats['wait_seconds'], 3)
+        return stats
@@ -1,6 +1,6 @@
 """
 Database Worker for Document Processing Jobs
-Polls PostgreSQL database for queued jobs and processes them
+Listens for queued-job notifications from PostgreSQL (with a slow polling sweep as fallback) and processes them
 """
 
 import os
@@ -10,29 +10,108 @@ import psycopg2
 from psycopg2.extras import RealDictCursor
 from datetime import datetime
 from typing import Optional, Dict, Any
-import httpx
 import tempfile
+import shutil
+import time
+
+from db_pool import AsyncConnectionPool
+from downloads import stream_download
+from http_clients import get_http_client
+import job_store
+from progress_reporter import ProgressReporter
 
 logger = logging.getLogger(__name__)
 
+# Jobs processed concurrently by one instance
+WORKER_CONCURRENCY = int(os.getenv('WORKER_CONCURRENCY', '3'))
+# Jobs allowed in the CPU-bound Docling conversion stage at once (defaults to the conversion worker count)
+WORKER_CONVERSION_SLOTS = int(os.getenv('WORKER_CONVERSION_SLOTS', os.getenv('CONVERSION_WORKERS', '1')))
+# Jobs allowed in I/O-bound stages (download, vision/upload, embedding/storage) at once
+WORKER_IO_SLOTS = int(os.getenv('WORKER_IO_SLOTS', str(WORKER_CONCURRENCY)))
+# NOTIFY channel fed by the trg_doc_job_queued trigger (lib/db/migrations/0011_document_processing_job_notify.sql)
+JOB_NOTIFY_CHANNEL = 'document_processing_job'
+# Fallback sweep interval in seconds while LISTEN is active
+WORKER_FALLBACK_POLL_INTERVAL = int(os.getenv('WORKER_FALLBACK_POLL_INTERVAL', '60'))
+# Pooled connections for job claims and status updates (the LISTEN connection is separate)
+WORKER_DB_POOL_SIZE = int(os.getenv('WORKER_DB_POOL_SIZE', str(WORKER_CONCURRENCY + 2)))
+# Seconds to let in-flight jobs finish on shutdown before they are cancelled
+WORKER_SHUTDOWN_TIMEOUT = float(os.getenv('WORKER_SHUTDOWN_TIMEOUT', '30'))
+
+
+class JobSlot:
+    """Tracks what one concurrent job slot is doing and how busy it has been"""
+
+    def __init__(self, index: int):
+        self.index = index
+        self.current_job: Optional[str] = None
+        self.wakeup = asyncio.Event()
+        self.busy_since: Optional[float] = None
+        self.busy_seconds = 0.0
+        self.jobs_processed = 0
+
+    def start(self, job_id: str):
+        self.current_job = job_id
+        self.busy_since = time.monotonic()
+
+    def finish(self):
+        if self.busy_since is not None:
+            self.busy_seconds += time.monotonic() - self.busy_since
+        self.current_job = None
+        self.busy_since = None
+        self.jobs_processed += 1
+
+    def stats(self, uptime: float) -> Dict[str, Any]:
+        busy = self.busy_seconds
+        if self.busy_since is not None:
+            busy += time.monotonic() - self.busy_since
+        return {
+            'slot': self.index,
+            'current_job': self.current_job,
+            'jobs_processed': self.jobs_processed,
+            'busy_seconds': round(busy, 2),
+            'utilization': round(busy / uptime, 4) if uptime > 0 else 0.0,
+        }
+
+
 class DatabaseWorker:
     """Worker that polls database for document processing jobs"""
 
-    def __init__(self, database_url: str):
+    def __init__(self, database_url: str, concurrency: int = WORKER_CONCURRENCY):
         self.database_url = database_url
         self.running = False
-        self.poll_interval = 5  # Poll every 5 seconds
+        self.poll_interval = 5  # Poll every 5 seconds when LISTEN is unavailable
+        self.fallback_poll_interval = WORKER_FALLBACK_POLL_INTERVAL
+        self._listen_conn = None
+        self._listen_task: Optional[asyncio.Task] = None
+        self.slots = [JobSlot(i) for i in range(max(1, concurrency))]
+        self.conversion_slots = asyncio.Semaphore(max(1, WORKER_CONVERSION_SLOTS))
+        self.io_slots = asyncio.Semaphore(max(1, WORKER_IO_SLOTS))
+        self._started_at: Optional[float] = None
+        self.db_pool: Optional[AsyncConnectionPool] = None
+        self._pool_lock = asyncio.Lock()
+        self.progress = ProgressReporter(self.run_query)
 
     def get_connection(self):
-        """Get a database connection"""
+        """Get a dedicated (unpooled) database connection"""
         return psycopg2.connect(self.database_url, cursor_factory=RealDictCursor)
 
-    def get_next_job(self) -> Optional[Dict[str, Any]]:
-        """Fetch the next queued job from the database"""
-        try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
+    async def open_pool(self):
+        """Create the bounded connection pool (connecting happens in a thread)"""
+        async with self._pool_lock:
+            if self.db_pool is None:
+                self.db_pool = await asyncio.to_thread(
+                    AsyncConnectionPool, self.database_url, 1, WORKER_DB_POOL_SIZE
+                )
+                logger.info(f"Database pool ready (max {WORKER_DB_POOL_SIZE} connections)")
+
+    async def run_query(self, func, *args, **kwargs):
+        """Run func(conn, ...) on a pooled connection"""
+        await self.open_pool()
+        return await self.db_pool.run(func, *args, **kwargs)
 
+    @staticmethod
+    def _claim_next_job(conn) -> Optional[Dict[str, Any]]:
+        with conn.cursor() as cursor:
             # Get oldest queued job and mark it as processing atomically
             cursor.execute("""
                 UPDATE "DocumentProcessingJob"
@@ -52,73 +131,189 @@ class DatabaseWorker:
             """)
 
             job = cursor.fetchone()
-            conn.commit()
-            cursor.close()
-            conn.close()
+        conn.commit()
+        return dict(job) if job else None
 
-            return dict(job) if job else None
+    async def get_next_job(self) -> Optional[Dict[str, Any]]:
+        """Fetch the next queued job from the database"""
+        try:
+            return await self.run_query(self._claim_next_job)
 
         except Exception as e:
             logger.error(f"Error fetching next job: {e}")
             return None
 
-    def update_job_status(self, job_id: str, status: str, progress: int = 0,
-                          message: str = None, error_message: str = None,
-                          chunks_count: int = None, total_pages: int = None,
-                          processing_time_ms: int = None):
-        """Update job status in database"""
-        try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
+    @staticmethod
+    def _update_job(conn, job_id: str, fields: Dict[str, Any], finished: bool):
+        assignments = [f'"{column}" = %s' for column in fields] + ['"updatedAt" = NOW()']
+        if finished:
+            assignments.append('"completedAt" = NOW()')
 
-            update_fields = [
-                "status = %s",
-                "progress = %s",
-                '"updatedAt" = NOW()'
-            ]
-            params = [status, str(progress)]
+        with conn.cursor() as cursor:
+            cursor.execute(f"""
+                UPDATE "DocumentProcessingJob"
+                SET {', '.join(assignments)}
+                WHERE id = %s;
+            """, [*fields.values(), job_id])
+        conn.commit()
+
+    async def update_job_status(self, job_id: str, status: str, progress: int = 0,
+                                message: str = None, error_message: str = None,
+                                chunks_count: int = None, total_pages: int = None,
+                                processing_time_ms: int = None):
+        """Update job status in database (use self.progress.report for in-flight progress)"""
+        if status != 'processing':
+            # Drop pending progress so it can't be flushed after the final status
+            self.progress.finish(job_id)
+
+        try:
+            fields = {'status': status, 'progress': str(progress)}
 
             if message:
-                update_fields.append("message = %s")
-                params.append(message)
+                fields['message'] = message
 
             if error_message:
-                update_fields.append('"errorMessage" = %s')
-                params.append(error_message)
+                fields['errorMessage'] = error_message
 
             if chunks_count is not None:
-                update_fields.append('"chunksCount" = %s')
-                params.append(str(chunks_count))
+                fields['chunksCount'] = str(chunks_count)
 
             if total_pages is not None:
-                update_fields.append('"totalPages" = %s')
-                params.append(str(total_pages))
+                fields['totalPages'] = str(total_pages)
 
             if processing_time_ms is not None:
-                update_fields.append('"processingTimeMs" = %s')
-                params.append(str(processing_time_ms))
+                fields['processingTimeMs'] = str(processing_time_ms)
 
-            if status == 'completed' or status == 'failed':
-                update_fields.append('"completedAt" = NOW()')
-
-            params.append(job_id)
-
-            query = f"""
-                UPDATE "DocumentProcessingJob"
-                SET {', '.join(update_fields)}
-                WHERE id = %s;
-            """
-
-            cursor.execute(query, params)
-            conn.commit()
-            cursor.close()
-            conn.close()
+            await self.run_query(self._update_job, job_id, fields, status in ('completed', 'failed'))
 
             logger.info(f"Updated job {job_id}: {status} ({progress}%)")
 
         except Exception as e:
             logger.error(f"Error updating job status: {e}")
 
+    @staticmethod
+    def _insert_job(conn, values: Dict[str, Any]) -> str:
+        columns = ', '.join(f'"{column}"' for column in values)
+        placeholders = ', '.join('%s' for _ in values)
+        with conn.cursor() as cursor:
+            cursor.execute(f"""
+                INSERT INTO "DocumentProcessingJob" ({columns}, status, progress, message)
+                VALUES ({placeholders}, 'queued', '0', 'Waiting for processing...')
+                RETURNING id;
+            """, list(values.values()))
+            job_id = cursor.fetchone()['id']
+        conn.commit()
+        return str(job_id)
+
+    @staticmethod
+    def _fetch_job(conn, job_id: str) -> Optional[Dict[str, Any]]:
+        with conn.cursor() as cursor:
+            cursor.execute('SELECT * FROM "DocumentProcessingJob" WHERE id = %s;', [job_id])
+            job = cursor.fetchone()
+        return dict(job) if job else None
+
+    async def submit_job(self, path: str, filename: str, file_type: str, file_size: int,
+                         content_hash: str, user_id: Optional[str] = None) -> str:
+        """
+        Queue an uploaded file as a DocumentProcessingJob (the NOTIFY trigger wakes a worker)
+        The file is copied to R2 so whichever instance claims the job can download it
+        """
+        if not user_id:
+            raise ValueError("user_id is required when jobs are stored in PostgreSQL")
+
+        from main import upload_file_to_r2
+
+        file_extension = filename.split('.')[-1] if '.' in filename else 'pdf'
+        r2_url = await upload_file_to_r2(path, f"docling-jobs/{content_hash}.{file_extension}", file_type)
+        if not r2_url:
+            raise RuntimeError("Could not upload the file to R2 for processing")
+
+        return await self.run_query(self._insert_job, {
+            'userId': user_id,
+            'filename': filename,
+            'fileSize': str(file_size),
+            'fileType': file_type,
+            'r2Url': r2_url,
+            'contentHash': content_hash,
+        })
+
+    async def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Current row of a job, or None if it doesn't exist"""
+        return await self.run_query(self._fetch_job, job_id)
+
+    async def fetch_source(self, job: Dict[str, Any]) -> str:
+        """Download the job's file from R2 into a temp file and return its path"""
+        job_id = job['id']
+        logger.info(f"[DB Worker] ⬇️  Step 1/4: Downloading file from R2...")
+        self.progress.report(job_id, 10, 'Downloading file from R2...')
+
+        file_extension = job['filename'].split('.')[-1] if '.' in job['filename'] else 'pdf'
+
+        # Stream straight to disk, verifying the upload-time SHA-256 as bytes arrive
+        with tempfile.NamedTemporaryFile(delete=False, suffix=f'.{file_extension}') as tmp:
+            temp_path = tmp.name
+
+        try:
+            download_progress = self.progress.stage(job_id, 10, 29)
+            async with self.io_slots:
+                size, _ = await stream_download(get_http_client('downloads'), job['r2Url'], temp_path,
+                                                expected_sha256=job['contentHash'],
+                                                progress_callback=download_progress)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+        logger.info(f"[DB Worker] ✅ Downloaded {size} bytes (hash verified)")
+        return temp_path
+
+    async def store_results(self, job: Dict[str, Any], chunks: list, source: str,
+                            progress_callback=None) -> int:
+        """Embed the chunks and store them in Pinecone; returns the number stored"""
+        r2_url = job['r2Url']
+        file_type = job['fileType']
+
+        # Import and use the vector service
+        from vector_service import VectorService
+
+        vector_service = VectorService()
+        await vector_service.initialize_index()
+
+        # Convert chunks to the format expected by vector service
+        chunks_for_storage = []
+        for chunk in chunks:
+            chunk_dict = {
+                'content': chunk.content,
+                'content_type': chunk.content_type,
+                'page': chunk.page,
+                'source': source,
+                'filename': job['filename'],
+                'content_hash': job['contentHash'],
+                'type': 'pdf' if file_type == 'application/pdf' else 'image',
+                'pdf_url': r2_url,  # Add the permanent R2 URL for PDF linking
+            }
+
+            # Add optional fields
+            if chunk.coordinates:
+                chunk_dict['coordinates'] = {
+                    'x': chunk.coordinates.x,
+                    'y': chunk.coordinates.y,
+                    'width': chunk.coordinates.width,
+                    'height': chunk.coordinates.height,
+                }
+            if chunk.image_data:
+                chunk_dict['image_data'] = chunk.image_data
+            if chunk.image_url:
+                chunk_dict['image_url'] = chunk.image_url
+
+            chunks_for_storage.append(chunk_dict)
+
+        # Store all chunks
+        async with self.io_slots:
+            stored_count = await vector_service.store_chunks(chunks_for_storage, progress_callback=progress_callback)
+
+        logger.info(f"[DB Worker] ✅ Stored {stored_count} chunks in Pinecone")
+        return stored_count
+
     async def process_job(self, job: Dict[str, Any]):
         """
         Process a single job entirely in Cloud Run:
@@ -129,7 +324,7 @@ class DatabaseWorker:
         No Vercel callbacks - everything happens here!
         """
         job_id = job['id']
-        r2_url = job['r2Url']
+        r2_url = job.get('r2Url')
         filename = job['filename']
         file_type = job['fileType']
         content_hash = job['contentHash']
@@ -139,89 +334,43 @@ class DatabaseWorker:
 
         try:
             logger.info(f"[DB Worker] 🚀 Starting job {job_id}: {filename}")
-            logger.info(f"[DB Worker] 📋 Job details: type={file_type}, r2_url={r2_url[:50]}...")
-
-            # Step 1: Download file from R2
-            logger.info(f"[DB Worker] ⬇️  Step 1/4: Downloading file from R2...")
-            self.update_job_status(job_id, 'processing', 10, 'Downloading file from R2...')
-
-            async with httpx.AsyncClient(timeout=120.0) as client:
-                response = await client.get(r2_url)
-                response.raise_for_status()
-                file_content = response.content
-
-            logger.info(f"[DB Worker] ✅ Downloaded {len(file_content)} bytes")
+            logger.info(f"[DB Worker] 📋 Job details: type={file_type}, r2_url={(r2_url or '-')[:50]}...")
 
-            # Save to temporary file
-            file_extension = filename.split('.')[-1] if '.' in filename else 'pdf'
-            with tempfile.NamedTemporaryFile(delete=False, suffix=f'.{file_extension}') as tmp:
-                tmp.write(file_content)
-                tmp.flush()
-                temp_path = tmp.name
+            # Import the docling processing functions from main.py
+            from main import convert_document, load_cached_document, extract_chunks_from_json
 
-            logger.info(f"[DB Worker] ✅ Saved to temp file: {temp_path}")
+            # Identical files were already converted - reuse the cached Docling output
+            cached = await load_cached_document(content_hash)
 
-            # Step 2: Process with Docling service (local call)
-            logger.info(f"[DB Worker] 🔄 Step 2/4: Processing with Docling...")
-            self.update_job_status(job_id, 'processing', 30, 'Processing document with Docling...')
+            if cached:
+                logger.info(f"[DB Worker] ♻️  Conversion cache hit, skipping download and Docling")
+                self.progress.report(job_id, 30, 'Reusing cached document conversion...')
+                doc_dict, doc = cached
+            else:
+                # Step 1: Get the file onto local disk
+                temp_path = await self.fetch_source(job)
+                logger.info(f"[DB Worker] ✅ Saved to temp file: {temp_path}")
 
-            # Import the docling processing function from main.py
-            from main import setup_docling_converter, extract_chunks_from_json
+                # Step 2: Process with Docling service (local call)
+                logger.info(f"[DB Worker] 🔄 Step 2/4: Processing with Docling...")
+                self.progress.report(job_id, 30, 'Processing document with Docling...')
 
-            converter = setup_docling_converter()
-            result = converter.convert(temp_path)
-            doc = result.document
-            doc_dict = doc.export_to_dict()
+                async with self.conversion_slots:
+                    doc_dict, doc = await convert_document(temp_path, content_hash=content_hash)
 
             # Extract chunks with images uploaded to R2
-            chunks = await extract_chunks_from_json(doc_dict, doc, filename)
+            extract_progress = self.progress.stage(job_id, 30, 60, 'Extracting text and analyzing images...')
+            async with self.io_slots:
+                chunks = await extract_chunks_from_json(doc_dict, doc, filename, progress_callback=extract_progress)
             total_pages = len(doc_dict.get('pages', []))
 
             logger.info(f"[DB Worker] ✅ Docling extracted {len(chunks)} chunks from {total_pages} pages")
 
             # Step 3: Generate embeddings and store in Pinecone
             logger.info(f"[DB Worker] 🧠 Step 3/4: Generating embeddings and storing...")
-            self.update_job_status(job_id, 'processing', 60, 'Generating embeddings and storing in vector database...')
-
-            # Import and use the vector service
-            from vector_service import VectorService
-
-            vector_service = VectorService()
-            await vector_service.initialize_index()
-
-            # Convert chunks to the format expected by vector service
-            chunks_for_storage = []
-            for chunk in chunks:
-                chunk_dict = {
-                    'content': chunk.content,
-                    'content_type': chunk.content_type,
-                    'page': chunk.page,
-                    'source': temp_path,
-                    'filename': filename,
-                    'content_hash': content_hash,
-                    'type': 'pdf' if file_type == 'application/pdf' else 'image',
-                    'pdf_url': r2_url,  # Add the permanent R2 URL for PDF linking
-                }
-
-                # Add optional fields
-                if chunk.coordinates:
-                    chunk_dict['coordinates'] = {
-                        'x': chunk.coordinates.x,
-                        'y': chunk.coordinates.y,
-                        'width': chunk.coordinates.width,
-                        'height': chunk.coordinates.height,
-                    }
-                if chunk.image_data:
-                    chunk_dict['image_data'] = chunk.image_data
-                if chunk.image_url:
-                    chunk_dict['image_url'] = chunk.image_url
-
-                chunks_for_storage.append(chunk_dict)
+            store_progress = self.progress.stage(job_id, 60, 99, 'Generating embeddings and storing in vector database...')
 
-            # Store all chunks
-            stored_count = await vector_service.store_chunks(chunks_for_storage)
-
-            logger.info(f"[DB Worker] ✅ Stored {stored_count} chunks in Pinecone")
+            stored_count = await self.store_results(job, chunks, temp_path or r2_url, progress_callback=store_progress)
 
             # Calculate processing time
             processing_time_ms = int((datetime.now() - start_time).total_seconds() * 1000)
@@ -229,7 +378,7 @@ class DatabaseWorker:
             # Check if any chunks were actually stored
             if stored_count == 0:
                 logger.error(f"[DB Worker] ❌ No chunks were stored for job {job_id}")
-                self.update_job_status(
+                await self.update_job_status(
                     job_id,
                     'failed',
                     100,
@@ -244,7 +393,7 @@ class DatabaseWorker:
 
             # Step 4: Mark as completed
             logger.info(f"[DB Worker] ✅ Step 4/4: Finalizing...")
-            self.update_job_status(
+            await self.update_job_status(
                 job_id,
                 'completed',
                 100,
@@ -262,7 +411,7 @@ class DatabaseWorker:
             import traceback
             logger.error(f"[DB Worker] ❌ Stack trace:\n{traceback.format_exc()}")
 
-            self.update_job_status(
+            await self.update_job_status(
                 job_id,
                 'failed',
                 0,
@@ -270,62 +419,274 @@ class DatabaseWorker:
                 error_message=str(e)
             )
         finally:
-            # Clean up temp file
-            if temp_path and os.path.exists(temp_path):
-                try:
-                    logger.info(f"[DB Worker] 🧹 Cleaning up temp file: {temp_path}")
-                    os.unlink(temp_path)
-                    logger.info(f"[DB Worker] ✅ Temp file cleaned up")
-                except Exception as e:
-                    logger.warning(f"[DB Worker] ⚠️  Failed to cleanup temp file: {e}")
+            if temp_path:
+                self.release_source(temp_path)
+
+    def release_source(self, temp_path: str):
+        """Clean up the temp file fetch_source downloaded"""
+        if os.path.exists(temp_path):
+            try:
+                logger.info(f"[DB Worker] 🧹 Cleaning up temp file: {temp_path}")
+                os.unlink(temp_path)
+                logger.info(f"[DB Worker] ✅ Temp file cleaned up")
+            except Exception as e:
+                logger.warning(f"[DB Worker] ⚠️  Failed to cleanup temp file: {e}")
+
+    def _wake_slots(self):
+        for slot in self.slots:
+            slot.wakeup.set()
+
+    @property
+    def listening(self) -> bool:
+        return self._listen_conn is not None
+
+    async def start_listening(self) -> bool:
+        """Open a dedicated connection that LISTENs for queued-job notifications"""
+        try:
+            conn = await asyncio.to_thread(self.get_connection)
+            conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+            with conn.cursor() as cursor:
+                cursor.execute(f"LISTEN {JOB_NOTIFY_CHANNEL};")
+        except Exception as e:
+            logger.warning(f"LISTEN unavailable, polling every {self.poll_interval}s instead: {e}")
+            return False
+
+        self._listen_conn = conn
+        asyncio.get_running_loop().add_reader(conn.fileno(), self._on_notify)
+        logger.info(f"Listening on '{JOB_NOTIFY_CHANNEL}' (fallback sweep every {self.fallback_poll_interval}s)")
+        # Anything queued while we weren't listening is picked up right away
+        self._wake_slots()
+        return True
+
+    def _on_notify(self):
+        """Event loop reader callback - drain notifications and wake the slots"""
+        conn = self._listen_conn
+        try:
+            conn.poll()
+        except Exception as e:
+            logger.error(f"LISTEN connection lost: {e}")
+            self.stop_listening()
+            if self.running:
+                self._listen_task = asyncio.create_task(self._relisten())
+            return
+
+        if conn.notifies:
+            logger.debug(f"Received {len(conn.notifies)} job notifications")
+            conn.notifies.clear()
+            self._wake_slots()
+
+    async def _relisten(self):
+        """Reconnect the listener with backoff; slots poll at the normal interval meanwhile"""
+        delay = self.poll_interval
+        while self.running and not await self.start_listening():
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.fallback_poll_interval)
+
+    def stop_listening(self):
+        conn, self._listen_conn = self._listen_conn, None
+        if conn is None:
+            return
+        try:
+            asyncio.get_running_loop().remove_reader(conn.fileno())
+        except Exception:
+            pass
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    async def wait_for_jobs(self, slot: JobSlot):
+        """Sleep until a notification arrives or the next (fallback) poll is due"""
+        interval = self.fallback_poll_interval if self.listening else self.poll_interval
+        try:
+            await asyncio.wait_for(slot.wakeup.wait(), timeout=interval)
+        except asyncio.TimeoutError:
+            pass
 
     async def run(self):
-        """Main worker loop - polls for jobs and processes them"""
+        """Main worker loop - runs one job loop per slot, woken by NOTIFY"""
         self.running = True
-        logger.info("Database worker started, polling for jobs...")
+        self._started_at = time.monotonic()
+        self.progress.start()
+        await self.start_listening()
+        logger.info(f"Database worker started with {len(self.slots)} job slots")
 
+        try:
+            await asyncio.gather(*[self.run_slot(slot) for slot in self.slots])
+        finally:
+            if self._listen_task:
+                self._listen_task.cancel()
+            self.stop_listening()
+            await self.progress.stop()
+            if self.db_pool:
+                self.db_pool.close()
+                self.db_pool = None
+
+    async def run_slot(self, slot: JobSlot):
+        """Claim and process jobs one at a time in a single slot"""
         while self.running:
             try:
-                # Check for next job
-                job = self.get_next_job()
+                # Clear before claiming so a notification that arrives mid-claim isn't lost
+                slot.wakeup.clear()
+
+                # Check for next job (FOR UPDATE SKIP LOCKED keeps woken slots from colliding)
+                job = await self.get_next_job()
 
                 if job:
-                    logger.info(f"Found job: {job['id']}")
-                    await self.process_job(job)
+                    logger.info(f"[Slot {slot.index}] Found job: {job['id']}")
+                    slot.start(job['id'])
+                    try:
+                        await self.process_job(job)
+                    finally:
+                        slot.finish()
                 else:
-                    # No jobs, wait before polling again
-                    await asyncio.sleep(self.poll_interval)
+                    # No jobs, wait for a notification or the next sweep
+                    await self.wait_for_jobs(slot)
 
             except Exception as e:
-                logger.error(f"Error in worker loop: {e}")
+                logger.error(f"Error in worker loop (slot {slot.index}): {e}")
                 await asyncio.sleep(self.poll_interval)
 
+    def stats(self) -> Dict[str, Any]:
+        """Per-slot utilization since the worker started"""
+        uptime = time.monotonic() - self._started_at if self._started_at else 0.0
+        slots = [slot.stats(uptime) for slot in self.slots]
+        return {
+            'running': self.running,
+            'listening': self.listening,
+            'uptime_seconds': round(uptime, 2),
+            'busy_slots': sum(1 for slot in self.slots if slot.current_job),
+            'utilization': round(sum(s['utilization'] for s in slots) / len(slots), 4),
+            'slots': slots,
+            'db_pool': self.db_pool.stats() if self.db_pool else None,
+            'progress': self.progress.stats(),
+        }
+
     def stop(self):
         """Stop the worker"""
         self.running = False
+        self._wake_slots()
         logger.info("Database worker stopped")
 
 
-# Global worker instance
+class LocalJobWorker(DatabaseWorker):
+    """
+    Runs the same job pipeline against a local SQLite job store (no DATABASE_URL).
+    Jobs come from POST /jobs in this process; results are kept in the store instead of Pinecone
+    """
+
+    def __init__(self, store_path: str = job_store.JOB_STORE_PATH, concurrency: int = WORKER_CONCURRENCY):
+        super().__init__(database_url=None, concurrency=concurrency)
+        self.store_path = store_path
+        self.progress = ProgressReporter(self.run_query, write=job_store.write_progress)
+
+    async def open_pool(self):
+        """Open the SQLite store (used in place of the connection pool)"""
+        async with self._pool_lock:
+            if self.db_pool is None:
+                self.db_pool = await asyncio.to_thread(job_store.SQLiteJobStore, self.store_path)
+                logger.info(f"Local job store ready: {self.store_path}")
+
+    _claim_next_job = staticmethod(job_store.claim_next_job)
+    _update_job = staticmethod(job_store.update_job)
+    _fetch_job = staticmethod(job_store.fetch_job)
+
+    @property
+    def listening(self) -> bool:
+        # Jobs are only submitted in-process, and submit_job wakes the slots directly
+        return self.running
+
+    async def start_listening(self) -> bool:
+        self._wake_slots()
+        return True
+
+    def stop_listening(self):
+        pass
+
+    async def submit_job(self, path: str, filename: str, file_type: str, file_size: int,
+                         content_hash: str, user_id: Optional[str] = None) -> str:
+        """Move an uploaded file into the store and queue it"""
+        await self.open_pool()
+        await self.run_query(job_store.purge_finished_jobs)
+
+        file_extension = filename.split('.')[-1] if '.' in filename else 'pdf'
+        fd, source_path = tempfile.mkstemp(suffix=f'.{file_extension}', dir=self.db_pool.uploads_dir)
+        os.close(fd)
+        await asyncio.to_thread(shutil.move, path, source_path)
+
+        job_id = await self.run_query(job_store.insert_job, {
+            'filename': filename,
+            'fileSize': str(file_size),
+            'fileType': file_type,
+            'sourcePath': source_path,
+            'contentHash': content_hash,
+        })
+        self._wake_slots()
+        return job_id
+
+    async def fetch_source(self, job: Dict[str, Any]) -> str:
+        """The upload is already on local disk"""
+        self.progress.report(job['id'], 29, 'Preparing document...')
+        return job['sourcePath']
+
+    async def store_results(self, job: Dict[str, Any], chunks: list, source: str,
+                            progress_callback=None) -> int:
+        """Keep the chunks as the job's result"""
+        await self.run_query(job_store.save_result, job['id'], [chunk.model_dump(exclude_none=True) for chunk in chunks])
+        return len(chunks)
+
+    def release_source(self, temp_path: str):
+        """The upload is the job's only copy; process_job removes it once the job is finished"""
+
+    async def process_job(self, job: Dict[str, Any]):
+        await super().process_job(job)
+        # Only reached once 'completed' or 'failed' is written: a job cancelled on shutdown is queued again
+        # on the next start and still needs its upload (conversion cache hits never touch it, so remove it here)
+        source_path = job.get('sourcePath')
+        if source_path and os.path.exists(source_path):
+            os.unlink(source_path)
+
+
+# Global worker instance and the task running it
 worker: Optional[DatabaseWorker] = None
+worker_task: Optional[asyncio.Task] = None
 
 def start_worker():
-    """Start the database worker if DATABASE_URL is configured"""
-    global worker
+    """Start the database worker, or a local SQLite-backed one if DATABASE_URL is not configured"""
+    global worker, worker_task
 
     database_url = os.getenv('DATABASE_URL') or os.getenv('POSTGRES_URL')
 
     if not database_url:
-        logger.warning("DATABASE_URL not configured - worker will not start")
-        logger.warning("Jobs will not be processed automatically")
-        return
-
-    logger.info("Starting database worker...")
-    worker = DatabaseWorker(database_url)
-    asyncio.create_task(worker.run())
-
-def stop_worker():
-    """Stop the database worker"""
-    global worker
+        logger.warning("DATABASE_URL not configured - DocumentProcessingJob rows will not be processed")
+        logger.info(f"Starting local job worker for /jobs (store: {job_store.JOB_STORE_PATH})...")
+        worker = LocalJobWorker()
+    else:
+        logger.info("Starting database worker...")
+        worker = DatabaseWorker(database_url)
+
+    worker_task = asyncio.create_task(worker.run())
+
+def get_worker() -> Optional[DatabaseWorker]:
+    """The running worker (database or local), if any"""
+    return worker
+
+def get_worker_stats() -> Optional[Dict[str, Any]]:
+    """Stats of the running worker, or None if it isn't running"""
+    return worker.stats() if worker else None
+
+async def stop_worker(timeout: float = WORKER_SHUTDOWN_TIMEOUT):
+    """Stop the database worker and wait for in-flight jobs, cancelling them after timeout seconds"""
+    global worker_task
     if worker:
         worker.stop()
+
+    task, worker_task = worker_task, None
+    if task is None:
+        return
+    try:
+        await asyncio.wait_for(task, timeout)
+    except asyncio.TimeoutError:
+        logger.warning(f"Jobs still running after {timeout}s - cancelled")
+    except Exception as e:
+        logger.error(f"Database worker exited with an error: {e}")
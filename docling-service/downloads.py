@@ -0,0 +1,79 @@
+"""
+Streaming File Downloads
+Streams an HTTP download straight to disk, hashing as it goes and resuming with Range requests
+"""
+
+import os
+import hashlib
+import logging
+import asyncio
+from typing import Optional, Callable, Tuple
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024  # 1MB
+# Attempts to resume a transfer that failed mid-way
+DOWNLOAD_MAX_RESUMES = int(os.getenv('DOWNLOAD_MAX_RESUMES', '3'))
+
+
+class ContentHashMismatch(ValueError):
+    """Downloaded bytes don't match the expected SHA-256"""
+
+
+async def stream_download(client: httpx.AsyncClient, url: str, dest_path: str,
+                          expected_sha256: Optional[str] = None,
+                          progress_callback: Optional[Callable[[int, int], None]] = None,
+                          max_resumes: int = DOWNLOAD_MAX_RESUMES) -> Tuple[int, str]:
+    """
+    Download url into dest_path without buffering the body in memory
+    Returns (bytes written, sha256 hex digest); raises ContentHashMismatch if expected_sha256 differs
+    """
+    hasher = hashlib.sha256()
+    written = 0
+    total = 0
+    resumes = 0
+
+    with open(dest_path, 'wb') as out:
+        while True:
+            headers = {'Range': f'bytes={written}-'} if written else {}
+            try:
+                async with client.stream('GET', url, headers=headers) as response:
+                    response.raise_for_status()
+
+                    if written and response.status_code != 206:
+                        # Server ignored the Range header - start over
+                        logger.warning("Server does not support range requests, restarting download")
+                        out.seek(0)
+                        out.truncate()
+                        hasher = hashlib.sha256()
+                        written = 0
+
+                    if not total:
+                        length = response.headers.get('content-length')
+                        total = written + int(length) if length else 0
+
+                    async for chunk in response.aiter_bytes(DOWNLOAD_CHUNK_SIZE):
+                        out.write(chunk)
+                        hasher.update(chunk)
+                        written += len(chunk)
+                        if progress_callback and total:
+                            progress_callback(written, total)
+
+                if total and written < total:
+                    raise httpx.ReadError(f"Connection closed after {written}/{total} bytes")
+                break
+
+            except httpx.TransportError as e:
+                if resumes >= max_resumes:
+                    raise
+                resumes += 1
+                logger.warning(f"Download interrupted at {written} bytes ({e}), resuming (attempt {resumes}/{max_resumes})")
+                await asyncio.sleep(min(2 ** resumes, 10))
+
+    digest = hasher.hexdigest()
+    if expected_sha256 and digest.lower() != expected_sha256.lower():
+        raise ContentHashMismatch(f"Downloaded file hash {digest[:16]}... does not match expected {expected_sha256[:16]}...")
+
+    return written, digest
@@ -0,0 +1,133 @@
+"""
+Shared HTTP Clients
+Long-lived httpx.AsyncClient per upstream (HTTP/2, keep-alive pools) so outbound calls reuse connections instead of handshaking per request
+"""
+
+import os
+import logging
+from typing import Dict, Any, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+try:
+    import h2  # noqa: F401 - httpx only needs it importable
+    H2_AVAILABLE = True
+except ImportError:
+    H2_AVAILABLE = False
+
+HTTP_CLIENT_HTTP2 = os.getenv('HTTP_CLIENT_HTTP2', 'true').lower() in ('1', 'true', 'yes')
+# Connections per upstream; requests beyond it wait for a free connection (HTTP/2 multiplexes many per connection)
+HTTP_CLIENT_MAX_CONNECTIONS = int(os.getenv('HTTP_CLIENT_MAX_CONNECTIONS', '20'))
+HTTP_CLIENT_MAX_KEEPALIVE = int(os.getenv('HTTP_CLIENT_MAX_KEEPALIVE', '10'))
+# Idle seconds before a pooled connection is closed
+HTTP_CLIENT_KEEPALIVE_EXPIRY = float(os.getenv('HTTP_CLIENT_KEEPALIVE_EXPIRY', '60'))
+
+# Upstream name -> client settings; unknown names get the defaults
+CLIENT_PROFILES = {
+    'anthropic': {'timeout': 30.0},
+    'downloads': {'timeout': 120.0},
+}
+DEFAULT_TIMEOUT = 30.0
+
+
+class MeteredTransport(httpx.AsyncBaseTransport):
+    """Transport wrapper counting requests and newly opened connections via httpcore trace events"""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport):
+        self._transport = transport
+        self._stats = {
+            'requests': 0,
+            'connections_opened': 0,
+            'http2_requests': 0,
+            'errors': 0,
+        }
+
+    async def _trace(self, event_name: str, info: Dict[str, Any]) -> None:
+        if event_name == 'connection.connect_tcp.complete':
+            self._stats['connections_opened'] += 1
+        elif event_name == 'http2.send_request_headers.started':
+            self._stats['http2_requests'] += 1
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self._stats['requests'] += 1
+        request.extensions = {**request.extensions, 'trace': self._trace}
+        try:
+            return await self._transport.handle_async_request(request)
+        except httpx.TransportError:
+            self._stats['errors'] += 1
+            raise
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+    def stats(self) -> Dict[str, Any]:
+        stats = dict(self._stats)
+        stats['connections_reused'] = max(0, stats['requests'] - stats['connections_opened'])
+        stats['reuse_rate'] = round(stats['connections_reused'] / stats['requests'], 4) if stats['requests'] else None
+        return stats
+
+
+class HTTPClientRegistry:
+    """One pooled AsyncClient per upstream, created on first use and closed at shutdown"""
+
+    def __init__(self, http2: bool = HTTP_CLIENT_HTTP2):
+        self.http2 = http2 and H2_AVAILABLE
+        if http2 and not H2_AVAILABLE:
+            logger.warning("⚠️  h2 not installed - shared HTTP clients fall back to HTTP/1.1")
+        self.limits = httpx.Limits(
+            max_connections=HTTP_CLIENT_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_CLIENT_MAX_KEEPALIVE,
+            keepalive_expiry=HTTP_CLIENT_KEEPALIVE_EXPIRY,
+        )
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._transports: Dict[str, MeteredTransport] = {}
+
+    def client(self, name: str) -> httpx.AsyncClient:
+        """The shared client for an upstream; callers must not close it"""
+        if name not in self._clients:
+            profile = CLIENT_PROFILES.get(name, {})
+            transport = MeteredTransport(httpx.AsyncHTTPTransport(http2=self.http2, limits=self.limits))
+            self._transports[name] = transport
+            self._clients[name] = httpx.AsyncClient(
+                transport=transport,
+                timeout=profile.get('timeout', DEFAULT_TIMEOUT),
+            )
+            logger.info(f"🔌 Shared HTTP client '{name}' (http2={self.http2}, max_connections={self.limits.max_connections})")
+        return self._clients[name]
+
+    async def aclose(self) -> None:
+        """Close every client and its pooled connections"""
+        clients, self._clients = self._clients, {}
+        for name, client in clients.items():
+            try:
+                await client.aclose()
+            except Exception as e:
+                logger.warning(f"Error closing HTTP client '{name}': {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'http2': self.http2,
+            'clients': {name: transport.stats() for name, transport in self._transports.items()},
+        }
+
+
+# Global registry instance
+http_clients: Optional[HTTPClientRegistry] = None
+
+def get_http_clients() -> HTTPClientRegistry:
+    """Return the process-wide client registry"""
+    global http_clients
+    if http_clients is None:
+        http_clients = HTTPClientRegistry()
+    return http_clients
+
+def get_http_client(name: str) -> httpx.AsyncClient:
+    """Shorthand for get_http_clients().client(name)"""
+    return get_http_clients().client(name)
+
+async def close_http_clients() -> None:
+    """Close all shared clients (application shutdown)"""
+    if http_clients is not None:
+        await http_clients.aclose()
@@ -0,0 +1,184 @@
+"""
+Local Logo/Decoration Classifier
+CPU-only image statistics that flag obvious logos and ornaments so they skip the vision API
+"""
+
+import io
+import os
+import math
+import logging
+import threading
+from collections import Counter
+from typing import Dict, Any, Optional, Tuple
+
+from PIL import Image, ImageFilter
+
+logger = logging.getLogger(__name__)
+
+# Off until the threshold is backed by labelled samples from real documents (benchmarks/eval_logo_classifier.py)
+LOGO_CLASSIFIER_ENABLED = os.getenv('LOGO_CLASSIFIER_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+# Minimum confidence to label a picture decorative without asking the vision API.
+# Kept high: a chart mislabelled as a logo is filtered out of answers entirely
+LOGO_CLASSIFIER_THRESHOLD = float(os.getenv('LOGO_CLASSIFIER_THRESHOLD', '0.9'))
+
+# Same "LOGO:" prefix the vision prompt asks for, so the chat side filters these pictures alike
+LOCAL_LOGO_DESCRIPTION = "LOGO: Decorative image (logo, emblem, banner or ornament) detected by local classifier"
+
+# Statistics are computed on a thumbnail of at most this size
+ANALYSIS_SIZE = 256
+EDGE_THRESHOLD = 48
+
+# Only pictures this small (shorter side, in pixels) or centred in a header/footer band may be labelled decorative
+SMALL_PICTURE_SIDE = 64
+HEADER_BAND = 0.12
+FOOTER_BAND = 0.9
+
+
+def picture_position(picture, doc) -> Optional[Dict[str, float]]:
+    """Picture bbox as fractions of its page (top-left origin), from Docling provenance"""
+    try:
+        prov = picture.prov[0]
+        bbox = prov.bbox
+        page = doc.pages[prov.page_no]
+        page_width, page_height = page.size.width, page.size.height
+    except (AttributeError, IndexError, KeyError, TypeError):
+        return None
+    if not page_width or not page_height:
+        return None
+
+    top, bottom = bbox.t, bbox.b
+    if 'BOTTOM' in str(getattr(bbox, 'coord_origin', '')).upper():
+        top, bottom = page_height - bbox.t, page_height - bbox.b
+
+    return {
+        'left': bbox.l / page_width,
+        'right': bbox.r / page_width,
+        'top': min(top, bottom) / page_height,
+        'bottom': max(top, bottom) / page_height,
+    }
+
+
+def image_features(image_bytes: bytes, position: Optional[Dict[str, float]] = None) -> Dict[str, float]:
+    """Size, aspect ratio, colour entropy, edge density and (if known) page position of an encoded image"""
+    with Image.open(io.BytesIO(image_bytes)) as image:
+        width, height = image.size
+        rgb = image.convert('RGB')
+    rgb.thumbnail((ANALYSIS_SIZE, ANALYSIS_SIZE))
+    pixel_count = rgb.width * rgb.height
+
+    # Shannon entropy over colours quantized to 4 bits per channel
+    counts = Counter(((r >> 4) << 8) | ((g >> 4) << 4) | (b >> 4) for r, g, b in rgb.getdata())
+    entropy = -sum(c / pixel_count * math.log2(c / pixel_count) for c in counts.values())
+
+    # Share of pixels on an edge: text, axes and line work push this up
+    edges = rgb.convert('L').filter(ImageFilter.FIND_EDGES)
+    edge_density = sum(edges.histogram()[EDGE_THRESHOLD:]) / pixel_count
+
+    features = {
+        'width': float(width),
+        'height': float(height),
+        'aspect_ratio': width / max(1, height),
+        'colour_entropy': entropy,
+        'edge_density': edge_density,
+    }
+
+    if position:
+        features['page_area'] = max(0.0, position['right'] - position['left']) * max(0.0, position['bottom'] - position['top'])
+        features['page_center_y'] = (position['top'] + position['bottom']) / 2
+    return features
+
+
+def decorative_confidence(features: Dict[str, float]) -> float:
+    """Hand-weighted logistic score that a picture is decorative (tune with benchmarks/eval_logo_classifier.py)"""
+    z = -1.0
+
+    min_side = min(features['width'], features['height'])
+    if min_side < SMALL_PICTURE_SIDE:
+        z += 1.5
+    elif min_side < 150:
+        z += 0.5
+    elif min_side > 600:
+        z -= 1.0
+
+    # Banners and rules
+    aspect = features['aspect_ratio']
+    if max(aspect, 1 / max(aspect, 1e-6)) > 5:
+        z += 1.5
+
+    # Few flat colours and few edges read as a logo; photos and dense line work do not
+    z += max(-3.0, min(2.0, 1.2 * (3.5 - features['colour_entropy'])))
+    z += max(-3.0, min(1.5, 15.0 * (0.06 - features['edge_density'])))
+
+    if 'page_area' in features:
+        if features['page_area'] < 0.02:
+            z += 1.0
+        elif features['page_area'] > 0.15:
+            z -= 2.5
+        # Header and footer bands
+        if in_header_or_footer(features):
+            z += 1.5
+
+    return 1 / (1 + math.exp(-z))
+
+
+def in_header_or_footer(features: Dict[str, float]) -> bool:
+    center = features.get('page_center_y')
+    return center is not None and (center < HEADER_BAND or center > FOOTER_BAND)
+
+
+def may_be_decorative(features: Dict[str, float]) -> bool:
+    """
+    Pictures in the body of a page always go to the vision API, however logo-like they look:
+    simple diagrams score like logos, and a mislabelled one is filtered out of answers
+    """
+    return min(features['width'], features['height']) < SMALL_PICTURE_SIDE or in_header_or_footer(features)
+
+
+class LogoClassifier:
+    """Labels small or header/footer pictures decorative when decorative_confidence clears the threshold"""
+
+    def __init__(self, threshold: float = LOGO_CLASSIFIER_THRESHOLD):
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._stats = {
+            'classified': 0,
+            'decorative': 0,
+            'errors': 0,
+        }
+
+    def classify(self, image_bytes: bytes, position: Optional[Dict[str, float]] = None) -> Tuple[bool, float]:
+        """(is decorative, confidence); errors count as not decorative so the vision API decides"""
+        try:
+            features = image_features(image_bytes, position)
+            confidence = decorative_confidence(features)
+        except Exception as e:
+            logger.debug(f"Could not classify image: {e}")
+            with self._lock:
+                self._stats['errors'] += 1
+            return False, 0.0
+
+        decorative = may_be_decorative(features) and confidence >= self.threshold
+        with self._lock:
+            self._stats['classified'] += 1
+            if decorative:
+                self._stats['decorative'] += 1
+        return decorative, confidence
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        stats['threshold'] = self.threshold
+        # Each decorative picture is a vision call not made
+        stats['decorative_rate'] = round(stats['decorative'] / stats['classified'], 4) if stats['classified'] else None
+        return stats
+
+
+# Global classifier instance
+logo_classifier: Optional[LogoClassifier] = None
+
+def get_logo_classifier() -> Optional[LogoClassifier]:
+    """Return the process-wide classifier, or None when disabled"""
+    global logo_classifier
+    if logo_classifier is None and LOGO_CLASSIFIER_ENABLED:
+        logo_classifier = LogoClassifier()
+    return logo_classifier
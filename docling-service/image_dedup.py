@@ -0,0 +1,200 @@
+"""
+Perceptual Image Deduplication
+dHash signatures of extracted pictures so near-identical images (re-rendered logos, rescaled slides) are analyzed and uploaded once
+"""
+
+import io
+import os
+import time
+import sqlite3
+import logging
+import tempfile
+import threading
+from typing import Dict, Any, Optional, Tuple, List
+
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+IMAGE_DEDUP_ENABLED = os.getenv('IMAGE_DEDUP_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+# Maximum differing bits (of 64) for two pictures to count as the same image
+IMAGE_DEDUP_MAX_DISTANCE = int(os.getenv('IMAGE_DEDUP_MAX_DISTANCE', '4'))
+# Cross-document index of pictures already described and uploaded
+IMAGE_DEDUP_INDEX_PATH = os.getenv('IMAGE_DEDUP_INDEX_PATH', os.path.join(tempfile.gettempdir(), 'docling-image-index.sqlite3'))
+IMAGE_DEDUP_INDEX_MAX_ENTRIES = int(os.getenv('IMAGE_DEDUP_INDEX_MAX_ENTRIES', '200000'))
+
+HASH_BITS = 64
+# Pictures whose aspect ratios differ by more than this are never duplicates, whatever their hashes say
+MAX_ASPECT_RATIO_DIFFERENCE = 0.1
+
+Signature = Tuple[int, float]  # (dHash, width / height)
+
+
+def dhash(image: Image.Image, hash_size: int = 8) -> int:
+    """Difference hash: one bit per horizontally adjacent pixel pair of a (hash_size+1) x hash_size greyscale thumbnail"""
+    pixels = list(image.convert('L').resize((hash_size + 1, hash_size), Image.Resampling.BOX).getdata())
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def image_signature(image_bytes: bytes) -> Optional[Signature]:
+    """dHash and aspect ratio of encoded image bytes, or None for flat images that carry no usable signal"""
+    try:
+        with Image.open(io.BytesIO(image_bytes)) as image:
+            value = dhash(image)
+            aspect = image.width / max(1, image.height)
+    except Exception as e:
+        logger.debug(f"Could not hash image: {e}")
+        return None
+
+    # Blank or single-colour images all hash to (nearly) the same value
+    if value == 0 or value == (1 << HASH_BITS) - 1:
+        return None
+    return value, aspect
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count('1')
+
+
+class NearDuplicateIndex:
+    """
+    In-memory index of signatures answering "is there a stored hash within max_distance bits?".
+    Hashes are split into max_distance + 1 bands: any match within the distance shares at least one band exactly
+    """
+
+    def __init__(self, max_distance: int = IMAGE_DEDUP_MAX_DISTANCE):
+        self.max_distance = max(0, min(max_distance, HASH_BITS // 2))
+        band_count = self.max_distance + 1
+        width = HASH_BITS // band_count
+        self._bands = [(i * width, HASH_BITS if i == band_count - 1 else (i + 1) * width) for i in range(band_count)]
+        self._tables: List[Dict[int, List[Tuple[Signature, Any]]]] = [{} for _ in self._bands]
+        self.size = 0
+
+    def _keys(self, value: int):
+        for start, end in self._bands:
+            yield (value >> start) & ((1 << (end - start)) - 1)
+
+    def add(self, signature: Signature, item: Any) -> None:
+        for table, key in zip(self._tables, self._keys(signature[0])):
+            table.setdefault(key, []).append((signature, item))
+        self.size += 1
+
+    def find(self, signature: Signature) -> Optional[Any]:
+        """Closest stored item within max_distance (and a similar aspect ratio), or None"""
+        value, aspect = signature
+        best, best_distance = None, self.max_distance + 1
+        for table, key in zip(self._tables, self._keys(value)):
+            for (other_value, other_aspect), item in table.get(key, ()):
+                if abs(aspect - other_aspect) > MAX_ASPECT_RATIO_DIFFERENCE * max(aspect, other_aspect):
+                    continue
+                distance = hamming_distance(value, other_value)
+                if distance < best_distance:
+                    best, best_distance = item, distance
+        return best
+
+
+class ImageIndex:
+    """
+    Persistent cross-document index: perceptual signature -> vision description and R2 URL of the first occurrence.
+    Entries are loaded into a NearDuplicateIndex at startup; only the newest max_entries are kept
+    """
+
+    def __init__(self, path: str = IMAGE_DEDUP_INDEX_PATH, max_distance: int = IMAGE_DEDUP_MAX_DISTANCE,
+                 max_entries: int = IMAGE_DEDUP_INDEX_MAX_ENTRIES):
+        self.path = path
+        self.max_distance = max_distance
+        self.max_entries = max(1, max_entries)
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL;')
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS images (
+                phash TEXT NOT NULL,
+                aspect REAL NOT NULL,
+                prompt_version TEXT NOT NULL,
+                description TEXT NOT NULL,
+                image_url TEXT,
+                created_at REAL NOT NULL
+            );
+        """)
+        # Keep the newest entries only
+        self._conn.execute("""
+            DELETE FROM images WHERE rowid NOT IN (SELECT rowid FROM images ORDER BY created_at DESC LIMIT ?);
+        """, [self.max_entries])
+        self._conn.commit()
+        self._lock = threading.Lock()
+        self._indexes: Dict[str, NearDuplicateIndex] = {}
+        for phash, aspect, prompt_version, description, image_url in self._conn.execute(
+                'SELECT phash, aspect, prompt_version, description, image_url FROM images ORDER BY created_at ASC;'):
+            self._index(prompt_version).add((int(phash, 16), aspect), {'description': description, 'image_url': image_url})
+        self._stats = {
+            'lookups': 0,
+            'hits': 0,
+            'stores': 0,
+            'document_duplicates': 0,
+        }
+
+    def _index(self, prompt_version: str) -> NearDuplicateIndex:
+        if prompt_version not in self._indexes:
+            self._indexes[prompt_version] = NearDuplicateIndex(self.max_distance)
+        return self._indexes[prompt_version]
+
+    def lookup(self, signature: Signature, prompt_version: str) -> Optional[Dict[str, Any]]:
+        """Description and image_url of a near-identical picture seen before, or None"""
+        with self._lock:
+            self._stats['lookups'] += 1
+            match = self._index(prompt_version).find(signature)
+            if match:
+                self._stats['hits'] += 1
+        return match
+
+    def add(self, signature: Signature, prompt_version: str, description: str, image_url: Optional[str]) -> None:
+        """Remember a described (and possibly uploaded) picture"""
+        entry = {'description': description, 'image_url': image_url}
+        with self._lock:
+            # Another document may have added a near-duplicate meanwhile - keep the first
+            if self._index(prompt_version).find(signature):
+                return
+            self._index(prompt_version).add(signature, entry)
+            self._stats['stores'] += 1
+            try:
+                self._conn.execute('INSERT INTO images VALUES (?, ?, ?, ?, ?, ?);', [
+                    format(signature[0], '016x'), signature[1], prompt_version, description, image_url, time.time()
+                ])
+                self._conn.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"Image index write failed: {e}")
+
+    def count_document_duplicates(self, count: int) -> None:
+        """Record pictures that reused an earlier picture of the same document"""
+        with self._lock:
+            self._stats['document_duplicates'] += count
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = sum(index.size for index in self._indexes.values())
+        stats['hit_rate'] = round(stats['hits'] / stats['lookups'], 4) if stats['lookups'] else None
+        stats['max_distance'] = self.max_distance
+        return stats
+
+
+# Global index instance
+image_index: Optional[ImageIndex] = None
+
+def get_image_index() -> Optional[ImageIndex]:
+    """Return the process-wide cross-document index, or None when deduplication is disabled"""
+    global image_index
+    if image_index is None and IMAGE_DEDUP_ENABLED:
+        try:
+            image_index = ImageIndex()
+            logger.info(f"✅ Image index at {image_index.path} ({image_index.stats()['entries']} pictures)")
+        except sqlite3.Error as e:
+            logger.error(f"❌ Could not open image index at {IMAGE_DEDUP_INDEX_PATH}: {e}")
+            return None
+    return image_index
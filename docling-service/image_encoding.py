@@ -0,0 +1,184 @@
+"""
+Picture Encoding
+Encoded picture bytes carried through the image pipeline, with hashes and base64 computed once on first use,
+and re-encoding profiles for what goes to the vision API, to R2 and inline into responses
+"""
+
+import io
+import os
+import json
+import time
+import base64
+import hashlib
+import logging
+import threading
+from typing import Dict, Any, Optional, Tuple
+
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# Format, quality and longest side (0 = keep) per destination. PNG without a size limit keeps the extracted bytes
+IMAGE_PROFILES: Dict[str, Dict[str, Any]] = {
+    # Larger images are downscaled by the vision API anyway
+    'vision': {
+        'format': os.getenv('IMAGE_VISION_FORMAT', 'JPEG').upper(),
+        'quality': int(os.getenv('IMAGE_VISION_QUALITY', '85')),
+        'max_dimension': int(os.getenv('IMAGE_VISION_MAX_DIMENSION', '1568')),
+    },
+    # Objects in R2 shown to users in chat answers
+    'storage': {
+        'format': os.getenv('IMAGE_STORAGE_FORMAT', 'WEBP').upper(),
+        'quality': int(os.getenv('IMAGE_STORAGE_QUALITY', '80')),
+        'max_dimension': int(os.getenv('IMAGE_STORAGE_MAX_DIMENSION', '2048')),
+    },
+    # base64 in chunks when R2 is not configured; stays PNG because the Node side labels it image/png
+    'inline': {
+        'format': 'PNG',
+        'quality': None,
+        'max_dimension': int(os.getenv('IMAGE_INLINE_MAX_DIMENSION', '1024')),
+    },
+}
+
+MEDIA_TYPES = {'PNG': 'image/png', 'JPEG': 'image/jpeg', 'WEBP': 'image/webp'}
+EXTENSIONS = {'image/png': 'png', 'image/jpeg': 'jpg', 'image/webp': 'webp'}
+
+for _name, _options in IMAGE_PROFILES.items():
+    if _options['format'] not in MEDIA_TYPES:
+        logger.warning(f"⚠️  Unsupported {_name} image format {_options['format']}, using PNG")
+        _options['format'] = 'PNG'
+
+
+def image_profile_fingerprint(profile: str) -> str:
+    """Stable hash of a profile's settings (changes whenever its output could change)"""
+    return hashlib.sha256(json.dumps(IMAGE_PROFILES[profile], sort_keys=True).encode('utf-8')).hexdigest()[:8]
+
+
+def is_passthrough(profile: str) -> bool:
+    """True if the profile keeps extracted PNG bytes as they are"""
+    options = IMAGE_PROFILES[profile]
+    return options['format'] == 'PNG' and not options['max_dimension']
+
+
+class EncodingReport:
+    """Per-document totals of source vs re-encoded bytes and encode time, per profile"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._profiles: Dict[str, Dict[str, float]] = {}
+
+    def record(self, profile: str, source_bytes: int, encoded_bytes: int, seconds: float) -> None:
+        with self._lock:
+            totals = self._profiles.setdefault(profile, {'images': 0, 'source_bytes': 0, 'encoded_bytes': 0, 'seconds': 0.0})
+            totals['images'] += 1
+            totals['source_bytes'] += source_bytes
+            totals['encoded_bytes'] += encoded_bytes
+            totals['seconds'] += seconds
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            profiles = {name: dict(totals) for name, totals in self._profiles.items()}
+        for totals in profiles.values():
+            totals['seconds'] = round(totals['seconds'], 3)
+            totals['ratio'] = round(totals['encoded_bytes'] / totals['source_bytes'], 4) if totals['source_bytes'] else None
+        return profiles
+
+
+# Process-wide totals across documents (reported by /metrics)
+encoding_totals = EncodingReport()
+
+
+class EncodedImage:
+    """
+    One encoded picture. Consumers read .data (classifier, perceptual hash, upload), .sha256 (vision cache),
+    .storage_hash (R2 key) and .base64 (vision API, inline chunk fallback) without re-encoding or re-decoding
+    """
+
+    __slots__ = ('data', 'media_type', '_base64', '_sha256', '_storage_hash', '_variants')
+
+    def __init__(self, data: bytes, media_type: str = 'image/png'):
+        self.data = data
+        self.media_type = media_type
+        self._base64: Optional[str] = None
+        self._sha256: Optional[str] = None
+        self._storage_hash: Optional[str] = None
+        self._variants: Dict[str, 'EncodedImage'] = {}
+
+    @classmethod
+    def from_pil(cls, image, format: str = 'PNG') -> 'EncodedImage':
+        buffer = io.BytesIO()
+        image.save(buffer, format=format)
+        return cls(buffer.getvalue(), MEDIA_TYPES.get(format.upper(), f"image/{format.lower()}"))
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    @property
+    def base64(self) -> str:
+        if self._base64 is None:
+            self._base64 = base64.b64encode(self.data).decode('ascii')
+        return self._base64
+
+    @property
+    def sha256(self) -> str:
+        if self._sha256 is None:
+            self._sha256 = hashlib.sha256(self.data).hexdigest()
+        return self._sha256
+
+    @property
+    def storage_hash(self) -> str:
+        """16-hex-digit name of the R2 object: MD5 of the base64 text, as objects have always been named"""
+        if self._storage_hash is None:
+            # Reuse the base64 text if it exists, without keeping a copy just for the key
+            text = self._base64.encode('ascii') if self._base64 is not None else base64.b64encode(self.data)
+            self._storage_hash = hashlib.md5(text).hexdigest()[:16]
+        return self._storage_hash
+
+    def reencode(self, profile: str, report: Optional[EncodingReport] = None) -> 'EncodedImage':
+        """
+        This picture encoded for a profile (blocking; run off the event loop). Computed once per profile.
+        Falls back to the original bytes if the picture can't be re-encoded
+        """
+        if is_passthrough(profile):
+            return self
+        if profile in self._variants:
+            return self._variants[profile]
+
+        options = IMAGE_PROFILES[profile]
+        start = time.perf_counter()
+        try:
+            with Image.open(io.BytesIO(self.data)) as image:
+                image.load()
+                max_dimension = options['max_dimension']
+                if max_dimension and max(image.size) > max_dimension:
+                    image.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS)
+                if options['format'] == 'JPEG' and image.mode != 'RGB':
+                    # JPEG has no alpha: flatten onto white like the page behind the picture
+                    rgba = image.convert('RGBA')
+                    image = Image.new('RGB', rgba.size, 'white')
+                    image.paste(rgba, mask=rgba.getchannel('A'))
+                save_options = {'quality': options['quality']} if options['quality'] else {'optimize': True}
+                buffer = io.BytesIO()
+                image.save(buffer, format=options['format'], **save_options)
+            variant = EncodedImage(buffer.getvalue(), MEDIA_TYPES[options['format']])
+        except Exception as e:
+            logger.warning(f"Could not re-encode picture for {profile}: {e}")
+            variant = self
+
+        seconds = time.perf_counter() - start
+        for totals in (report, encoding_totals):
+            if totals is not None:
+                totals.record(profile, len(self.data), len(variant.data), seconds)
+        self._variants[profile] = variant
+        return variant
+
+
+def storage_key(image: EncodedImage) -> Tuple[str, str]:
+    """
+    (R2 key, media type) of a picture's stored object, derived from the extracted bytes and the storage profile,
+    so whether it is already stored is known before re-encoding
+    """
+    if is_passthrough('storage'):
+        return f"doc-images/{image.storage_hash}.png", image.media_type
+    media_type = MEDIA_TYPES[IMAGE_PROFILES['storage']['format']]
+    return f"doc-images/{image.storage_hash}-{image_profile_fingerprint('storage')}.{EXTENSIONS[media_type]}", media_type
@@ -0,0 +1,186 @@
+"""
+Local Job Store
+SQLite-backed stand-in for the DocumentProcessingJob table, used when DATABASE_URL is not configured
+"""
+
+import os
+import json
+import uuid
+import sqlite3
+import asyncio
+import tempfile
+import threading
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, Optional, Callable, List
+
+logger = logging.getLogger(__name__)
+
+# SQLite database holding local jobs and their results
+JOB_STORE_PATH = os.getenv('JOB_STORE_PATH', os.path.join(tempfile.gettempdir(), 'docling-jobs', 'jobs.sqlite3'))
+# Finished jobs (and their results) are deleted after this many hours
+JOB_STORE_RETENTION_HOURS = float(os.getenv('JOB_STORE_RETENTION_HOURS', '24'))
+
+# Same column names as DocumentProcessingJob so the worker pipeline reads either row shape
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS jobs (
+        id TEXT PRIMARY KEY,
+        filename TEXT NOT NULL,
+        fileSize TEXT NOT NULL,
+        fileType TEXT NOT NULL,
+        status TEXT NOT NULL DEFAULT 'queued',
+        progress TEXT NOT NULL DEFAULT '0',
+        message TEXT,
+        errorMessage TEXT,
+        sourcePath TEXT,
+        r2Url TEXT,
+        contentHash TEXT,
+        totalPages TEXT,
+        chunksCount TEXT,
+        processingTimeMs TEXT,
+        result TEXT,
+        createdAt TEXT NOT NULL,
+        updatedAt TEXT NOT NULL,
+        startedAt TEXT,
+        completedAt TEXT
+    );
+    CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, createdAt);
+"""
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class SQLiteJobStore:
+    """
+    One SQLite connection shared by the worker; queries run in threads, one at a time.
+    run(func, *args) has the same contract as AsyncConnectionPool.run
+    """
+
+    def __init__(self, path: str = JOB_STORE_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # Uploaded files wait here until their job runs
+        self.uploads_dir = os.path.join(os.path.dirname(os.path.abspath(path)), 'uploads')
+        os.makedirs(self.uploads_dir, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute('PRAGMA journal_mode=WAL;')
+        self._conn.executescript(SCHEMA)
+        # Jobs interrupted by a restart are queued again
+        self._conn.execute("UPDATE jobs SET status = 'queued', progress = '0' WHERE status = 'processing';")
+        self._conn.commit()
+        self._lock = threading.Lock()
+        self._stats = {
+            'queries': 0,
+            'errors': 0,
+        }
+
+    def _run_locked(self, func: Callable, args, kwargs):
+        with self._lock:
+            try:
+                return func(self._conn, *args, **kwargs)
+            except Exception:
+                self._conn.rollback()
+                raise
+
+    async def run(self, func: Callable, *args, **kwargs):
+        """Call func(conn, *args, **kwargs) with the store's connection in a worker thread"""
+        self._stats['queries'] += 1
+        try:
+            return await asyncio.to_thread(self._run_locked, func, args, kwargs)
+        except Exception:
+            self._stats['errors'] += 1
+            raise
+
+    def close(self):
+        self._conn.close()
+
+    def stats(self) -> Dict[str, Any]:
+        counts = {}
+        with self._lock:
+            for row in self._conn.execute('SELECT status, COUNT(*) AS n FROM jobs GROUP BY status;'):
+                counts[row['status']] = row['n']
+        return {**self._stats, 'path': self.path, 'jobs': counts}
+
+
+# Query functions - each takes the connection first, like the psycopg2 ones in db_worker
+
+def insert_job(conn, values: Dict[str, Any]) -> str:
+    job_id = str(uuid.uuid4())
+    now = _now()
+    row = {**values, 'id': job_id, 'status': 'queued', 'progress': '0',
+           'message': 'Waiting for processing...', 'createdAt': now, 'updatedAt': now}
+    columns = ', '.join(row)
+    placeholders = ', '.join('?' for _ in row)
+    conn.execute(f'INSERT INTO jobs ({columns}) VALUES ({placeholders});', list(row.values()))
+    conn.commit()
+    return job_id
+
+
+def claim_next_job(conn) -> Optional[Dict[str, Any]]:
+    # Only this process uses the store, and queries are serialized, so no row locking is needed
+    now = _now()
+    row = conn.execute("""
+        UPDATE jobs
+        SET status = 'processing',
+            startedAt = ?,
+            updatedAt = ?,
+            progress = '0',
+            message = 'Starting document processing...'
+        WHERE id = (
+            SELECT id FROM jobs
+            WHERE status = 'queued'
+            ORDER BY createdAt ASC
+            LIMIT 1
+        )
+        RETURNING *;
+    """, [now, now]).fetchone()
+    conn.commit()
+    return dict(row) if row else None
+
+
+def update_job(conn, job_id: str, fields: Dict[str, Any], finished: bool) -> None:
+    now = _now()
+    fields = {**fields, 'updatedAt': now}
+    if finished:
+        fields['completedAt'] = now
+    assignments = ', '.join(f'{column} = ?' for column in fields)
+    conn.execute(f'UPDATE jobs SET {assignments} WHERE id = ?;', [*fields.values(), job_id])
+    conn.commit()
+
+
+def write_progress(conn, rows) -> None:
+    """ProgressReporter writer: rows of (job_id, progress, message)"""
+    now = _now()
+    conn.executemany("""
+        UPDATE jobs
+        SET progress = ?, message = COALESCE(?, message), updatedAt = ?
+        WHERE id = ? AND status = 'processing';
+    """, [(progress, message, now, job_id) for job_id, progress, message in rows])
+    conn.commit()
+
+
+def save_result(conn, job_id: str, chunks: List[Dict[str, Any]]) -> None:
+    conn.execute('UPDATE jobs SET result = ? WHERE id = ?;', [json.dumps(chunks), job_id])
+    conn.commit()
+
+
+def fetch_job(conn, job_id: str) -> Optional[Dict[str, Any]]:
+    row = conn.execute('SELECT * FROM jobs WHERE id = ?;', [job_id]).fetchone()
+    if not row:
+        return None
+    job = dict(row)
+    job['result'] = json.loads(job['result']) if job['result'] else None
+    return job
+
+
+def purge_finished_jobs(conn, retention_hours: float = JOB_STORE_RETENTION_HOURS) -> int:
+    cutoff = (datetime.now(timezone.utc) - timedelta(hours=retention_hours)).isoformat()
+    cursor = conn.execute(
+        "DELETE FROM jobs WHERE status IN ('completed', 'failed') AND completedAt < ?;", [cutoff]
+    )
+    conn.commit()
+    return cursor.rowcount
@@ -6,30 +6,41 @@ Provides REST API endpoints for processing documents with advanced layout analys
 
 import os
 import tempfile
-import base64
-import io
+import re
 import json
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Callable, AsyncIterator
 import logging
 import time
-import httpx
 import asyncio
 import hashlib
+import hmac
+import uuid
 
-from fastapi import FastAPI, File, UploadFile, HTTPException, Request
+from fastapi import FastAPI, File, Form, Header, UploadFile, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from pydantic import BaseModel
 from contextlib import asynccontextmanager
 import uvicorn
 import boto3
 from botocore.exceptions import ClientError
 
+from converter_pool import DEFAULT_PROFILE
+from conversion_engine import get_conversion_engine
+from conversion_cache import init_conversion_cache, get_conversion_cache
+from vision_cache import get_vision_cache
+from image_dedup import get_image_index, image_signature, NearDuplicateIndex
+from r2_uploads import init_r2_uploads, get_r2_uploads, upload_client_config
+from http_clients import get_http_client, get_http_clients, close_http_clients
+from text_chunker import chunk_page_text
+from image_encoding import EncodedImage, EncodingReport, encoding_totals, image_profile_fingerprint, storage_key
+from image_classifier import get_logo_classifier, picture_position, LOCAL_LOGO_DESCRIPTION
+from rate_limiter import get_rate_limiter, parse_retry_after, rate_limiter_stats, RATE_LIMIT_MAX_RETRIES
+
 try:
     from docling.document_converter import DocumentConverter
-    from docling.datamodel.base_models import InputFormat
-    from docling.datamodel.pipeline_options import PdfPipelineOptions
-    from docling.document_converter import PdfFormatOption
     from docling.datamodel.document import DoclingDocument
     from docling_core.types import DoclingDocument as DoclingDocumentCore
 except ImportError:
@@ -46,6 +57,9 @@ logger = logging.getLogger(__name__)
 async def lifespan(app: FastAPI):
     """Manage application lifespan (startup and shutdown)"""
     # Startup
+    # Spawn conversion workers; each builds (and pre-warms) its converters once
+    get_conversion_engine().start()
+
     try:
         from db_worker import start_worker
         start_worker()
@@ -59,15 +73,22 @@ async def lifespan(app: FastAPI):
     yield
 
     # Shutdown
+    # Waits for in-flight jobs, which still need the conversion workers and the shared clients
     try:
         from db_worker import stop_worker
-        stop_worker()
-        logger.info("Application shutdown complete")
+        await stop_worker()
     except ImportError:
         logger.debug("db_worker not available for shutdown")
     except Exception as e:
         logger.error(f"Error during shutdown: {e}")
 
+    get_conversion_engine().shutdown()
+    await close_http_clients()
+    if uploads := get_r2_uploads():
+        # Waits for queued uploads; off the event loop so other shutdown work isn't blocked
+        await asyncio.to_thread(uploads.shutdown)
+    logger.info("Application shutdown complete")
+
 app = FastAPI(
     title="Docling Document Processing Service",
     description="Advanced document processing with layout analysis, table extraction, and figure detection",
@@ -80,21 +101,77 @@ app = FastAPI(
 MAX_UPLOAD_SIZE = 50 * 1024 * 1024  # 50MB
 MAX_MULTIPART_SIZE = MAX_UPLOAD_SIZE
 
-@app.middleware("http")
-async def limit_upload_size(request: Request, call_next):
-    """Middleware to limit upload size and prevent memory exhaustion"""
-    if request.method == "POST" and "multipart/form-data" in request.headers.get("content-type", ""):
-        content_length = request.headers.get("content-length")
-        if content_length:
-            content_length = int(content_length)
-            if content_length > MAX_UPLOAD_SIZE:
-                raise HTTPException(
-                    status_code=413,
-                    detail=f"File too large. Maximum size allowed: {MAX_UPLOAD_SIZE // (1024*1024)}MB"
-                )
+# Uploads are copied to disk in chunks of this size
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # 1MB
+
+
+class UploadTooLarge(HTTPException):
+    """Raised mid-stream; an HTTPException so FastAPI's body parsing re-raises it as a 413"""
+
+    def __init__(self, max_size: int):
+        super().__init__(
+            status_code=413,
+            detail=f"File too large. Maximum size allowed: {max_size // (1024*1024)}MB"
+        )
+
+
+class UploadSizeLimitMiddleware:
+    """
+    Reject request bodies larger than max_size while they are being received -
+    Content-Length is checked up front, and chunked bodies are counted as they stream in
+    """
 
-    response = await call_next(request)
-    return response
+    def __init__(self, app, max_size: int):
+        self.app = app
+        self.max_size = max_size
+
+    async def _reject(self, send):
+        body = json.dumps({"detail": UploadTooLarge(self.max_size).detail}).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST":
+            await self.app(scope, receive, send)
+            return
+
+        content_length = dict(scope["headers"]).get(b"content-length")
+        if content_length and content_length.isdigit() and int(content_length) > self.max_size:
+            await self._reject(send)
+            return
+
+        received = 0
+        response_started = False
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_size:
+                    raise UploadTooLarge(self.max_size)
+            return message
+
+        async def tracked_send(message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracked_send)
+        except UploadTooLarge:
+            logger.warning(f"Rejected upload to {scope['path']}: body exceeded {self.max_size} bytes")
+            if not response_started:
+                await self._reject(send)
+
+
+# Middleware to limit upload size and prevent memory exhaustion
+app.add_middleware(UploadSizeLimitMiddleware, max_size=MAX_MULTIPART_SIZE)
 
 # CORS middleware for Node.js integration
 # Get allowed origins from environment variable for production security
@@ -129,17 +206,22 @@ if R2_ACCOUNT_ID and R2_ACCESS_KEY_ID and R2_SECRET_ACCESS_KEY and R2_BUCKET_NAM
         endpoint_url = f'https://{R2_ACCOUNT_ID}.r2.cloudflarestorage.com'
         logger.info(f"R2 Endpoint URL: {endpoint_url}")
 
+        r2_credentials = {
+            'endpoint_url': endpoint_url,
+            'aws_access_key_id': R2_ACCESS_KEY_ID,
+            'aws_secret_access_key': R2_SECRET_ACCESS_KEY,
+            'region_name': 'auto',
+        }
         r2_client = boto3.client(
             's3',
-            endpoint_url=endpoint_url,
-            aws_access_key_id=R2_ACCESS_KEY_ID,
-            aws_secret_access_key=R2_SECRET_ACCESS_KEY,
-            region_name='auto',
+            **r2_credentials,
             config=boto3.session.Config(
                 signature_version='s3v4',
                 s3={'addressing_style': 'path'}
             )
         )
+        # Separate client for image and job uploads: pool sized for the upload workers, retried by the engine
+        init_r2_uploads(boto3.client('s3', **r2_credentials, config=upload_client_config()), R2_BUCKET_NAME)
         logger.info(f"✅ R2 client initialized for bucket: {R2_BUCKET_NAME}")
     except Exception as e:
         logger.error(f"❌ Failed to initialize R2 client: {e}")
@@ -148,38 +230,41 @@ else:
     logger.warning("⚠️  R2 credentials not configured - images will be returned as base64")
     logger.warning(f"   Missing: {', '.join([k for k, v in {'R2_ACCOUNT_ID': R2_ACCOUNT_ID, 'R2_ACCESS_KEY_ID': R2_ACCESS_KEY_ID, 'R2_SECRET_ACCESS_KEY': R2_SECRET_ACCESS_KEY, 'R2_BUCKET_NAME': R2_BUCKET_NAME}.items() if not v])}")
 
-def upload_image_to_r2(image_base64: str, image_index: int) -> Optional[str]:
+# Conversion cache (local disk, optionally backed by R2)
+init_conversion_cache(r2_client, R2_BUCKET_NAME)
+
+def r2_public_url(key: str) -> str:
+    """Public URL of an object in the R2 bucket"""
+    if R2_PUBLIC_URL:
+        return f"{R2_PUBLIC_URL}/{key}"
+    return f"https://{R2_ACCOUNT_ID}.r2.cloudflarestorage.com/{R2_BUCKET_NAME}/{key}"
+
+async def upload_image_to_r2(image: EncodedImage, image_index: int,
+                             report: Optional[EncodingReport] = None) -> Optional[str]:
     """
     Upload an image to R2 storage and return the public URL
     Returns None if R2 is not configured or upload fails
     """
-    if not r2_client or not R2_BUCKET_NAME:
+    uploads = get_r2_uploads()
+    if not uploads:
         logger.debug("R2 not configured, skipping upload")
         return None
 
     try:
-        # Generate unique filename using hash of image data
-        image_hash = hashlib.md5(image_base64.encode()).hexdigest()[:16]
-        image_filename = f"doc-images/{image_hash}.png"
-
-        # Decode base64 to bytes
-        image_bytes = base64.b64decode(image_base64)
-
-        # Upload to R2
-        r2_client.put_object(
-            Bucket=R2_BUCKET_NAME,
-            Key=image_filename,
-            Body=image_bytes,
-            ContentType='image/png'
-        )
+        # Generate unique filename using hash of image data (and the storage profile)
+        image_filename, media_type = storage_key(image)
 
-        # Generate public URL
-        if R2_PUBLIC_URL:
-            public_url = f"{R2_PUBLIC_URL}/{image_filename}"
-        else:
-            public_url = f"https://{R2_ACCOUNT_ID}.r2.cloudflarestorage.com/{R2_BUCKET_NAME}/{image_filename}"
+        async def encode():
+            return (await asyncio.to_thread(image.reencode, 'storage', report)).data
 
-        logger.info(f"✅ Uploaded image {image_index} to R2: {public_url}")
+        # The key is content-addressed: skip encoding and upload if the object is already in R2
+        uploaded = await uploads.put_bytes_if_absent(image_filename, encode, media_type)
+
+        public_url = r2_public_url(image_filename)
+        if uploaded:
+            logger.info(f"✅ Uploaded image {image_index} to R2: {public_url}")
+        else:
+            logger.debug(f"Image {image_index} already in R2: {public_url}")
         return public_url
 
     except ClientError as e:
@@ -189,6 +274,24 @@ def upload_image_to_r2(image_base64: str, image_index: int) -> Optional[str]:
         logger.error(f"❌ Unexpected error uploading image {image_index}: {e}")
         return None
 
+async def upload_file_to_r2(path: str, key: str, content_type: str) -> Optional[str]:
+    """
+    Upload a local file to R2 storage and return its public URL
+    Returns None if R2 is not configured or upload fails
+    """
+    uploads = get_r2_uploads()
+    if not uploads:
+        logger.debug("R2 not configured, skipping upload")
+        return None
+
+    try:
+        await uploads.put_file(path, key, content_type)
+        return r2_public_url(key)
+
+    except Exception as e:
+        logger.error(f"❌ Failed to upload {key} to R2: {e}")
+        return None
+
 # Response models
 class Coordinates(BaseModel):
     x: float
@@ -216,6 +319,7 @@ class ProcessingResponse(BaseModel):
     total_pages: int
     processing_time: float
     error: Optional[str] = None
+    image_encoding: Optional[Dict[str, Dict[str, Any]]] = None  # Per-profile picture sizes and encode times
 
 
 @app.get("/")
@@ -236,29 +340,83 @@ async def health_check():
         "supported_formats": ["PDF", "DOCX", "PPTX", "HTML"] if DocumentConverter else []
     }
 
-def setup_docling_converter():
-    """Initialize Docling converter with optimized settings for images, text, and tables"""
-    if DocumentConverter is None:
+@app.get("/metrics")
+async def metrics():
+    """Internal processing metrics"""
+    from db_worker import get_worker_stats
+
+    return {
+        "converter_pool": get_conversion_engine().pool_stats(),
+        "conversion_engine": get_conversion_engine().stats(),
+        "conversion_cache": cache.stats() if (cache := get_conversion_cache()) else None,
+        "vision_cache": vcache.stats() if (vcache := get_vision_cache()) else None,
+        "image_index": index.stats() if (index := get_image_index()) else None,
+        "logo_classifier": classifier.stats() if (classifier := get_logo_classifier()) else None,
+        "rate_limiters": rate_limiter_stats(),
+        "http_clients": get_http_clients().stats(),
+        "r2_uploads": uploads.stats() if (uploads := get_r2_uploads()) else None,
+        "image_encoding": encoding_totals.summary(),
+        "db_worker": get_worker_stats()
+    }
+
+@app.delete("/conversion-cache")
+async def purge_conversion_cache(content_hash: Optional[str] = None):
+    """Purge cached conversions (all entries, or only those for one content hash)"""
+    cache = get_conversion_cache()
+    if cache is None:
+        raise HTTPException(status_code=404, detail="Conversion cache is disabled")
+    # Used as a file glob and an R2 prefix, so only a plain SHA-256 may get through
+    if content_hash is not None and not re.fullmatch(r'[0-9a-f]{64}', content_hash):
+        raise HTTPException(status_code=400, detail="content_hash must be a lowercase hex SHA-256 digest")
+
+    removed = await asyncio.to_thread(cache.purge, content_hash)
+    return {"success": True, "removed": removed}
+
+@app.post("/r2-key-index/rebuild")
+async def rebuild_r2_key_index(prefix: str = "doc-images/", authorization: Optional[str] = Header(None)):
+    """Rebuild the known R2 keys under a prefix from a ListObjects sweep of the bucket"""
+    require_service_credential(authorization, "R2 key index rebuilds are disabled unless JOBS_API_TOKEN is set")
+    # Only image objects are indexed; anything wider would sweep the whole bucket
+    if not prefix.startswith("doc-images/"):
+        raise HTTPException(status_code=400, detail="prefix must start with doc-images/")
+
+    uploads = get_r2_uploads()
+    if uploads is None or uploads.key_index is None:
+        raise HTTPException(status_code=404, detail="R2 key index is disabled or R2 is not configured")
+
+    listed = await asyncio.to_thread(uploads.key_index.rebuild, uploads.client, uploads.bucket, prefix)
+    return {"success": True, "keys": listed}
+
+async def convert_document(path: str, profile: str = DEFAULT_PROFILE, content_hash: Optional[str] = None):
+    """
+    Convert a document on the conversion engine (off the event loop)
+    Returns (doc_dict, doc) where doc is rebuilt from the exported dict
+    When content_hash is given the result is stored in the conversion cache
+    """
+    if DoclingDocumentCore is None:
         raise HTTPException(status_code=500, detail="Docling not available")
 
-    # Configure pipeline options for comprehensive processing
-    pipeline_options = PdfPipelineOptions()
-    pipeline_options.do_ocr = True  # Enable OCR for text extraction
-    pipeline_options.do_table_structure = True  # Enable table structure recognition
-    pipeline_options.images_scale = 2.0  # Higher resolution for better image quality
-    pipeline_options.generate_page_images = False  # We don't need full page images
-    pipeline_options.generate_picture_images = True  # CRUCIAL: Enable picture image extraction
-
-    # Create converter with PDF-specific options
-    converter = DocumentConverter(
-        format_options={
-            InputFormat.PDF: PdfFormatOption(
-                pipeline_options=pipeline_options
-            )
-        }
-    )
+    doc_dict = await get_conversion_engine().convert_sharded(path, profile)
+
+    cache = get_conversion_cache()
+    if cache and content_hash:
+        await asyncio.to_thread(cache.put, content_hash, doc_dict, profile)
 
-    return converter
+    doc = DoclingDocumentCore.model_validate(doc_dict)
+    return doc_dict, doc
+
+async def load_cached_document(content_hash: Optional[str], profile: str = DEFAULT_PROFILE):
+    """Return (doc_dict, doc) from the conversion cache, or None on a miss"""
+    cache = get_conversion_cache()
+    if not cache or not content_hash or DoclingDocumentCore is None:
+        return None
+
+    doc_dict = await asyncio.to_thread(cache.get, content_hash, profile)
+    if doc_dict is None:
+        return None
+
+    logger.info(f"Conversion cache hit for {content_hash[:12]}... - skipping Docling")
+    return doc_dict, DoclingDocumentCore.model_validate(doc_dict)
 
 def clean_text_content(text: str) -> str:
     """Clean and normalize text content while preserving important information"""
@@ -327,18 +485,12 @@ def clean_text_content(text: str) -> str:
 
     return text
 
-async def analyze_image_with_vision(image_base64: str, page_no: int, filename: str) -> str:
-    """
-    Use Claude's vision capabilities to generate detailed image descriptions
-    """
-    try:
-        anthropic_api_key = os.getenv("ANTHROPIC_API_KEY")
-        if not anthropic_api_key:
-            logger.warning("ANTHROPIC_API_KEY not found, using generic description")
-            return "Engineering technical diagram chart graph illustration"
+VISION_MODEL = "claude-3-5-haiku-20241022"
+VISION_FALLBACK_DESCRIPTION = "Engineering technical diagram chart graph illustration"
 
-        # Prepare the vision analysis prompt with stricter logo detection
-        prompt = f"""Analyze this image from page {page_no} of the document "{filename}".
+# Vision prompt with stricter logo detection. Nothing document-specific goes in it: descriptions are cached by image
+# content and reused across documents, and chunks already say "(Page N from filename)"
+VISION_PROMPT = """Analyze this image from a document.
 
 CRITICAL FIRST STEP - Logo/Decorative Detection:
 Respond with EXACTLY "LOGO: [description]" if the image is ANY of these:
@@ -365,7 +517,49 @@ For technical content, describe:
 
 Keep to 2-3 sentences maximum."""
 
-        async with httpx.AsyncClient(timeout=30.0) as client:
+# Cached descriptions are only reused for the same model, prompt wording and vision image profile
+VISION_PROMPT_VERSION = hashlib.sha256(
+    f"{VISION_MODEL}\n{VISION_PROMPT}\n{image_profile_fingerprint('vision')}".encode()
+).hexdigest()[:12]
+
+
+async def analyze_image_with_vision(image: EncodedImage, report: Optional[EncodingReport] = None) -> str:
+    """
+    Use Claude's vision capabilities to generate detailed image descriptions
+    Descriptions are cached by image content, so a repeated image costs no API call
+    """
+    if not os.getenv("ANTHROPIC_API_KEY"):
+        logger.warning("ANTHROPIC_API_KEY not found, using generic description")
+        return VISION_FALLBACK_DESCRIPTION
+
+    async def request_description():
+        # Encoded for the vision profile only on a cache miss
+        vision_image = await asyncio.to_thread(image.reencode, 'vision', report)
+        return await request_vision_description(vision_image.base64, vision_image.media_type)
+
+    try:
+        cache = get_vision_cache()
+        if cache:
+            description = await cache.get_or_compute(image.sha256, VISION_PROMPT_VERSION, request_description)
+        else:
+            description = await request_description()
+    except Exception as e:
+        logger.error(f"Error analyzing image with vision: {e}")
+        description = None
+
+    return description or VISION_FALLBACK_DESCRIPTION
+
+
+async def request_vision_description(image_base64: str, media_type: str = 'image/png') -> Optional[str]:
+    """Call the Anthropic API for one image; None if no description could be obtained"""
+    try:
+        anthropic_api_key = os.getenv("ANTHROPIC_API_KEY")
+
+        limiter = get_rate_limiter('anthropic')
+
+        client = get_http_client('anthropic')
+        for attempt in range(RATE_LIMIT_MAX_RETRIES + 1):
+            await limiter.acquire()
             response = await client.post(
                 "https://api.anthropic.com/v1/messages",
                 headers={
@@ -374,7 +568,7 @@ Keep to 2-3 sentences maximum."""
                     "content-type": "application/json"
                 },
                 json={
-                    "model": "claude-3-5-haiku-20241022",
+                    "model": VISION_MODEL,
                     "max_tokens": 300,
                     "messages": [
                         {
@@ -384,13 +578,13 @@ Keep to 2-3 sentences maximum."""
                                     "type": "image",
                                     "source": {
                                         "type": "base64",
-                                        "media_type": "image/png",
+                                        "media_type": media_type,
                                         "data": image_base64
                                     }
                                 },
                                 {
                                     "type": "text",
-                                    "text": prompt
+                                    "text": VISION_PROMPT
                                 }
                             ]
                         }
@@ -398,59 +592,56 @@ Keep to 2-3 sentences maximum."""
                 }
             )
 
+            # 429 (rate limited) and 529 (overloaded): slow down (even when giving up, so later calls back off too) and retry
+            if response.status_code in (429, 529):
+                limiter.record_rate_limited(parse_retry_after(response.headers.get("retry-after")))
+                if attempt < RATE_LIMIT_MAX_RETRIES:
+                    continue
             if response.status_code == 200:
-                result = response.json()
-                description = result.get("content", [{}])[0].get("text", "")
-                if description:
-                    logger.info(f"Generated vision description: {description[:100]}...")
-                    return description
-                else:
-                    logger.warning("Empty description from vision API")
-                    return "Engineering technical diagram chart graph illustration"
+                limiter.record_success()
+            break
+
+        if response.status_code == 200:
+            result = response.json()
+            description = result.get("content", [{}])[0].get("text", "")
+            if description:
+                logger.info(f"Generated vision description: {description[:100]}...")
+                return description
             else:
-                logger.error(f"Vision API error: {response.status_code} - {response.text}")
-                return "Engineering technical diagram chart graph illustration"
+                logger.warning("Empty description from vision API")
+                return None
+        else:
+            logger.error(f"Vision API error: {response.status_code} - {response.text}")
+            return None
 
     except Exception as e:
         logger.error(f"Error analyzing image with vision: {e}")
-        return "Engineering technical diagram chart graph illustration"
+        return None
 
-def extract_image_from_picture(picture) -> Optional[str]:
-    """Extract image data from a docling picture element and return as base64"""
+def extract_image_from_picture(picture) -> Optional[EncodedImage]:
+    """Extract image data from a docling picture element, PNG-encoded once"""
     try:
         # Method 1: Check if picture has image attribute with pil_image (most common case)
         if hasattr(picture, 'image') and picture.image:
             if hasattr(picture.image, 'pil_image') and picture.image.pil_image:
                 logger.debug("Found PIL image in picture.image.pil_image")
-                buffer = io.BytesIO()
-                picture.image.pil_image.save(buffer, format='PNG')
-                img_bytes = buffer.getvalue()
-                return base64.b64encode(img_bytes).decode('utf-8')
+                return EncodedImage.from_pil(picture.image.pil_image)
 
             # Fallback: try direct image access
             elif hasattr(picture.image, 'save'):
                 logger.debug("Found PIL image in picture.image")
-                buffer = io.BytesIO()
-                picture.image.save(buffer, format='PNG')
-                img_bytes = buffer.getvalue()
-                return base64.b64encode(img_bytes).decode('utf-8')
+                return EncodedImage.from_pil(picture.image)
 
         # Method 2: Check if picture has direct pil_image attribute
         if hasattr(picture, 'pil_image') and picture.pil_image:
             logger.debug("Found PIL image in picture.pil_image")
-            buffer = io.BytesIO()
-            picture.pil_image.save(buffer, format='PNG')
-            img_bytes = buffer.getvalue()
-            return base64.b64encode(img_bytes).decode('utf-8')
+            return EncodedImage.from_pil(picture.pil_image)
 
         # Method 3: Check if picture has data attribute with pil_image
         if hasattr(picture, 'data') and picture.data:
             if hasattr(picture.data, 'pil_image') and picture.data.pil_image:
                 logger.debug("Found PIL image in picture.data.pil_image")
-                buffer = io.BytesIO()
-                picture.data.pil_image.save(buffer, format='PNG')
-                img_bytes = buffer.getvalue()
-                return base64.b64encode(img_bytes).decode('utf-8')
+                return EncodedImage.from_pil(picture.data.pil_image)
 
         # Debug: Log available attributes to help diagnose
         available_attrs = [attr for attr in dir(picture) if not attr.startswith('_')]
@@ -467,9 +658,18 @@ def extract_image_from_picture(picture) -> Optional[str]:
         logger.warning(f"Error extracting image from picture element: {e}")
         return None
 
-async def extract_chunks_from_json(doc_dict: dict, doc: DoclingDocument, filename: str = '', max_chunk_size: int = 1000) -> List[ProcessedChunk]:
-    """Extract chunks from DoclingDocument JSON representation (lossless method)"""
+async def iter_chunks_from_json(doc_dict: dict, doc: DoclingDocument, filename: str = '', max_chunk_size: int = 1000,
+                                progress_callback: Optional[Callable[[int, int], None]] = None,
+                                ordered: bool = False,
+                                encoding_report: Optional[EncodingReport] = None) -> AsyncIterator[ProcessedChunk]:
+    """
+    Yield chunks from DoclingDocument JSON representation (lossless method) as soon as they are ready:
+    text chunks page by page, then image chunks as their vision calls finish (in document order if ordered)
+    progress_callback(done, total) is called as each page is chunked and each image is analyzed
+    Picture re-encoding sizes and times are added to encoding_report
+    """
     chunks = []
+    report = encoding_report if encoding_report is not None else EncodingReport()
 
     try:
         logger.info("Processing DoclingDocument from JSON export (lossless method)")
@@ -510,48 +710,16 @@ async def extract_chunks_from_json(doc_dict: dict, doc: DoclingDocument, filenam
         # Create text chunks with page numbers
         overlap_size = max_chunk_size // 5  # 20% overlap
 
+        # Progress units: pages of text, then images
+        units_done = 0
+        units_total = len(text_chunks_by_page) + len(getattr(doc, 'pictures', None) or [])
+
         for page_no in sorted(text_chunks_by_page.keys()):
             page_text = text_chunks_by_page[page_no]
+            page_start = len(chunks)
 
-            # Split into sentences
-            sentences = [s.strip() + ('.' if not s.strip().endswith(('.', '!', '?')) else '')
-                        for s in page_text.split('. ') if s.strip()]
-
-            # Create chunks from sentences
-            current_chunk = []
-            current_length = 0
-
-            for sentence in sentences:
-                if current_length + len(sentence) > max_chunk_size and current_chunk:
-                    # Save current chunk
-                    chunk_content = ' '.join(current_chunk)
-                    chunks.append(ProcessedChunk(
-                        content=chunk_content,
-                        content_type='text',
-                        page=page_no,
-                        coordinates=None
-                    ))
-
-                    # Create overlap
-                    overlap_sentences = []
-                    overlap_length = 0
-                    for j in range(len(current_chunk) - 1, -1, -1):
-                        test_sentence = current_chunk[j]
-                        if overlap_length + len(test_sentence) <= overlap_size:
-                            overlap_sentences.insert(0, test_sentence)
-                            overlap_length += len(test_sentence)
-                        else:
-                            break
-
-                    current_chunk = overlap_sentences + [sentence]
-                    current_length = sum(len(s) for s in current_chunk)
-                else:
-                    current_chunk.append(sentence)
-                    current_length += len(sentence)
-
-            # Add remaining chunk for this page
-            if current_chunk:
-                chunk_content = ' '.join(current_chunk)
+            # Split into sentences and pack them into overlapping chunks
+            for chunk_content in chunk_page_text(page_text, max_chunk_size, overlap_size):
                 chunks.append(ProcessedChunk(
                     content=chunk_content,
                     content_type='text',
@@ -559,6 +727,14 @@ async def extract_chunks_from_json(doc_dict: dict, doc: DoclingDocument, filenam
                     coordinates=None
                 ))
 
+            units_done += 1
+            if progress_callback:
+                progress_callback(units_done, units_total)
+
+            # This page is complete - hand its chunks out before chunking the next one
+            for chunk in chunks[page_start:]:
+                yield chunk
+
         logger.info(f"Created {len(chunks)} text chunks with page numbers preserved")
 
         # Extract images with page numbers - PARALLEL PROCESSING
@@ -570,18 +746,13 @@ async def extract_chunks_from_json(doc_dict: dict, doc: DoclingDocument, filenam
 
             for i, picture in enumerate(doc.pictures):
                 try:
-                    image_data = extract_image_from_picture(picture)
-                    if not image_data:
+                    image = extract_image_from_picture(picture)
+                    if image is None:
                         continue
 
                     # Minimal validation - just check if image data exists
-                    try:
-                        decoded_bytes = base64.b64decode(image_data)
-                        if len(decoded_bytes) < 100:
-                            logger.debug(f"Skipping image {i+1}: corrupted or empty")
-                            continue
-                    except Exception as e:
-                        logger.warning(f"Error validating image data: {e}")
+                    if len(image) < 100:
+                        logger.debug(f"Skipping image {i+1}: corrupted or empty")
                         continue
 
                     page_no = 1
@@ -599,9 +770,10 @@ async def extract_chunks_from_json(doc_dict: dict, doc: DoclingDocument, filenam
 
                     valid_images.append({
                         'index': i,
-                        'image_data': image_data,
+                        'image': image,
                         'page_no': page_no,
-                        'caption_text': caption_text
+                        'caption_text': caption_text,
+                        'position': picture_position(picture, doc)
                     })
 
                 except Exception as e:
@@ -610,21 +782,83 @@ async def extract_chunks_from_json(doc_dict: dict, doc: DoclingDocument, filenam
             # Process all images in parallel (with concurrency limit to avoid rate limits)
             logger.info(f"Analyzing {len(valid_images)} valid images with vision AI in parallel...")
 
+            # Group near-identical pictures (perceptual hash) so each distinct image is analyzed and uploaded once;
+            # the cross-document index also reuses descriptions and URLs from earlier documents
+            image_index = get_image_index()
+            if image_index:
+                signatures = await asyncio.to_thread(
+                    lambda: [image_signature(img['image'].data) for img in valid_images]
+                )
+                document_index = NearDuplicateIndex(image_index.max_distance)
+                for img_info, signature in zip(valid_images, signatures):
+                    img_info['signature'] = signature
+                    if signature is None:
+                        continue
+                    leader = document_index.find(signature)
+                    if leader is not None:
+                        img_info['duplicate_of'] = leader
+                    else:
+                        document_index.add(signature, img_info)
+                        img_info['shared'] = asyncio.get_running_loop().create_future()
+
+                duplicates = sum(1 for img in valid_images if 'duplicate_of' in img)
+                if duplicates:
+                    image_index.count_document_duplicates(duplicates)
+                    logger.info(f"{duplicates} pictures are near-duplicates of earlier pictures in this document")
+
+            async def describe_and_upload(img_info):
+                """(vision description, R2 URL) for a picture, reusing earlier results for near-duplicates"""
+                leader = img_info.get('duplicate_of')
+                if leader is not None:
+                    shared = await asyncio.shield(leader['shared'])
+                    if shared:
+                        return shared
+                    # The first occurrence failed - process this one on its own
+
+                signature = img_info.get('signature')
+                if signature:
+                    known = await asyncio.to_thread(image_index.lookup, signature, VISION_PROMPT_VERSION)
+                    if known:
+                        image_url = known['image_url'] or await upload_image_to_r2(img_info['image'], img_info['index'], report)
+                        return known['description'], image_url
+
+                async def describe():
+                    # Obvious logos and ornaments are labelled locally instead of by the vision API
+                    classifier = get_logo_classifier()
+                    if classifier:
+                        decorative, confidence = await asyncio.to_thread(
+                            classifier.classify, img_info['image'].data, img_info.get('position')
+                        )
+                        if decorative:
+                            logger.info(f"Image {img_info['index']} classified as decorative locally ({confidence:.2f}), skipping vision")
+                            return LOCAL_LOGO_DESCRIPTION
+
+                    return await analyze_image_with_vision(img_info['image'], report)
+
+                # Upload image to R2 (if configured) while the description is being produced
+                vision_description, image_url = await asyncio.gather(
+                    describe(),
+                    upload_image_to_r2(img_info['image'], img_info['index'], report)
+                )
+
+                if signature and vision_description not in (VISION_FALLBACK_DESCRIPTION, LOCAL_LOGO_DESCRIPTION):
+                    await asyncio.to_thread(image_index.add, signature, VISION_PROMPT_VERSION, vision_description, image_url)
+
+                return vision_description, image_url
+
             async def process_single_image(img_info):
+                shared = img_info.get('shared')
+                result = None
                 try:
-                    vision_description = await analyze_image_with_vision(
-                        img_info['image_data'],
-                        img_info['page_no'],
-                        filename
-                    )
+                    vision_description, image_url = result = await describe_and_upload(img_info)
                     content = f"{vision_description} (Page {img_info['page_no']} from {filename}){img_info['caption_text']}"
 
-                    # Upload image to R2 (if configured)
-                    image_url = upload_image_to_r2(img_info['image_data'], img_info['index'])
-
                     # If R2 upload succeeded, clear base64 data to save bandwidth
                     # Otherwise keep base64 as fallback
-                    image_data = None if image_url else img_info['image_data']
+                    if image_url:
+                        image_data = None
+                    else:
+                        image_data = (await asyncio.to_thread(img_info['image'].reencode, 'inline', report)).base64
 
                     return ProcessedChunk(
                         content=content,
@@ -637,22 +871,47 @@ async def extract_chunks_from_json(doc_dict: dict, doc: DoclingDocument, filenam
                 except Exception as e:
                     logger.warning(f"Failed to process image {img_info['index']}: {e}")
                     return None
+                finally:
+                    # Near-duplicates later in the document are waiting on this result
+                    if shared and not shared.done():
+                        shared.set_result(result)
+                    # Done with the encoded picture; don't hold every picture of the document until the end
+                    img_info['image'] = None
 
             # Process images with concurrency limit (10 at a time for faster processing)
             semaphore = asyncio.Semaphore(10)
 
+            units_total = units_done + len(valid_images)
+
             async def process_with_limit(img_info):
+                nonlocal units_done
+                if 'duplicate_of' in img_info:
+                    # Wait for the first occurrence without holding a slot
+                    await asyncio.wait([img_info['duplicate_of']['shared']])
                 async with semaphore:
-                    return await process_single_image(img_info)
+                    result = await process_single_image(img_info)
+                units_done += 1
+                if progress_callback:
+                    progress_callback(units_done, units_total)
+                return result
 
-            image_chunks = await asyncio.gather(*[process_with_limit(img) for img in valid_images])
-
-            # Add successful chunks
-            for chunk in image_chunks:
-                if chunk is not None:
-                    chunks.append(chunk)
+            tasks = [asyncio.ensure_future(process_with_limit(img)) for img in valid_images]
+            try:
+                for next_chunk in (tasks if ordered else asyncio.as_completed(tasks)):
+                    chunk = await next_chunk
+                    # Add successful chunks
+                    if chunk is not None:
+                        chunks.append(chunk)
+                        yield chunk
+            finally:
+                # Consumer went away (e.g. a streaming client disconnected) - stop pending vision calls
+                for task in tasks:
+                    task.cancel()
 
             logger.info(f"Successfully extracted {len([c for c in chunks if c.content_type == 'image'])} images")
+            for profile, totals in report.summary().items():
+                logger.info(f"🖼️  {filename} {profile} images: {totals['images']} re-encoded, "
+                            f"{totals['source_bytes']} -> {totals['encoded_bytes']} bytes in {totals['seconds']}s")
 
         # Extract tables
         if hasattr(doc, 'tables') and doc.tables:
@@ -666,18 +925,47 @@ async def extract_chunks_from_json(doc_dict: dict, doc: DoclingDocument, filenam
         logger.error(f"Error processing JSON document: {e}")
         raise
 
-    return chunks
 
-
-@app.post("/process-document", response_model=ProcessingResponse)
-async def process_document(file: UploadFile = File(..., max_size=MAX_UPLOAD_SIZE)):
+async def extract_chunks_from_json(doc_dict: dict, doc: DoclingDocument, filename: str = '', max_chunk_size: int = 1000,
+                                   progress_callback: Optional[Callable[[int, int], None]] = None,
+                                   encoding_report: Optional[EncodingReport] = None) -> List[ProcessedChunk]:
     """
-    Process a document using Docling for advanced layout analysis
-    Extracts text, images, and tables from PDF, DOCX, PPTX, and HTML files
+    Extract all chunks from DoclingDocument JSON representation (lossless method)
+    progress_callback(done, total) is called as each page is chunked and each image is analyzed
     """
-    start_time = time.time()
-    temp_path = None
+    return [chunk async for chunk in iter_chunks_from_json(doc_dict, doc, filename, max_chunk_size,
+                                                          progress_callback, ordered=True,
+                                                          encoding_report=encoding_report)]
+
 
+async def spool_upload(file: UploadFile, dest, max_size: int = MAX_UPLOAD_SIZE):
+    """
+    Copy an upload into dest in fixed-size chunks, enforcing max_size as it goes
+    Returns (size in bytes, sha256 hex digest)
+    """
+    hasher = hashlib.sha256()
+    size = 0
+    while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+        size += len(chunk)
+        if size > max_size:
+            raise UploadTooLarge(max_size)
+        hasher.update(chunk)
+        dest.write(chunk)
+    dest.flush()
+    return size, hasher.hexdigest()
+
+
+# Content types accepted by the document endpoints
+ALLOWED_UPLOAD_TYPES = [
+    "application/pdf",
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    "application/vnd.openxmlformats-officedocument.presentationml.presentation",
+    "text/html"
+]
+
+
+def validate_upload(file: UploadFile):
+    """Reject requests that can't be processed before reading the body"""
     if DocumentConverter is None:
         raise HTTPException(
             status_code=500,
@@ -685,46 +973,79 @@ async def process_document(file: UploadFile = File(..., max_size=MAX_UPLOAD_SIZE
         )
 
     # Validate file type
-    allowed_types = [
-        "application/pdf",
-        "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-        "application/vnd.openxmlformats-officedocument.presentationml.presentation",
-        "text/html"
-    ]
-    if file.content_type not in allowed_types:
+    if file.content_type not in ALLOWED_UPLOAD_TYPES:
         raise HTTPException(
             status_code=400,
             detail=f"Unsupported file type: {file.content_type}. Supported: PDF, DOCX, PPTX, HTML"
         )
 
-    try:
-        # Save uploaded file to temporary location
-        file_extension = file.filename.split('.')[-1] if file.filename and '.' in file.filename else 'pdf'
-        with tempfile.NamedTemporaryFile(delete=False, suffix=f".{file_extension}") as tmp_file:
-            content = await file.read()
-            tmp_file.write(content)
-            tmp_file.flush()
-            temp_path = tmp_file.name
 
-        logger.info(f"Processing file: {file.filename} ({len(content)} bytes)")
+async def save_upload(file: UploadFile):
+    """
+    Save an uploaded file to a temporary location
+    Returns (temp path, size in bytes, sha256 hex digest); the caller removes the file
+    """
+    file_extension = file.filename.split('.')[-1] if file.filename and '.' in file.filename else 'pdf'
+    with tempfile.NamedTemporaryFile(delete=False, suffix=f".{file_extension}") as tmp_file:
+        temp_path = tmp_file.name
+        try:
+            file_size, content_hash = await spool_upload(file, tmp_file)
+        except BaseException:
+            remove_temp_file(temp_path)
+            raise
+
+    logger.info(f"Processing file: {file.filename} ({file_size} bytes, sha256 {content_hash[:12]}...)")
+    return temp_path, file_size, content_hash
+
+
+def remove_temp_file(temp_path: Optional[str]):
+    """Clean up a temporary upload (if it wasn't moved elsewhere)"""
+    if temp_path and os.path.exists(temp_path):
+        try:
+            os.unlink(temp_path)
+            logger.debug(f"Cleaned up temporary file: {temp_path}")
+        except Exception as e:
+            logger.warning(f"Failed to cleanup temp file {temp_path}: {e}")
+
 
-        # Setup Docling converter
-        converter = setup_docling_converter()
+async def load_or_convert_document(temp_path: str, content_hash: str):
+    """Identical uploads reuse the cached conversion; otherwise convert in a worker (lossless JSON export)"""
+    cached = await load_cached_document(content_hash)
+    if cached:
+        return cached
+    return await convert_document(temp_path, content_hash=content_hash)
 
-        # Process document
-        result = converter.convert(temp_path)
-        doc = result.document
 
-        # Export to JSON (lossless method)
-        doc_dict = doc.export_to_dict()
+def count_pages(doc_dict: dict, doc) -> int:
+    # Get total pages from JSON - pages is at top level
+    total_pages = len(doc_dict.get('pages', []))
+    if total_pages == 0:
+        total_pages = len(doc.pages) if hasattr(doc, 'pages') and doc.pages else 1
+    return total_pages
+
+
+@app.post("/process-document", response_model=ProcessingResponse)
+async def process_document(file: UploadFile = File(..., max_size=MAX_UPLOAD_SIZE)):
+    """
+    Process a document using Docling for advanced layout analysis
+    Extracts text, images, and tables from PDF, DOCX, PPTX, and HTML files
+    """
+    start_time = time.time()
+    temp_path = None
+
+    validate_upload(file)
+
+    try:
+        temp_path, _, content_hash = await save_upload(file)
+
+        doc_dict, doc = await load_or_convert_document(temp_path, content_hash)
 
         # Extract chunks from JSON
-        chunks = await extract_chunks_from_json(doc_dict, doc, file.filename or 'document')
+        encoding_report = EncodingReport()
+        chunks = await extract_chunks_from_json(doc_dict, doc, file.filename or 'document',
+                                                encoding_report=encoding_report)
 
-        # Get total pages from JSON - pages is at top level
-        total_pages = len(doc_dict.get('pages', []))
-        if total_pages == 0:
-            total_pages = len(result.document.pages) if hasattr(result.document, 'pages') and result.document.pages else 1
+        total_pages = count_pages(doc_dict, doc)
 
         processing_time = time.time() - start_time
 
@@ -734,7 +1055,8 @@ async def process_document(file: UploadFile = File(..., max_size=MAX_UPLOAD_SIZE
             success=True,
             chunks=chunks,
             total_pages=total_pages,
-            processing_time=processing_time
+            processing_time=processing_time,
+            image_encoding=encoding_report.summary()
         )
 
     except HTTPException:
@@ -754,13 +1076,226 @@ async def process_document(file: UploadFile = File(..., max_size=MAX_UPLOAD_SIZE
         )
 
     finally:
-        # Clean up temporary file
-        if temp_path:
-            try:
-                os.unlink(temp_path)
-                logger.debug(f"Cleaned up temporary file: {temp_path}")
-            except Exception as e:
-                logger.warning(f"Failed to cleanup temp file {temp_path}: {e}")
+        remove_temp_file(temp_path)
+
+
+def encode_stream_record(record: dict, stream_format: str) -> str:
+    """One NDJSON line or one server-sent event"""
+    data = json.dumps(record)
+    if stream_format == 'sse':
+        return f"event: {record['type']}\ndata: {data}\n\n"
+    return data + "\n"
+
+
+@app.post("/process-document/stream")
+async def process_document_stream(file: UploadFile = File(..., max_size=MAX_UPLOAD_SIZE), format: str = 'ndjson'):
+    """
+    Streaming variant of /process-document
+    Emits each ProcessedChunk as soon as it is ready - text page by page, then images as their
+    vision analysis finishes - followed by a summary record, as NDJSON (default) or server-sent events (?format=sse)
+    """
+    if format not in ('ndjson', 'sse'):
+        raise HTTPException(status_code=400, detail="format must be 'ndjson' or 'sse'")
+
+    start_time = time.time()
+    validate_upload(file)
+
+    # Read the whole upload before the response starts so size errors are still plain HTTP errors
+    temp_path, _, content_hash = await save_upload(file)
+    filename = file.filename or 'document'
+
+    async def records():
+        chunk_count = 0
+        total_pages = 0
+        encoding_report = EncodingReport()
+        try:
+            yield encode_stream_record({'type': 'status', 'stage': 'converting'}, format)
+            doc_dict, doc = await load_or_convert_document(temp_path, content_hash)
+            total_pages = count_pages(doc_dict, doc)
+            yield encode_stream_record({'type': 'status', 'stage': 'extracting', 'total_pages': total_pages}, format)
+
+            async for chunk in iter_chunks_from_json(doc_dict, doc, filename, encoding_report=encoding_report):
+                chunk_count += 1
+                yield encode_stream_record({'type': 'chunk', 'chunk': chunk.model_dump(exclude_none=True)}, format)
+
+            processing_time = time.time() - start_time
+            logger.info(f"Successfully streamed {filename}: {chunk_count} chunks, {total_pages} pages in {processing_time:.2f}s")
+            yield encode_stream_record({
+                'type': 'summary',
+                'success': True,
+                'total_chunks': chunk_count,
+                'total_pages': total_pages,
+                'processing_time': processing_time,
+                'image_encoding': encoding_report.summary(),
+            }, format)
+
+        except Exception as e:
+            logger.error(f"Error streaming document {filename}: {e}")
+            yield encode_stream_record({
+                'type': 'summary',
+                'success': False,
+                'total_chunks': chunk_count,
+                'total_pages': total_pages,
+                'processing_time': time.time() - start_time,
+                'error': str(e),
+            }, format)
+
+    media_type = 'text/event-stream' if format == 'sse' else 'application/x-ndjson'
+    # Runs even if the client disconnects before the body is iterated, when a finally in records() never would
+    return StreamingResponse(records(), media_type=media_type, headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+                             background=BackgroundTask(remove_temp_file, temp_path))
+
+class BatchRequest(BaseModel):
+    # Manifest entries: 'r2://<key>', a local path under BATCH_LOCAL_ROOT, or {"r2_key": ...} / {"path": ...}
+    items: List[Any]
+
+
+@app.post("/batch")
+async def process_batch(request: BatchRequest):
+    """
+    Process many documents in one call over the shared conversion workers
+    Streams one NDJSON record per document (duplicates by content hash are reported, not reconverted),
+    then a summary with aggregate pages/sec
+    """
+    from batch import BatchRunner, parse_manifest, BATCH_LOCAL_ROOT, BATCH_R2_PREFIX
+
+    try:
+        items = parse_manifest(request.items)
+    except (ValueError, TypeError, AttributeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    runner = BatchRunner(local_root=BATCH_LOCAL_ROOT, allow_local_paths=bool(BATCH_LOCAL_ROOT),
+                         r2_prefix=BATCH_R2_PREFIX, allow_r2_keys=bool(BATCH_R2_PREFIX))
+
+    async def records():
+        async for record in runner.run(items):
+            yield encode_stream_record(record, 'ndjson')
+
+    return StreamingResponse(records(), media_type='application/x-ndjson', headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+class JobSubmittedResponse(BaseModel):
+    job_id: str
+    status: str
+
+
+class JobStatusResponse(BaseModel):
+    job_id: str
+    status: str  # 'queued', 'processing', 'completed', 'failed'
+    progress: int
+    message: Optional[str] = None
+    error: Optional[str] = None
+    filename: Optional[str] = None
+    total_pages: Optional[int] = None
+    chunks_count: Optional[int] = None
+    processing_time_ms: Optional[int] = None
+    chunks: Optional[List[ProcessedChunk]] = None  # Local job store only; database jobs go to Pinecone
+
+
+# Service credential callers must send as "Authorization: Bearer <token>" to use /jobs with DATABASE_URL set
+JOBS_API_TOKEN = os.getenv("JOBS_API_TOKEN")
+
+
+def get_job_worker():
+    try:
+        from db_worker import get_worker
+    except ImportError:
+        return None
+    return get_worker()
+
+
+def authorize_job_request(worker, authorization: Optional[str]) -> None:
+    """
+    Database-backed jobs are stored under the caller's user_id and embedded into the shared Pinecone index,
+    so they need the service credential and are refused when none is configured; the local SQLite store stays open
+    """
+    if worker.database_url is None:
+        return
+    require_service_credential(authorization, "/jobs is disabled with DATABASE_URL unless JOBS_API_TOKEN is set")
+
+
+def require_service_credential(authorization: Optional[str], disabled_detail: str) -> None:
+    """Check the JOBS_API_TOKEN bearer token; 403 with disabled_detail when no token is configured"""
+    if not JOBS_API_TOKEN:
+        raise HTTPException(status_code=403, detail=disabled_detail)
+
+    scheme, _, token = (authorization or '').partition(' ')
+    if scheme.lower() != 'bearer' or not hmac.compare_digest(token.encode('utf-8'), JOBS_API_TOKEN.encode('utf-8')):
+        raise HTTPException(status_code=401, detail="Invalid or missing service credential",
+                            headers={"WWW-Authenticate": "Bearer"})
+
+
+def _optional_int(value) -> Optional[int]:
+    return int(value) if value not in (None, '') else None
+
+
+@app.post("/jobs", response_model=JobSubmittedResponse, status_code=202)
+async def submit_job(file: UploadFile = File(..., max_size=MAX_UPLOAD_SIZE), user_id: Optional[str] = Form(None),
+                     authorization: Optional[str] = Header(None)):
+    """
+    Queue a document for processing and return immediately
+    Poll GET /jobs/{job_id} for progress and results
+    """
+    worker = get_job_worker()
+    if worker is None:
+        raise HTTPException(status_code=503, detail="Job worker is not running")
+    authorize_job_request(worker, authorization)
+
+    validate_upload(file)
+
+    if worker.database_url is not None:
+        # DocumentProcessingJob.userId is a UUID column
+        try:
+            user_id = str(uuid.UUID(user_id or ''))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="user_id must be a UUID")
+
+    temp_path, file_size, content_hash = await save_upload(file)
+    try:
+        job_id = await worker.submit_job(
+            temp_path, file.filename or 'document', file.content_type, file_size, content_hash, user_id=user_id
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except RuntimeError as e:
+        # The file couldn't be copied to R2 for the worker
+        raise HTTPException(status_code=503, detail=str(e))
+    finally:
+        remove_temp_file(temp_path)
+
+    logger.info(f"Queued job {job_id} for {file.filename}")
+    return JobSubmittedResponse(job_id=job_id, status='queued')
+
+
+@app.get("/jobs/{job_id}", response_model=JobStatusResponse, response_model_exclude_none=True)
+async def get_job(job_id: str, authorization: Optional[str] = Header(None)):
+    """Status, progress and (once completed) results of a job"""
+    worker = get_job_worker()
+    if worker is None:
+        raise HTTPException(status_code=503, detail="Job worker is not running")
+    authorize_job_request(worker, authorization)
+
+    try:
+        job_id = str(uuid.UUID(job_id))
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    job = await worker.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    return JobStatusResponse(
+        job_id=job_id,
+        status=job['status'],
+        progress=_optional_int(job['progress']) or 0,
+        message=job.get('message'),
+        error=job.get('errorMessage'),
+        filename=job.get('filename'),
+        total_pages=_optional_int(job.get('totalPages')),
+        chunks_count=_optional_int(job.get('chunksCount')),
+        processing_time_ms=_optional_int(job.get('processingTimeMs')),
+        chunks=job.get('result') if job['status'] == 'completed' else None,
+    )
 
 if __name__ == "__main__":
     port = int(os.getenv("PORT", 8001))
@@ -0,0 +1,119 @@
+"""
+PDF Page-Range Sharding
+Splits large PDFs into page ranges and merges the per-shard DoclingDocument dicts
+"""
+
+import re
+import copy
+import logging
+from typing import List, Dict, Any, Tuple, Optional
+
+try:
+    import pypdfium2 as pdfium  # Installed with docling
+except ImportError:
+    pdfium = None
+
+logger = logging.getLogger(__name__)
+
+# DoclingDocument arrays addressed by JSON pointers such as "#/texts/12"
+ITEM_ARRAYS = ('groups', 'texts', 'pictures', 'tables', 'key_value_items', 'form_items')
+
+REF_PATTERN = re.compile(r'^#/(\w+)/(\d+)$')
+
+
+def count_pdf_pages(path: str) -> Optional[int]:
+    """Return the number of pages in a PDF, or None if it can't be determined"""
+    if pdfium is None:
+        return None
+    try:
+        pdf = pdfium.PdfDocument(path)
+        try:
+            return len(pdf)
+        finally:
+            pdf.close()
+    except Exception as e:
+        logger.debug(f"Could not count pages of {path}: {e}")
+        return None
+
+
+def plan_shards(total_pages: int, shard_pages: int) -> List[Tuple[int, int]]:
+    """Split 1..total_pages into inclusive (start, end) page ranges of at most shard_pages"""
+    return [(start, min(start + shard_pages - 1, total_pages))
+            for start in range(1, total_pages + 1, shard_pages)]
+
+
+def _rebase_refs(node: Any, offsets: Dict[str, int]) -> Any:
+    """Shift every "#/<array>/<n>" reference in a shard by that array's offset"""
+    if isinstance(node, dict):
+        rebased = {}
+        for key, value in node.items():
+            if key in ('$ref', 'self_ref') and isinstance(value, str):
+                match = REF_PATTERN.match(value)
+                if match and match.group(1) in offsets:
+                    value = f"#/{match.group(1)}/{int(match.group(2)) + offsets[match.group(1)]}"
+                rebased[key] = value
+            else:
+                rebased[key] = _rebase_refs(value, offsets)
+        return rebased
+    if isinstance(node, list):
+        return [_rebase_refs(item, offsets) for item in node]
+    return node
+
+
+def _renumber_pages(shard: Dict[str, Any], page_offset: int) -> None:
+    """Shift prov.page_no and the pages map of a shard by page_offset (in place)"""
+    if page_offset == 0:
+        return
+
+    for array in ITEM_ARRAYS:
+        for item in shard.get(array, []):
+            for prov in item.get('prov', []):
+                if prov.get('page_no') is not None:
+                    prov['page_no'] += page_offset
+
+    pages = {}
+    for page_key, page in shard.get('pages', {}).items():
+        page_no = int(page_key) + page_offset
+        page['page_no'] = page_no
+        pages[str(page_no)] = page
+    shard['pages'] = pages
+
+
+def merge_docling_dicts(shards: List[Tuple[int, Dict[str, Any]]]) -> Dict[str, Any]:
+    """
+    Merge per-shard doc.export_to_dict() results into one document dict
+    shards is a list of (first_page, doc_dict) in any order
+    """
+    merged: Optional[Dict[str, Any]] = None
+
+    for first_page, shard in sorted(shards, key=lambda s: s[0]):
+        shard = copy.deepcopy(shard)
+
+        # Docling keeps absolute page numbers for page_range conversions, but if a
+        # shard starts counting at 1 again, move it back to its real position
+        page_numbers = [int(k) for k in shard.get('pages', {})]
+        if page_numbers:
+            _renumber_pages(shard, first_page - min(page_numbers))
+
+        if merged is None:
+            merged = shard
+            continue
+
+        offsets = {array: len(merged.get(array, [])) for array in ITEM_ARRAYS}
+        shard = _rebase_refs(shard, offsets)
+
+        for array in ITEM_ARRAYS:
+            if shard.get(array):
+                merged.setdefault(array, []).extend(shard[array])
+
+        for layer in ('body', 'furniture'):
+            if shard.get(layer) and shard[layer].get('children'):
+                merged.setdefault(layer, {}).setdefault('children', []).extend(shard[layer]['children'])
+
+        merged.setdefault('pages', {}).update(shard.get('pages', {}))
+
+    if merged is None:
+        raise ValueError("No shards to merge")
+
+    merged['pages'] = dict(sorted(merged.get('pages', {}).items(), key=lambda p: int(p[0])))
+    return merged
@@ -0,0 +1,119 @@
+"""
+Job Progress Reporter
+Collects fine-grained job progress and writes it to DocumentProcessingJob in coalesced batches
+"""
+
+import os
+import asyncio
+import logging
+from typing import Dict, Any, Optional, Callable, Tuple
+
+from psycopg2.extras import execute_values
+
+logger = logging.getLogger(__name__)
+
+# Seconds between progress flushes (at most one UPDATE per job per interval)
+WORKER_PROGRESS_INTERVAL = float(os.getenv('WORKER_PROGRESS_INTERVAL', '2'))
+
+# One statement updates every job with pending progress; finished jobs are left alone
+PROGRESS_UPDATE_SQL = """
+    UPDATE "DocumentProcessingJob" AS job
+    SET progress = v.progress,
+        message = COALESCE(v.message, job.message),
+        "updatedAt" = NOW()
+    FROM (VALUES %s) AS v(id, progress, message)
+    WHERE job.id = v.id::uuid AND job.status = 'processing';
+"""
+
+
+class ProgressReporter:
+    """Keeps the latest progress per job and flushes all of them with one multi-row UPDATE"""
+
+    def __init__(self, run_query: Callable, interval: float = WORKER_PROGRESS_INTERVAL,
+                 write: Optional[Callable] = None):
+        # run_query(func, *args) runs func(conn, *args) on a pooled connection (AsyncConnectionPool.run)
+        self.run_query = run_query
+        self.interval = interval
+        # write(conn, rows) persists (job_id, progress, message) rows; defaults to the Postgres UPDATE
+        self.write = write or self._write
+        self._pending: Dict[str, Tuple[int, Optional[str]]] = {}
+        self._last_progress: Dict[str, int] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._stats = {
+            'reports': 0,
+            'flushes': 0,
+            'rows_written': 0,
+            'errors': 0,
+        }
+
+    def report(self, job_id: str, progress: int, message: Optional[str] = None) -> None:
+        """Record progress for a job; only the latest value per interval is written"""
+        progress = max(0, min(100, int(progress)))
+        # Never move backwards (e.g. a late callback from a finished stage)
+        if progress < self._last_progress.get(job_id, 0):
+            return
+        self._last_progress[job_id] = progress
+
+        previous = self._pending.get(job_id)
+        if message is None and previous:
+            message = previous[1]
+        self._pending[job_id] = (progress, message)
+        self._stats['reports'] += 1
+
+    def stage(self, job_id: str, start: int, end: int, message: Optional[str] = None) -> Callable[[int, int], None]:
+        """Callback(done, total) mapping a stage's own progress into [start, end]"""
+        self.report(job_id, start, message)
+
+        def callback(done: int, total: int) -> None:
+            if total > 0:
+                self.report(job_id, start + (end - start) * min(done, total) // total)
+
+        return callback
+
+    def finish(self, job_id: str) -> None:
+        """Forget a job before its final status is written directly"""
+        self._pending.pop(job_id, None)
+        self._last_progress.pop(job_id, None)
+
+    @staticmethod
+    def _write(conn, rows):
+        with conn.cursor() as cursor:
+            execute_values(cursor, PROGRESS_UPDATE_SQL, rows)
+        conn.commit()
+
+    async def flush(self) -> None:
+        """Write all pending progress in a single statement"""
+        if not self._pending:
+            return
+
+        pending, self._pending = self._pending, {}
+        rows = [(job_id, str(progress), message) for job_id, (progress, message) in pending.items()]
+        try:
+            await self.run_query(self.write, rows)
+            self._stats['flushes'] += 1
+            self._stats['rows_written'] += len(rows)
+            logger.debug(f"Flushed progress for {len(rows)} jobs")
+        except Exception as e:
+            self._stats['errors'] += 1
+            logger.error(f"Error flushing job progress: {e}")
+            # Keep the values unless newer ones arrived meanwhile
+            for job_id, value in pending.items():
+                self._pending.setdefault(job_id, value)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.flush()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._stats, 'pending': len(self._pending), 'interval': self.interval}
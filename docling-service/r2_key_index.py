@@ -0,0 +1,139 @@
+"""
+R2 Known-Keys Index
+Persistent SQLite set of object keys known to exist in the bucket, so content-addressed uploads can be skipped
+"""
+
+import os
+import time
+import sqlite3
+import logging
+import tempfile
+import threading
+from typing import Dict, Any, Optional, Iterable
+
+logger = logging.getLogger(__name__)
+
+R2_KEY_INDEX_ENABLED = os.getenv('R2_KEY_INDEX_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+R2_KEY_INDEX_PATH = os.getenv('R2_KEY_INDEX_PATH', os.path.join(tempfile.gettempdir(), 'docling-r2-keys.sqlite3'))
+
+# Keys inserted per transaction during a rebuild
+REBUILD_BATCH_SIZE = 1000
+
+
+class R2KeyIndex:
+    """
+    Set of bucket keys already uploaded (or found by HEAD / ListObjects).
+    Only ever a hint: a key missing here is checked against R2 before uploading
+    """
+
+    def __init__(self, path: str = R2_KEY_INDEX_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL;')
+        self._conn.execute('CREATE TABLE IF NOT EXISTS r2_keys (key TEXT PRIMARY KEY, added_at REAL NOT NULL);')
+        self._conn.commit()
+        self._lock = threading.Lock()
+        self._stats = {
+            'lookups': 0,
+            'hits': 0,
+            'added': 0,
+            'rebuilds': 0,
+            'errors': 0,
+        }
+
+    def contains(self, key: str) -> bool:
+        try:
+            with self._lock:
+                self._stats['lookups'] += 1
+                found = self._conn.execute('SELECT 1 FROM r2_keys WHERE key = ?;', [key]).fetchone() is not None
+                if found:
+                    self._stats['hits'] += 1
+            return found
+        except sqlite3.Error as e:
+            logger.warning(f"R2 key index read failed: {e}")
+            with self._lock:
+                self._stats['errors'] += 1
+            return False
+
+    def add_many(self, keys: Iterable[str]) -> int:
+        """Record keys as present; returns how many were new"""
+        now = time.time()
+        try:
+            with self._lock:
+                before = self._conn.total_changes
+                self._conn.executemany('INSERT OR IGNORE INTO r2_keys VALUES (?, ?);', [(key, now) for key in keys])
+                self._conn.commit()
+                added = self._conn.total_changes - before
+                self._stats['added'] += added
+            return added
+        except sqlite3.Error as e:
+            logger.warning(f"R2 key index write failed: {e}")
+            with self._lock:
+                self._stats['errors'] += 1
+            return 0
+
+    def add(self, key: str) -> None:
+        self.add_many([key])
+
+    def _mark_listed(self, keys: Iterable[str], now: float) -> None:
+        """Record keys seen by a sweep at time now, refreshing keys already present"""
+        with self._lock:
+            self._conn.executemany(
+                'INSERT INTO r2_keys VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET added_at = excluded.added_at;',
+                [(key, now) for key in keys]
+            )
+            self._conn.commit()
+
+    def rebuild(self, client, bucket: str, prefix: str = '') -> int:
+        """
+        Replace the keys under prefix with a ListObjectsV2 sweep of the bucket (blocking; run off the event loop).
+        Listed keys are written first and stale ones removed only after the sweep finishes, so a failed sweep
+        leaves the index as it was. Returns the number of keys listed
+        """
+        started = time.time()
+        listed, batch = 0, []
+        for page in client.get_paginator('list_objects_v2').paginate(Bucket=bucket, Prefix=prefix):
+            for obj in page.get('Contents', []):
+                batch.append(obj['Key'])
+                if len(batch) >= REBUILD_BATCH_SIZE:
+                    listed += len(batch)
+                    self._mark_listed(batch, started)
+                    batch = []
+        listed += len(batch)
+        self._mark_listed(batch, started)
+
+        # Keys not seen by the sweep (uploads recorded meanwhile are newer than started)
+        with self._lock:
+            self._conn.execute("DELETE FROM r2_keys WHERE substr(key, 1, ?) = ? AND added_at < ?;",
+                               [len(prefix), prefix, started])
+            self._conn.commit()
+            self._stats['rebuilds'] += 1
+        logger.info(f"✅ R2 key index rebuilt from {bucket}/{prefix}: {listed} keys")
+        return listed
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            try:
+                stats['entries'] = self._conn.execute('SELECT COUNT(*) FROM r2_keys;').fetchone()[0]
+            except sqlite3.Error:
+                stats['entries'] = None
+        stats['hit_rate'] = round(stats['hits'] / stats['lookups'], 4) if stats['lookups'] else None
+        return stats
+
+
+# Global index instance
+r2_key_index: Optional[R2KeyIndex] = None
+
+def get_r2_key_index() -> Optional[R2KeyIndex]:
+    """Return the process-wide index, or None when disabled"""
+    global r2_key_index
+    if r2_key_index is None and R2_KEY_INDEX_ENABLED:
+        try:
+            r2_key_index = R2KeyIndex()
+            logger.info(f"✅ R2 key index at {r2_key_index.path}")
+        except sqlite3.Error as e:
+            logger.error(f"❌ Could not open R2 key index at {R2_KEY_INDEX_PATH}: {e}")
+            return None
+    return r2_key_index
@@ -0,0 +1,221 @@
+"""
+R2 Upload Engine
+Runs blocking boto3 uploads on a bounded thread pool with jittered retries so they overlap with other async work
+"""
+
+import os
+import time
+import random
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional, Callable, Awaitable, Union
+
+from botocore.config import Config
+from botocore.exceptions import ClientError, ConnectionError as BotoConnectionError, HTTPClientError
+
+from r2_key_index import R2KeyIndex, get_r2_key_index
+
+logger = logging.getLogger(__name__)
+
+# Uploads running at once; also the size of the upload client's connection pool
+R2_UPLOAD_WORKERS = int(os.getenv('R2_UPLOAD_WORKERS', '16'))
+# Retries of a failed upload after the first attempt
+R2_UPLOAD_MAX_RETRIES = int(os.getenv('R2_UPLOAD_MAX_RETRIES', '4'))
+# Backoff before retry n is uniform in [0, min(MAX, BASE * 2^n)] seconds ("full jitter")
+R2_UPLOAD_BACKOFF_BASE = float(os.getenv('R2_UPLOAD_BACKOFF_BASE', '0.2'))
+R2_UPLOAD_BACKOFF_MAX = float(os.getenv('R2_UPLOAD_BACKOFF_MAX', '5'))
+# HEAD content-addressed keys missing from the known-keys index before uploading them
+R2_HEAD_BEFORE_UPLOAD = os.getenv('R2_HEAD_BEFORE_UPLOAD', 'true').lower() in ('1', 'true', 'yes')
+
+# S3 error codes worth retrying besides 5xx responses
+RETRYABLE_ERROR_CODES = {'SlowDown', 'Throttling', 'ThrottlingException', 'RequestTimeout', 'RequestTimeTooSkewed',
+                         'InternalError', 'ServiceUnavailable'}
+
+
+def upload_client_config() -> Config:
+    """boto3 config for the upload client: a pool sized for the workers, retries left to the engine"""
+    return Config(
+        signature_version='s3v4',
+        s3={'addressing_style': 'path'},
+        max_pool_connections=R2_UPLOAD_WORKERS,
+        retries={'mode': 'standard', 'total_max_attempts': 1},
+    )
+
+
+def is_retryable(error: Exception) -> bool:
+    """True for connection failures, throttling and server-side errors"""
+    if isinstance(error, (BotoConnectionError, HTTPClientError)):
+        return True
+    if isinstance(error, ClientError):
+        code = error.response.get('Error', {}).get('Code')
+        status = error.response.get('ResponseMetadata', {}).get('HTTPStatusCode') or 0
+        return code in RETRYABLE_ERROR_CODES or status >= 500 or status == 429
+    return False
+
+
+class R2UploadEngine:
+    """Async facade over one shared boto3 client: uploads queue for a bounded thread pool instead of blocking the event loop"""
+
+    def __init__(self, client, bucket: str, workers: int = R2_UPLOAD_WORKERS,
+                 max_retries: int = R2_UPLOAD_MAX_RETRIES, key_index: Optional[R2KeyIndex] = None,
+                 head_check: bool = R2_HEAD_BEFORE_UPLOAD):
+        self.client = client
+        self.bucket = bucket
+        self.key_index = key_index
+        self.head_check = head_check
+        self._pending: Dict[str, asyncio.Future] = {}
+        self.workers = max(1, workers)
+        self.max_retries = max(0, max_retries)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='r2-upload')
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._stats = {
+            'uploads': 0,
+            'bytes': 0,
+            'retries': 0,
+            'failures': 0,
+            'skipped': 0,
+            'head_hits': 0,
+            'upload_seconds': 0.0,
+        }
+
+    async def _call(self, operation: Callable[[], Any], key: str) -> Any:
+        """Run operation on the pool, retrying transient failures with full-jitter exponential backoff"""
+        loop = asyncio.get_running_loop()
+        for attempt in range(self.max_retries + 1):
+            try:
+                return await loop.run_in_executor(self._executor, operation)
+            except Exception as e:
+                if attempt >= self.max_retries or not is_retryable(e):
+                    raise
+                delay = random.uniform(0, min(R2_UPLOAD_BACKOFF_MAX, R2_UPLOAD_BACKOFF_BASE * 2 ** attempt))
+                logger.warning(f"⚠️  R2 request for {key} failed ({e}), retry {attempt + 1}/{self.max_retries} in {delay:.2f}s")
+                with self._lock:
+                    self._stats['retries'] += 1
+                await asyncio.sleep(delay)
+
+    async def _run(self, operation: Callable[[], Any], key: str, size: int) -> None:
+        """Run an upload, counting it in the stats"""
+        self._in_flight += 1
+        start = time.monotonic()
+        try:
+            await self._call(operation, key)
+        except Exception:
+            with self._lock:
+                self._stats['failures'] += 1
+            raise
+        finally:
+            self._in_flight -= 1
+
+        with self._lock:
+            self._stats['uploads'] += 1
+            self._stats['bytes'] += size
+            self._stats['upload_seconds'] += time.monotonic() - start
+
+    async def put_bytes(self, key: str, body: bytes, content_type: str) -> None:
+        """Upload an in-memory object; raises once retries are exhausted"""
+        await self._run(
+            lambda: self.client.put_object(Bucket=self.bucket, Key=key, Body=body, ContentType=content_type),
+            key, len(body)
+        )
+
+    async def exists(self, key: str) -> bool:
+        """HEAD the object; False only when R2 says it is missing"""
+        try:
+            await self._call(lambda: self.client.head_object(Bucket=self.bucket, Key=key), key)
+            return True
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+                return False
+            raise
+
+    async def put_bytes_if_absent(self, key: str, body: Union[bytes, Callable[[], Awaitable[bytes]]],
+                                  content_type: str) -> bool:
+        """
+        Upload a content-addressed object unless it is already stored (known-keys index, then HEAD).
+        body may be an async callable, only called when the upload is needed.
+        Returns True if bytes were uploaded; concurrent calls for one key share a single check and upload
+        """
+        pending = self._pending.get(key)
+        if pending:
+            if not await asyncio.shield(pending):
+                raise RuntimeError(f"Concurrent upload of {key} failed")
+            with self._lock:
+                self._stats['skipped'] += 1
+            return False
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending[key] = future
+        stored = False
+        try:
+            if self.key_index and await asyncio.to_thread(self.key_index.contains, key):
+                with self._lock:
+                    self._stats['skipped'] += 1
+                stored = True
+                return False
+
+            if self.head_check:
+                try:
+                    found = await self.exists(key)
+                except Exception as e:
+                    # Unknown - uploading again is safe, the key names the content
+                    logger.debug(f"HEAD {key} failed: {e}")
+                    found = False
+                if found:
+                    with self._lock:
+                        self._stats['skipped'] += 1
+                        self._stats['head_hits'] += 1
+                    stored = True
+                    if self.key_index:
+                        await asyncio.to_thread(self.key_index.add, key)
+                    return False
+
+            if callable(body):
+                body = await body()
+            await self.put_bytes(key, body, content_type)
+            stored = True
+            if self.key_index:
+                await asyncio.to_thread(self.key_index.add, key)
+            return True
+        finally:
+            self._pending.pop(key, None)
+            # Waiters succeed or fail with this attempt
+            future.set_result(stored)
+
+    async def put_file(self, path: str, key: str, content_type: str) -> None:
+        """Upload a local file (multipart for large files); raises once retries are exhausted"""
+        await self._run(
+            lambda: self.client.upload_file(path, self.bucket, key, ExtraArgs={'ContentType': content_type}),
+            key, os.path.getsize(path)
+        )
+
+    def shutdown(self) -> None:
+        """Wait for queued uploads, then stop the pool"""
+        self._executor.shutdown(wait=True)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        stats['in_flight'] = self._in_flight
+        stats['workers'] = self.workers
+        stats['upload_seconds'] = round(stats['upload_seconds'], 3)
+        stats['key_index'] = self.key_index.stats() if self.key_index else None
+        return stats
+
+
+# Global engine instance
+r2_uploads: Optional[R2UploadEngine] = None
+
+def init_r2_uploads(client=None, bucket: Optional[str] = None) -> Optional[R2UploadEngine]:
+    """Create the process-wide engine (no-op without an R2 client)"""
+    global r2_uploads
+    if client is not None and bucket:
+        r2_uploads = R2UploadEngine(client, bucket, key_index=get_r2_key_index())
+        logger.info(f"✅ R2 upload engine ready ({r2_uploads.workers} workers, {r2_uploads.max_retries} retries)")
+    return r2_uploads
+
+def get_r2_uploads() -> Optional[R2UploadEngine]:
+    """Return the process-wide engine, or None when R2 is not configured"""
+    return r2_uploads
@@ -0,0 +1,172 @@
+"""
+Adaptive Rate Limiting
+Async token buckets for outbound APIs (Cohere, Anthropic, Pinecone) that back off on 429s
+"""
+
+import os
+import time
+import asyncio
+import logging
+from email.utils import parsedate_to_datetime
+from typing import Dict, Any, Optional, Callable
+
+logger = logging.getLogger(__name__)
+
+# Retries of a single call after the provider answered 429
+RATE_LIMIT_MAX_RETRIES = int(os.getenv('RATE_LIMIT_MAX_RETRIES', '3'))
+
+# Requests per second and burst size for each bucket
+RATE_LIMIT_DEFAULTS = {
+    'cohere': (float(os.getenv('COHERE_RATE_LIMIT', '10')), int(os.getenv('COHERE_RATE_BURST', '10'))),
+    'anthropic': (float(os.getenv('ANTHROPIC_RATE_LIMIT', '4')), int(os.getenv('ANTHROPIC_RATE_BURST', '10'))),
+    'pinecone': (float(os.getenv('PINECONE_RATE_LIMIT', '50')), int(os.getenv('PINECONE_RATE_BURST', '20'))),
+}
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header (delta seconds or HTTP date) into seconds"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """True if an SDK exception represents an HTTP 429"""
+    response = getattr(error, 'response', None)
+    status = getattr(error, 'status_code', None) or getattr(error, 'status', None) or getattr(response, 'status_code', None)
+    return status == 429
+
+
+def retry_after_from_error(error: Exception) -> Optional[float]:
+    """Retry-After seconds carried by an SDK exception, if any"""
+    headers = getattr(error, 'headers', None) or getattr(getattr(error, 'response', None), 'headers', None)
+    if not headers:
+        return None
+    try:
+        return parse_retry_after(headers.get('retry-after') or headers.get('Retry-After'))
+    except AttributeError:
+        return None
+
+
+class AdaptiveRateLimiter:
+    """
+    Token bucket whose refill rate adapts to the provider:
+    halved on every 429 (honouring Retry-After), recovered additively on success
+    """
+
+    def __init__(self, name: str, rate: float, burst: int, min_rate: Optional[float] = None):
+        self.name = name
+        self.max_rate = rate
+        self.min_rate = min_rate if min_rate is not None else max(rate / 20, 0.1)
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = asyncio.Lock()
+        self._stats = {
+            'acquired': 0,
+            'waits': 0,
+            'wait_seconds': 0.0,
+            'rate_limited': 0,
+        }
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, tokens: int = 1) -> None:
+        """Wait until the bucket has enough tokens (and any Retry-After window has passed)"""
+        waited = 0.0
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._blocked_until:
+                    delay = self._blocked_until - now
+                else:
+                    self._refill(now)
+                    if self.tokens >= tokens:
+                        self.tokens -= tokens
+                        break
+                    delay = (tokens - self.tokens) / self.rate
+                await asyncio.sleep(delay)
+                waited += delay
+
+        self._stats['acquired'] += 1
+        if waited:
+            self._stats['waits'] += 1
+            self._stats['wait_seconds'] += waited
+
+    def record_success(self) -> None:
+        """Recover towards the configured rate after a successful call"""
+        if self.rate < self.max_rate:
+            self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
+
+    def record_rate_limited(self, retry_after: Optional[float] = None) -> None:
+        """Back off after a 429"""
+        self._stats['rate_limited'] += 1
+        now = time.monotonic()
+        self._refill(now)
+        self.rate = max(self.min_rate, self.rate / 2)
+        self.tokens = 0.0
+        if retry_after:
+            self._blocked_until = max(self._blocked_until, now + retry_after)
+        logger.warning(f"Rate limited by {self.name}: rate lowered to {self.rate:.2f}/s"
+                       + (f", pausing {retry_after:.1f}s" if retry_after else ''))
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of bucket state"""
+        now = time.monotonic()
+        tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        return {
+            **self._stats,
+            'tokens': round(tokens, 2),
+            'capacity': self.capacity,
+            'rate': round(self.rate, 3),
+            'max_rate': self.max_rate,
+            'blocked_for': round(max(0.0, self._blocked_until - now), 2),
+        }
+
+
+# Shared limiters, one per outbound API
+rate_limiters: Dict[str, AdaptiveRateLimiter] = {}
+
+def get_rate_limiter(name: str) -> AdaptiveRateLimiter:
+    """Return the shared limiter for an API ('cohere', 'anthropic' or 'pinecone')"""
+    if name not in rate_limiters:
+        rate, burst = RATE_LIMIT_DEFAULTS[name]
+        rate_limiters[name] = AdaptiveRateLimiter(name, rate, burst)
+    return rate_limiters[name]
+
+def rate_limiter_stats() -> Dict[str, Any]:
+    """Current token levels and rates of every limiter"""
+    return {name: limiter.stats() for name, limiter in rate_limiters.items()}
+
+
+async def rate_limited_call(name: str, func: Callable, *args, **kwargs):
+    """
+    Run a blocking SDK call in a thread under the named limiter,
+    retrying after 429s (up to RATE_LIMIT_MAX_RETRIES)
+    """
+    limiter = get_rate_limiter(name)
+    for attempt in range(RATE_LIMIT_MAX_RETRIES + 1):
+        await limiter.acquire()
+        try:
+            result = await asyncio.to_thread(func, *args, **kwargs)
+        except Exception as e:
+            if not is_rate_limit_error(e):
+                raise
+            # Recorded on the last attempt too, so later calls back off
+            limiter.record_rate_limited(retry_after_from_error(e))
+            if attempt == RATE_LIMIT_MAX_RETRIES:
+                raise
+            continue
+        limiter.record_success()
+        return result
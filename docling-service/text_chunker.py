@@ -0,0 +1,50 @@
+"""
+Sentence Chunker
+Greedy sentence-packing of page text with overlap, with chunk bounds found by binary search over prefix sums of sentence lengths
+"""
+
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+from typing import List, Tuple, Optional
+
+
+def split_sentences(page_text: str) -> List[str]:
+    """Sentences split on '. ', stripped, each ending in terminal punctuation"""
+    return [part if part[-1] in '.!?' else part + '.' for part in map(str.strip, page_text.split('. ')) if part]
+
+
+def chunk_spans(prefix: List[int], max_chunk_size: int, overlap_size: int) -> List[Tuple[int, int]]:
+    """
+    (first, end) sentence ranges of each chunk, given prefix[i] = total length of sentences before i.
+    A chunk closes before the first sentence that would take it past max_chunk_size (lengths exclude separators),
+    but always holds at least one sentence; the next one starts with the longest run of trailing sentences
+    totalling at most overlap_size. Each boundary is two binary searches, so this is O(chunks * log(sentences))
+    """
+    count = len(prefix) - 1
+    spans = []
+    start, lowest = 0, 1
+    while True:
+        # Sentence i closes the chunk if prefix[i + 1] - prefix[start] > max_chunk_size, for the first i >= lowest
+        end = bisect_right(prefix, prefix[start] + max_chunk_size, lowest + 1) - 1
+        if end >= count:
+            break
+        spans.append((start, end))
+        start = bisect_left(prefix, prefix[end] - overlap_size, start, end)
+        lowest = end + 1
+    if count > start:
+        spans.append((start, count))
+    return spans
+
+
+def chunk_page_text(page_text: str, max_chunk_size: int = 1000, overlap_size: Optional[int] = None) -> List[str]:
+    """Chunks of a page's text as slices of its sentences joined by single spaces (overlap defaults to 20%)"""
+    if overlap_size is None:
+        overlap_size = max_chunk_size // 5
+
+    sentences = split_sentences(page_text)
+    prefix = [0, *accumulate(map(len, sentences))]
+    joined = ' '.join(sentences)
+
+    # Sentence i starts at prefix[i] + i in joined (one space per earlier sentence); a chunk ends one before the next start
+    return [joined[prefix[first] + first:prefix[end] + end - 1]
+            for first, end in chunk_spans(prefix, max_chunk_size, overlap_size)]
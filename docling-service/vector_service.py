@@ -7,13 +7,30 @@ import os
 import logging
 import hashlib
 import json
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Callable
 import cohere
 from pinecone import Pinecone, ServerlessSpec
 import base64
+import asyncio
+
+from rate_limiter import rate_limited_call, is_rate_limit_error
 
 logger = logging.getLogger(__name__)
 
+# Cohere embed accepts up to 96 texts per call
+COHERE_TEXT_BATCH_SIZE = int(os.getenv('COHERE_TEXT_BATCH_SIZE', '96'))
+# The embed endpoint currently accepts a single image per call
+COHERE_IMAGE_BATCH_SIZE = int(os.getenv('COHERE_IMAGE_BATCH_SIZE', '1'))
+
+# IDs per Pinecone fetch request
+PINECONE_FETCH_BATCH_SIZE = int(os.getenv('PINECONE_FETCH_BATCH_SIZE', '100'))
+# Vectors per Pinecone upsert request (also capped by PINECONE_MAX_REQUEST_BYTES)
+PINECONE_UPSERT_BATCH_SIZE = int(os.getenv('PINECONE_UPSERT_BATCH_SIZE', '100'))
+# Pinecone rejects upserts over 2MB; leave headroom for request framing
+PINECONE_MAX_REQUEST_BYTES = int(os.getenv('PINECONE_MAX_REQUEST_BYTES', str(1_800_000)))
+# Concurrent Pinecone requests per document
+PINECONE_MAX_IN_FLIGHT = int(os.getenv('PINECONE_MAX_IN_FLIGHT', '4'))
+
 class VectorService:
     """Service for generating embeddings and storing in vector database"""
 
@@ -56,8 +73,7 @@ class VectorService:
                 )
                 logger.info(f"✅ Index '{self.index_name}' created")
                 # Wait for index to be ready
-                import time
-                time.sleep(10)
+                await asyncio.sleep(10)
             else:
                 logger.info(f"✅ Index '{self.index_name}' already exists")
 
@@ -117,6 +133,79 @@ class VectorService:
             logger.error(f"❌ Error generating image embedding: {e}")
             raise
 
+    def _embed_batch(self, texts: Optional[List[str]] = None, images: Optional[List[str]] = None) -> List[List[float]]:
+        """Single Cohere embed call for a batch of texts or images"""
+        # Must match the model used in TypeScript: lib/ai/cohereEmbeddings.ts
+        kwargs = {'texts': texts} if texts is not None else {'images': images}
+        response = self.cohere_client.embed(
+            model='embed-v4.0',
+            input_type='search_document',
+            embedding_types=['float'],
+            **kwargs
+        )
+        embeddings = response.embeddings.float
+        expected = len(texts if texts is not None else images)
+        if len(embeddings) != expected:
+            raise ValueError(f"Cohere returned {len(embeddings)} embeddings for {expected} inputs")
+        return embeddings
+
+    async def _embed_isolated(self, items: List[str], kind: str) -> List[Optional[List[float]]]:
+        """
+        Embed a batch; if the call fails, split it in half and retry each side so
+        one bad item only costs its own embedding (returned as None)
+        """
+        try:
+            if kind == 'text':
+                return await rate_limited_call('cohere', self._embed_batch, texts=items)
+            return await rate_limited_call('cohere', self._embed_batch, images=items)
+        except Exception as e:
+            if len(items) == 1 or is_rate_limit_error(e):
+                # Splitting a rate-limited batch would only multiply the 429s
+                logger.error(f"❌ Error generating {len(items)} {kind} embeddings: {e}")
+                return [None] * len(items)
+            logger.warning(f"Batch of {len(items)} {kind} embeddings failed ({e}), splitting batch")
+            middle = len(items) // 2
+            return await self._embed_isolated(items[:middle], kind) + await self._embed_isolated(items[middle:], kind)
+
+    async def generate_embeddings(self, inputs: List[Dict[str, str]],
+                                  progress_callback: Optional[Callable[[int, int], None]] = None) -> List[Optional[List[float]]]:
+        """
+        Generate embeddings for many inputs with as few API calls as possible
+        inputs are {'kind': 'text'|'image', 'value': text or base64 image}
+        Returns embeddings in input order; None for inputs that failed to embed
+        progress_callback(done, total) is called after each batch
+        """
+        done = 0
+        results: List[Optional[List[float]]] = [None] * len(inputs)
+
+        for kind, batch_size in (('text', COHERE_TEXT_BATCH_SIZE), ('image', COHERE_IMAGE_BATCH_SIZE)):
+            positions = [i for i, item in enumerate(inputs) if item['kind'] == kind]
+            values = []
+            for i in positions:
+                value = inputs[i]['value']
+                if kind == 'text':
+                    value = value.strip()
+                elif not value.startswith('data:'):
+                    # Ensure proper data URL format for Cohere
+                    value = f'data:image/png;base64,{value}'
+                values.append(value)
+
+            for start in range(0, len(values), max(1, batch_size)):
+                batch_positions = positions[start:start + batch_size]
+                embeddings = await self._embed_isolated(values[start:start + batch_size], kind)
+                for position, embedding in zip(batch_positions, embeddings):
+                    results[position] = embedding
+
+                done += len(batch_positions)
+                if progress_callback:
+                    progress_callback(done, len(inputs))
+
+            if positions:
+                logger.info(f"Generated {sum(1 for i in positions if results[i] is not None)}/{len(positions)} {kind} embeddings "
+                            f"in {(len(values) + batch_size - 1) // max(1, batch_size)} requests")
+
+        return results
+
     def generate_document_id(self, content: str, metadata: Dict[str, Any]) -> str:
         """Generate a consistent document ID based on content and metadata"""
         content_hash = metadata.get('contentHash', metadata.get('source', ''))
@@ -128,94 +217,167 @@ class VectorService:
         id_source = f"{content_hash}|{metadata.get('page', '')}|{metadata.get('section', '')}|{chunk_hash}"
         return hashlib.md5(id_source.encode('utf-8')).hexdigest()
 
-    async def store_chunks(self, chunks: List[Dict[str, Any]]) -> int:
+    def build_pinecone_metadata(self, chunk: Dict[str, Any], metadata: Dict[str, Any]) -> Dict[str, Any]:
+        """Metadata stored alongside a chunk's vector in Pinecone"""
+        pinecone_metadata = {
+            'content': chunk.get('content', '')[:40000],  # Pinecone metadata size limit
+            'source': metadata['source'],
+            'page': str(metadata['page']),
+            'type': chunk.get('type', 'pdf'),
+            'filename': metadata['filename'],
+            'contentHash': metadata['contentHash'],
+            'contentType': metadata['contentType'],
+        }
+
+        # Add optional fields
+        if chunk.get('coordinates'):
+            pinecone_metadata['coordinates'] = json.dumps(chunk['coordinates'])
+        if chunk.get('pdf_url'):
+            pinecone_metadata['pdfUrl'] = chunk['pdf_url']
+        if chunk.get('image_url'):
+            pinecone_metadata['relatedImageUrls'] = json.dumps([chunk['image_url']])
+        elif chunk.get('related_image_urls'):
+            pinecone_metadata['relatedImageUrls'] = json.dumps(chunk['related_image_urls'])
+
+        return pinecone_metadata
+
+    async def fetch_existing_ids(self, index, ids: List[str]) -> set:
+        """Find which IDs already exist using batched, concurrent, rate-limited fetches"""
+        semaphore = asyncio.Semaphore(PINECONE_MAX_IN_FLIGHT)
+
+        async def fetch_batch(batch: List[str]) -> set:
+            async with semaphore:
+                try:
+                    result = await rate_limited_call('pinecone', index.fetch, ids=batch)
+                    return set(result.vectors.keys())
+                except Exception as e:
+                    # Treat as not existing - worst case the upsert overwrites identical vectors
+                    logger.warning(f"Pinecone fetch of {len(batch)} IDs failed: {e}")
+                    return set()
+
+        batches = [ids[i:i + PINECONE_FETCH_BATCH_SIZE] for i in range(0, len(ids), PINECONE_FETCH_BATCH_SIZE)]
+        existing = set()
+        for found in await asyncio.gather(*[fetch_batch(batch) for batch in batches]):
+            existing |= found
+        return existing
+
+    @staticmethod
+    def plan_upsert_batches(vectors: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        """Group vectors into upsert requests under both the count and request-size limits"""
+        batches = []
+        current = []
+        current_bytes = 0
+        for vector in vectors:
+            vector_bytes = len(json.dumps(vector))
+            if current and (len(current) >= PINECONE_UPSERT_BATCH_SIZE or current_bytes + vector_bytes > PINECONE_MAX_REQUEST_BYTES):
+                batches.append(current)
+                current = []
+                current_bytes = 0
+            current.append(vector)
+            current_bytes += vector_bytes
+        if current:
+            batches.append(current)
+        return batches
+
+    async def upsert_vectors(self, index, vectors: List[Dict[str, Any]],
+                             progress_callback: Optional[Callable[[int, int], None]] = None) -> int:
+        """Upsert vectors in size-bounded batches with a bounded number in flight"""
+        semaphore = asyncio.Semaphore(PINECONE_MAX_IN_FLIGHT)
+        done = 0
+
+        async def upsert_batch(batch: List[Dict[str, Any]]) -> int:
+            async with semaphore:
+                nonlocal done
+                try:
+                    await rate_limited_call('pinecone', index.upsert, vectors=batch)
+                    logger.info(f"✅ Upserted batch of {len(batch)} vectors")
+                    return len(batch)
+                except Exception as e:
+                    logger.error(f"❌ Error upserting batch of {len(batch)} vectors: {e}")
+                    return 0
+                finally:
+                    done += len(batch)
+                    if progress_callback:
+                        progress_callback(done, len(vectors))
+
+        batches = self.plan_upsert_batches(vectors)
+        return sum(await asyncio.gather(*[upsert_batch(batch) for batch in batches]))
+
+    async def store_chunks(self, chunks: List[Dict[str, Any]],
+                           progress_callback: Optional[Callable[[int, int], None]] = None) -> int:
         """
         Store document chunks in Pinecone
         Returns the number of chunks stored
+        progress_callback(done, total) reports embedding then upsert progress
         """
         try:
             await self.initialize_index()
             index = self.pinecone_client.Index(self.index_name)
 
-            stored_count = 0
-
+            # Compute IDs for the whole document first
+            candidates = []
+            seen_ids = set()
             for i, chunk in enumerate(chunks):
-                try:
-                    logger.info(f"Processing chunk {i+1}/{len(chunks)}: {chunk.get('content_type', 'unknown')}")
-
-                    # Generate embedding based on content type
-                    if chunk['content_type'] == 'image' and chunk.get('image_data'):
-                        # For images, use image embedding
-                        embedding = self.generate_image_embedding(chunk['image_data'])
-                    else:
-                        # For text and tables, use text embedding
-                        if not chunk.get('content') or not chunk['content'].strip():
-                            logger.warning(f"Skipping chunk {i+1}: empty content")
-                            continue
-                        embedding = self.generate_text_embedding(chunk['content'])
-
-                    # Generate document ID
-                    metadata = {
-                        'source': chunk.get('source', ''),
-                        'page': chunk.get('page', 1),
-                        'filename': chunk.get('filename', ''),
-                        'contentHash': chunk.get('content_hash', ''),
-                        'contentType': chunk['content_type'],
-                        'section': chunk.get('section', ''),
-                    }
-
-                    doc_id = self.generate_document_id(chunk.get('content', ''), metadata)
-
-                    # Check if document already exists
-                    try:
-                        fetch_result = index.fetch([doc_id])
-                        if doc_id in fetch_result.vectors:
-                            logger.info(f"Chunk {i+1} already exists, skipping")
-                            continue
-                    except Exception:
-                        pass  # Document doesn't exist, continue with upsert
-
-                    # Prepare metadata for Pinecone
-                    pinecone_metadata = {
-                        'content': chunk.get('content', '')[:40000],  # Pinecone metadata size limit
-                        'source': metadata['source'],
-                        'page': str(metadata['page']),
-                        'type': chunk.get('type', 'pdf'),
-                        'filename': metadata['filename'],
-                        'contentHash': metadata['contentHash'],
-                        'contentType': metadata['contentType'],
-                    }
-
-                    # Add optional fields
-                    if chunk.get('coordinates'):
-                        pinecone_metadata['coordinates'] = json.dumps(chunk['coordinates'])
-                    if chunk.get('pdf_url'):
-                        pinecone_metadata['pdfUrl'] = chunk['pdf_url']
-                    if chunk.get('image_url'):
-                        pinecone_metadata['relatedImageUrls'] = json.dumps([chunk['image_url']])
-                    elif chunk.get('related_image_urls'):
-                        pinecone_metadata['relatedImageUrls'] = json.dumps(chunk['related_image_urls'])
-
-                    # Upsert to Pinecone
-                    index.upsert(
-                        vectors=[{
-                            'id': doc_id,
-                            'values': embedding,
-                            'metadata': pinecone_metadata
-                        }]
-                    )
+                if chunk['content_type'] == 'image' and chunk.get('image_data'):
+                    # For images, use image embedding
+                    embedding_input = {'kind': 'image', 'value': chunk['image_data']}
+                elif chunk.get('content') and chunk['content'].strip():
+                    # For text and tables, use text embedding
+                    embedding_input = {'kind': 'text', 'value': chunk['content']}
+                else:
+                    logger.warning(f"Skipping chunk {i+1}: empty content")
+                    continue
 
-                    stored_count += 1
-                    logger.info(f"✅ Stored chunk {i+1}/{len(chunks)}")
+                metadata = {
+                    'source': chunk.get('source', ''),
+                    'page': chunk.get('page', 1),
+                    'filename': chunk.get('filename', ''),
+                    'contentHash': chunk.get('content_hash', ''),
+                    'contentType': chunk['content_type'],
+                    'section': chunk.get('section', ''),
+                }
+
+                doc_id = self.generate_document_id(chunk.get('content', ''), metadata)
+                if doc_id in seen_ids:
+                    logger.info(f"Chunk {i+1} duplicates an earlier chunk, skipping")
+                    continue
+                seen_ids.add(doc_id)
 
-                    # Small delay to avoid rate limits
-                    if i < len(chunks) - 1:
-                        import time
-                        time.sleep(0.15)
+                candidates.append((chunk, metadata, doc_id, embedding_input))
 
-                except Exception as e:
-                    logger.error(f"❌ Error storing chunk {i+1}: {e}")
+            # Skip chunks that are already in the index (before paying for their embeddings)
+            existing_ids = await self.fetch_existing_ids(index, [doc_id for _, _, doc_id, _ in candidates])
+            if existing_ids:
+                logger.info(f"{len(existing_ids)} chunks already exist, skipping")
+            new_chunks = [candidate for candidate in candidates if candidate[2] not in existing_ids]
+
+            # Embed the new chunks in batched requests
+            # Embedding is most of the work: report it as the first 80% of this stage
+            def embedding_progress(done: int, total: int):
+                if progress_callback:
+                    progress_callback(done * 80 // max(total, 1), 100)
+
+            def upsert_progress(done: int, total: int):
+                if progress_callback:
+                    progress_callback(80 + done * 20 // max(total, 1), 100)
+
+            embeddings = await self.generate_embeddings(
+                [embedding_input for _, _, _, embedding_input in new_chunks],
+                progress_callback=embedding_progress
+            )
+
+            vectors = []
+            for (chunk, metadata, doc_id, _), embedding in zip(new_chunks, embeddings):
+                if embedding is None:
+                    logger.warning(f"Skipping chunk {doc_id}: embedding failed")
                     continue
+                vectors.append({
+                    'id': doc_id,
+                    'values': embedding,
+                    'metadata': self.build_pinecone_metadata(chunk, metadata)
+                })
+
+            stored_count = await self.upsert_vectors(index, vectors, progress_callback=upsert_progress)
 
             logger.info(f"✅ Successfully stored {stored_count}/{len(chunks)} chunks")
             return stored_count
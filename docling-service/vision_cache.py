@@ -0,0 +1,180 @@
+"""
+Vision Description Cache
+Persistent SQLite cache of image descriptions keyed by image content hash + prompt version
+"""
+
+import os
+import time
+import sqlite3
+import asyncio
+import logging
+import tempfile
+import threading
+from typing import Dict, Any, Optional, Tuple, Callable, Awaitable
+
+logger = logging.getLogger(__name__)
+
+VISION_CACHE_ENABLED = os.getenv('VISION_CACHE_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+VISION_CACHE_PATH = os.getenv('VISION_CACHE_PATH', os.path.join(tempfile.gettempdir(), 'docling-vision-cache.sqlite3'))
+# Descriptions older than this are requested again
+VISION_CACHE_TTL_DAYS = float(os.getenv('VISION_CACHE_TTL_DAYS', '30'))
+# Entry budget; least recently used descriptions are evicted beyond it
+VISION_CACHE_MAX_ENTRIES = int(os.getenv('VISION_CACHE_MAX_ENTRIES', '100000'))
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS descriptions (
+        image_hash TEXT NOT NULL,
+        prompt_version TEXT NOT NULL,
+        description TEXT NOT NULL,
+        created_at REAL NOT NULL,
+        last_used_at REAL NOT NULL,
+        PRIMARY KEY (image_hash, prompt_version)
+    );
+    CREATE INDEX IF NOT EXISTS descriptions_last_used ON descriptions (last_used_at);
+"""
+
+
+class VisionCache:
+    """
+    Image hash -> vision description, with TTL expiry and LRU eviction.
+    Concurrent lookups of the same uncached image share one API call
+    """
+
+    def __init__(self, path: str = VISION_CACHE_PATH, ttl_seconds: float = VISION_CACHE_TTL_DAYS * 86400,
+                 max_entries: int = VISION_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max(1, max_entries)
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL;')
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+        self._lock = threading.Lock()
+        self._in_flight: Dict[Tuple[str, str], asyncio.Future] = {}
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'coalesced': 0,
+            'stores': 0,
+            'expired': 0,
+            'evictions': 0,
+            'errors': 0,
+        }
+
+    def _count(self, stat: str, amount: int = 1) -> None:
+        with self._lock:
+            self._stats[stat] += amount
+
+    def get(self, image_hash: str, prompt_version: str) -> Optional[str]:
+        """Return the cached description, or None on a miss"""
+        now = time.time()
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    'SELECT description, created_at FROM descriptions WHERE image_hash = ? AND prompt_version = ?;',
+                    [image_hash, prompt_version]
+                ).fetchone()
+                if row and now - row[1] > self.ttl_seconds:
+                    self._conn.execute('DELETE FROM descriptions WHERE image_hash = ? AND prompt_version = ?;',
+                                       [image_hash, prompt_version])
+                    self._conn.commit()
+                    self._stats['expired'] += 1
+                    row = None
+                if row:
+                    self._conn.execute(
+                        'UPDATE descriptions SET last_used_at = ? WHERE image_hash = ? AND prompt_version = ?;',
+                        [now, image_hash, prompt_version]
+                    )
+                    self._conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Vision cache read failed: {e}")
+            self._count('errors')
+            row = None
+
+        self._count('hits' if row else 'misses')
+        return row[0] if row else None
+
+    def put(self, image_hash: str, prompt_version: str, description: str) -> None:
+        """Store a description, evicting the least recently used entries beyond max_entries"""
+        now = time.time()
+        try:
+            with self._lock:
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO descriptions VALUES (?, ?, ?, ?, ?);',
+                    [image_hash, prompt_version, description, now, now]
+                )
+                self._stats['stores'] += 1
+
+                count = self._conn.execute('SELECT COUNT(*) FROM descriptions;').fetchone()[0]
+                if count > self.max_entries:
+                    # Trim to 90% so eviction doesn't run on every insert
+                    excess = count - int(self.max_entries * 0.9)
+                    self._conn.execute(
+                        'DELETE FROM descriptions WHERE rowid IN '
+                        '(SELECT rowid FROM descriptions ORDER BY last_used_at ASC LIMIT ?);', [excess]
+                    )
+                    self._stats['evictions'] += excess
+                self._conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Vision cache write failed: {e}")
+            self._count('errors')
+
+    async def get_or_compute(self, image_hash: str, prompt_version: str,
+                             compute: Callable[[], Awaitable[Optional[str]]]) -> Optional[str]:
+        """
+        Cached description, or compute() it once - callers asking for the same image meanwhile wait for that result.
+        Falsy results (failed API calls) are not cached
+        """
+        cached = await asyncio.to_thread(self.get, image_hash, prompt_version)
+        if cached:
+            return cached
+
+        key = (image_hash, prompt_version)
+        pending = self._in_flight.get(key)
+        if pending:
+            self._count('coalesced')
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        result = None
+        try:
+            result = await compute()
+            if result:
+                await asyncio.to_thread(self.put, image_hash, prompt_version, result)
+            return result
+        finally:
+            self._in_flight.pop(key, None)
+            # Waiters fall back the same way the caller does if the call failed
+            future.set_result(result)
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of cache counters"""
+        with self._lock:
+            stats = dict(self._stats)
+            try:
+                stats['entries'] = self._conn.execute('SELECT COUNT(*) FROM descriptions;').fetchone()[0]
+            except sqlite3.Error:
+                stats['entries'] = None
+        # Coalesced lookups cost no API call either
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round((stats['hits'] + stats['coalesced']) / lookups, 4) if lookups else None
+        stats['in_flight'] = len(self._in_flight)
+        return stats
+
+
+# Global cache instance
+vision_cache: Optional[VisionCache] = None
+
+def get_vision_cache() -> Optional[VisionCache]:
+    """Return the process-wide cache, or None when caching is disabled"""
+    global vision_cache
+    if vision_cache is None and VISION_CACHE_ENABLED:
+        try:
+            vision_cache = VisionCache()
+            logger.info(f"✅ Vision cache at {vision_cache.path}")
+        except sqlite3.Error as e:
+            logger.error(f"❌ Could not open vision cache at {VISION_CACHE_PATH}: {e}")
+            return None
+    return vision_cache
@@ -0,0 +1,16 @@
+-- Notify document processing workers as soon as a job is queued
+CREATE OR REPLACE FUNCTION notify_document_processing_job() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('document_processing_job', NEW."id"::text);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS "trg_doc_job_queued" ON "DocumentProcessingJob";
+
+-- Fires on new jobs and on jobs re-queued after a failure
+CREATE TRIGGER "trg_doc_job_queued"
+    AFTER INSERT OR UPDATE OF "status" ON "DocumentProcessingJob"
+    FOR EACH ROW
+    WHEN (NEW."status" = 'queued')
+    EXECUTE FUNCTION notify_document_processing_job();
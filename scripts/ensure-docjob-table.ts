@@ -30,6 +30,24 @@ CREATE INDEX IF NOT EXISTS "idx_doc_job_user" ON "DocumentProcessingJob" ("userI
 CREATE INDEX IF NOT EXISTS "idx_doc_job_created" ON "DocumentProcessingJob" ("createdAt");
 `;
 
+// Lets the docling-service worker LISTEN for new jobs instead of polling
+const NOTIFY_SQL = `
+CREATE OR REPLACE FUNCTION notify_document_processing_job() RETURNS trigger AS $$
+BEGIN
+  PERFORM pg_notify('document_processing_job', NEW."id"::text);
+  RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS "trg_doc_job_queued" ON "DocumentProcessingJob";
+
+CREATE TRIGGER "trg_doc_job_queued"
+  AFTER INSERT OR UPDATE OF "status" ON "DocumentProcessingJob"
+  FOR EACH ROW
+  WHEN (NEW."status" = 'queued')
+  EXECUTE FUNCTION notify_document_processing_job();
+`;
+
 async function main() {
   const databaseUrl = process.env.POSTGRES_URL || process.env.DATABASE_URL;
   if (!databaseUrl) {
@@ -43,12 +61,14 @@ async function main() {
       select to_regclass('DocumentProcessingJob')
     `;
     if (to_regclass) {
-      console.log('DocumentProcessingJob already exists. No action taken.');
-      return;
+      console.log('DocumentProcessingJob already exists.');
+    } else {
+      console.log('Creating DocumentProcessingJob table and indexes...');
+      await sql.unsafe(CREATE_SQL);
     }
 
-    console.log('Creating DocumentProcessingJob table and indexes...');
-    await sql.unsafe(CREATE_SQL);
+    console.log('Installing job NOTIFY trigger...');
+    await sql.unsafe(NOTIFY_SQL);
     console.log('Done.');
   } finally {
     await sql.end({ timeout: 2 });